@@ -0,0 +1,61 @@
+"""
+Đo bộ nhớ của bảng điểm trước và sau khi thu gọn kiểu dữ liệu (dtype_planner)
+
+Tạo một bảng điểm lớn giống file xuất của cả khối (tên, giới tính, lớp, mã đề 701-704,
+các cột điểm), chuẩn hóa như ensure_proper_dtypes (mã đề là chuỗi, điểm là float64),
+rồi so sánh memory_usage(deep=True) từng cột.
+
+Chạy: python benchmarks/bench_dtype_memory.py [số dòng]
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dtype_planner import plan_dtypes, apply_dtypes, memory_bytes
+
+ROWS = 50000
+SCORE_COLUMNS = ['ĐĐGtx_1', 'ĐĐGtx_2', 'ĐĐGtx_3', 'ĐĐGtx_4', 'ĐĐGgk', 'ĐĐGck', 'ĐTBmhkI', 'Điểm']
+
+
+def make_grade_book(rows):
+    rng = np.random.default_rng(0)
+    data = {
+        'STT': np.arange(1, rows + 1),
+        'Họ và tên': [f'Nguyễn Văn {i}' for i in range(rows)],
+        'Giới tính': np.where(rng.random(rows) < 0.5, 'Nam', 'Nữ').astype(object),
+        'Lớp': [f'10A{i % 12 + 1}' for i in range(rows)],
+        'Mã đề': [str(701 + i % 4) for i in range(rows)],
+    }
+    for col in SCORE_COLUMNS:
+        # Điểm theo bước 0.25 như khi chấm trắc nghiệm, 5% chưa có điểm
+        scores = rng.integers(0, 41, rows) / 4
+        scores[rng.random(rows) < 0.05] = np.nan
+        data[col] = scores
+    return pd.DataFrame(data)
+
+
+def main(rows):
+    df = make_grade_book(rows)
+    plan = plan_dtypes(df, score_columns=SCORE_COLUMNS, category_columns=['Mã đề', 'Giới tính', 'Lớp'],
+                       text_columns=['Họ và tên'])
+    compact = apply_dtypes(df, plan)
+
+    before = df.memory_usage(deep=True)
+    after = compact.memory_usage(deep=True)
+    print(f"{rows} dòng")
+    print(f"{'Cột':<12} {'trước (KB)':>12} {'sau (KB)':>12}  kiểu mới")
+    for col in df.columns:
+        print(f"{col:<12} {before[col] / 1024:>12.0f} {after[col] / 1024:>12.0f}  {compact[col].dtype}")
+    total_before, total_after = memory_bytes(df), memory_bytes(compact)
+    print(f"{'Tổng':<12} {total_before / 1024:>12.0f} {total_after / 1024:>12.0f}"
+          f"  (giảm {100 * (1 - total_after / total_before):.0f}%)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
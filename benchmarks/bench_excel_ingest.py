@@ -0,0 +1,122 @@
+"""
+Đo thời gian và bộ nhớ đỉnh (peak RSS) khi đọc file Excel
+
+So sánh cách cũ của read_excel_file (load_workbook đầy đủ để lấy merged cells,
+pd.read_excel lấy mẫu header, rồi pd.read_excel toàn bộ) với excel_reader.read_sheet
+(một lần duyệt read_only) và excel_reader.SheetStream (đọc theo khối, dùng cho file lớn)
+ở 10.000, 50.000 và 200.000 dòng. Mỗi lần đo chạy trong một tiến trình riêng để peak RSS
+không bị ảnh hưởng bởi lần đo trước.
+
+Chạy: python benchmarks/bench_excel_ingest.py [số dòng ...]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = [10000, 50000, 200000]
+MAX_SEARCH_ROWS = 50
+
+
+def make_workbook(path, rows):
+    """Tạo file mẫu: 2 dòng tiêu đề (có merge), header, rồi rows dòng học sinh"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Bảng điểm')
+    ws.merged_cells.add('A1:H1')
+    ws.append(['BẢNG ĐIỂM HỌC KỲ I'])
+    ws.append([])
+    ws.append(['STT', 'Mã định danh', 'Họ và tên', 'Ngày sinh', 'Giới tính', 'Mã đề', 'ĐĐGgk', 'Điểm'])
+    for i in range(rows):
+        ws.append([i + 1, f'HS{i:06d}', f'Nguyễn Văn {i}', '01/01/2008', 'Nam' if i % 2 else 'Nữ',
+                   str(701 + i % 4), 5 + (i % 50) / 10, None if i % 7 == 0 else (i % 100) / 10])
+    wb.save(path)
+
+
+def peak_rss_mb():
+    """Bộ nhớ đỉnh của tiến trình hiện tại (MB), None nếu không đo được"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024
+        except (ImportError, AttributeError):
+            return None
+
+
+def legacy_read(path):
+    import pandas as pd
+    from openpyxl import load_workbook
+    wb = load_workbook(path, data_only=True)
+    merged = list(wb.active.merged_cells.ranges)
+    wb.close()
+    headers = pd.read_excel(path, nrows=MAX_SEARCH_ROWS, engine='openpyxl')
+    return pd.read_excel(path, header=2, engine='openpyxl'), merged, headers
+
+
+def single_pass_read(path):
+    from excel_reader import read_sheet
+    sheet = read_sheet(path)
+    headers = sheet.header_sample(MAX_SEARCH_ROWS)
+    return sheet.to_frame(2), sheet.merged_ranges, headers
+
+
+def streaming_read(path):
+    from excel_reader import SheetStream
+    with SheetStream(path) as stream:
+        headers = stream.header_sample(MAX_SEARCH_ROWS)
+        frame = stream.read_frame(2)
+    return frame, stream.merged_ranges, headers
+
+
+READERS = {'legacy': legacy_read, 'single': single_pass_read, 'stream': streaming_read}
+
+
+def run_child(method, path):
+    """Chạy một lần đọc trong tiến trình con, trả về (giây, MB, số dòng)"""
+    output = subprocess.check_output([sys.executable, __file__, '--child', method, path], text=True)
+    seconds, rss, rows = output.strip().split()
+    return float(seconds), (float(rss) if rss != 'None' else None), int(rows)
+
+
+def child_main(method, path):
+    import pandas  # noqa: F401  (không tính thời gian import vào phép đo)
+    import openpyxl  # noqa: F401
+    reader = READERS[method]
+    start = time.perf_counter()
+    frame, _, _ = reader(path)
+    elapsed = time.perf_counter() - start
+    print(elapsed, peak_rss_mb(), len(frame))
+
+
+def format_rss(value):
+    return f"{value:.0f}" if value is not None else "n/a"
+
+
+def main(sizes):
+    print("Thời gian (s) / peak RSS (MB)")
+    print(f"{'Số dòng':>10} {'cũ':>16} {'1 lần':>16} {'theo luồng':>16} {'tăng tốc':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f'bench_{rows}.xlsx')
+            make_workbook(path, rows)
+            results = [run_child(method, path) for method in READERS]
+            assert all(count == rows for _, _, count in results)
+            cells = [f"{seconds:.2f} / {format_rss(rss)}" for seconds, rss, _ in results]
+            speedup = results[0][0] / min(seconds for seconds, _, _ in results[1:])
+            print(f"{rows:>10} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16} {speedup:>8.1f}x")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child_main(sys.argv[2], sys.argv[3])
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or SIZES)
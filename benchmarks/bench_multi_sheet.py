@@ -0,0 +1,64 @@
+"""
+Đo thời gian đọc nhiều sheet lớp tuần tự và song song (workbook_loader.read_sheets)
+
+Tạo một workbook gồm nhiều sheet (mỗi sheet là một lớp, có dòng tiêu đề và header) rồi đọc
+dữ liệu thô của tất cả sheet với 1, 2, 4... tiến trình, tới số lõi CPU của máy. Thời gian
+gồm cả chi phí tạo tiến trình spawn, nên với file nhỏ đọc tuần tự vẫn nhanh hơn (đó là lý do
+có ngưỡng PARALLEL_MIN_BYTES).
+
+Chạy: python benchmarks/bench_multi_sheet.py [số sheet] [số dòng mỗi sheet]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from workbook_loader import list_sources, read_sheets
+
+SHEETS = 30
+ROWS_PER_SHEET = 2000
+
+
+def make_workbook(path, sheets, rows):
+    """Mỗi sheet: dòng tiêu đề, header, rồi rows dòng học sinh"""
+    from openpyxl import Workbook
+    # Workbook thường (không write_only) ghi thẻ <dimension> như Excel; thiếu thẻ này
+    # load_workbook(read_only=True) phải quét mọi sheet mỗi lần mở
+    wb = Workbook()
+    wb.remove(wb.active)
+    for s in range(sheets):
+        ws = wb.create_sheet(f'10A{s + 1}')
+        ws.append([f'DANH SÁCH LỚP 10A{s + 1}'])
+        ws.append(['STT', 'Họ và tên', 'Giới tính', 'Mã đề', 'ĐĐGtx_1', 'ĐĐGtx_2', 'ĐĐGgk', 'ĐĐGck', 'Điểm'])
+        for i in range(rows):
+            ws.append([i + 1, f'Nguyễn Văn {s}-{i}', 'Nam' if i % 2 else 'Nữ', 701 + i % 4,
+                       (i % 11) * 0.5 + 5, (i % 7) + 3, (i % 9) + 1.5, (i % 5) * 2, None])
+    wb.save(path)
+
+
+def main(sheets, rows):
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, *[n for n in (2, 4, 8, 16) if n < cores], cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'khoi10.xlsx')
+        make_workbook(path, sheets, rows)
+        sources = [(file, index) for file, index, _ in list_sources([path])]
+        print(f"{sheets} sheet x {rows} dòng, file {os.path.getsize(path) / 1024 / 1024:.1f} MB, {cores} lõi CPU")
+
+        baseline = None
+        for workers in worker_counts:
+            started = time.perf_counter()
+            result = read_sheets(sources, max_workers=workers, min_parallel_bytes=0)
+            seconds = time.perf_counter() - started
+            assert sum(len(sheet.rows) - 2 for sheet in result) == sheets * rows
+            baseline = baseline or seconds
+            print(f"{workers:>3} tiến trình: {seconds:6.2f} s  ({baseline / seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else SHEETS, args[1] if len(args) > 1 else ROWS_PER_SHEET)
@@ -0,0 +1,65 @@
+"""
+Đo thời gian lưu lại cả bảng điểm theo từng định dạng (tabular_io.write_table)
+
+Ghi cùng một DataFrame ra .xlsx (to_excel), .csv UTF-8, .csv Windows-1258 dấu ';' như file
+xuất từ Excel tiếng Việt, và .parquet nếu có pyarrow/fastparquet. Đây là đường lưu của file
+không vá được từng ô (WorkbookPatcher, batch kind='file'), gồm cả bước ghi file tạm rồi đổi tên.
+
+Chạy: python benchmarks/bench_save_formats.py [số dòng ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from excel_writer import atomic_save
+from tabular_io import FORMAT_KEY, PARQUET_AVAILABLE, write_table
+
+SIZES = [1000, 10000, 50000]
+
+
+def make_frame(rows):
+    return pd.DataFrame({
+        'STT': range(1, rows + 1),
+        'Họ và tên': [f'Nguyễn Thị Ạnh {i}' for i in range(rows)],
+        'Mã đề': [str(701 + i % 4) for i in range(rows)],
+        'ĐĐGtx_1': [(i % 11) * 0.5 + 5 for i in range(rows)],
+        'Điểm': [None if i % 7 == 0 else (i % 100) / 10 for i in range(rows)],
+    })
+
+
+def timed_save(frame, path, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        atomic_save(path, lambda tmp: write_table(frame, tmp))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main(sizes):
+    targets = [('xlsx', 'lop.xlsx', None), ('csv utf-8', 'lop.csv', None),
+               ('csv cp1258', 'lop.csv', {'format': 'csv', 'encoding': 'cp1258',
+                                          'delimiter': ';', 'decimal': ','})]
+    if PARQUET_AVAILABLE:
+        targets.append(('parquet', 'lop.parquet', None))
+    print(f"{'Số dòng':>10}" + ''.join(f"{label:>13}" for label, _, _ in targets))
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            frame = make_frame(rows)
+            line = f"{rows:>10}"
+            for _, name, options in targets:
+                frame.attrs = {FORMAT_KEY: options} if options else {}
+                line += f"{timed_save(frame, os.path.join(tmp, name)) * 1000:>10.0f} ms"
+            print(line)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,118 @@
+"""
+Đo tốc độ tạo dữ liệu hiển thị cho danh sách học sinh
+
+So sánh cách cũ (iterrows + tô màu từng dòng) với format_display_rows (vector hóa)
+ở 200, 2.000 và 20.000 dòng. Nếu có màn hình, đo thêm thời gian chèn item vào
+ttk.Treeview: chèn rồi gán tag (2 lần gọi Tk) so với chèn kèm tag (1 lần gọi).
+
+Chạy: python benchmarks/bench_treeview.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_tree import format_display_rows
+
+SIZES = [200, 2000, 20000]
+REPEAT = 5
+
+
+def make_frame(rows):
+    """Tạo dữ liệu mẫu: họ tên, mã đề dạng chuỗi, điểm có ô trống"""
+    rng = np.random.default_rng(42)
+    scores = rng.uniform(0, 10, rows).round(2)
+    scores[rng.random(rows) < 0.2] = np.nan
+    return pd.DataFrame({
+        'Họ và tên': [f"Nguyễn Văn {i}" for i in range(rows)],
+        'Mã đề': rng.choice(['701', '702', '703', ''], rows),
+        'Điểm': scores
+    })
+
+
+def legacy_rows(df):
+    """Cách cũ: iterrows, định dạng từng ô, phân loại màu bằng if/else"""
+    rows = []
+    for _, row in df.iterrows():
+        values = []
+        for col in ['Họ và tên', 'Mã đề', 'Điểm']:
+            value = row[col]
+            if col == 'Điểm':
+                score_val = pd.to_numeric(value, errors='coerce')
+                values.append(f"{score_val:.2f}" if pd.notna(score_val) else 'Chưa có điểm')
+            else:
+                values.append(str(value) if pd.notna(value) else '')
+        score_value = row['Điểm']
+        if pd.notna(score_value):
+            score = float(score_value)
+            tag = 'low_score' if score < 5 else 'medium_score' if score < 7 else 'high_score'
+        else:
+            tag = 'no_score'
+        rows.append((values, tag))
+    return rows
+
+
+def vectorised_rows(df):
+    return format_display_rows(df, np.arange(len(df)), 'Họ và tên', 'Mã đề', 'Điểm')
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_formatting():
+    print("Định dạng dòng hiển thị (ms, tốt nhất trong %d lần)" % REPEAT)
+    print(f"{'Số dòng':>10} {'iterrows':>12} {'vector hóa':>12} {'tăng tốc':>10}")
+    for rows in SIZES:
+        df = make_frame(rows)
+        assert [list(v) for v, _ in vectorised_rows(df)] == [v for v, _ in legacy_rows(df)]
+        old = best_of(legacy_rows, df)
+        new = best_of(vectorised_rows, df)
+        print(f"{rows:>10} {old * 1000:>12.2f} {new * 1000:>12.2f} {old / new:>9.1f}x")
+
+
+def bench_tk_insert():
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception:
+        print("\nBỏ qua phần đo Treeview: không có màn hình")
+        return
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=('name', 'exam_code', 'score'), show='headings')
+
+    def insert_then_tag(rows):
+        tree.delete(*tree.get_children())
+        for values, tag in rows:
+            item_id = tree.insert('', 'end', values=values)
+            tree.item(item_id, tags=(tag,))
+
+    def insert_with_tag(rows):
+        tree.delete(*tree.get_children())
+        for values, tag in rows:
+            tree.insert('', 'end', values=values, tags=(tag,))
+
+    print("\nChèn item vào ttk.Treeview (ms)")
+    print(f"{'Số dòng':>10} {'chèn + gán tag':>15} {'chèn kèm tag':>14} {'tăng tốc':>10}")
+    for rows in SIZES:
+        formatted = vectorised_rows(make_frame(rows))
+        old = best_of(insert_then_tag, formatted)
+        new = best_of(insert_with_tag, formatted)
+        print(f"{rows:>10} {old * 1000:>15.2f} {new * 1000:>14.2f} {old / new:>9.1f}x")
+    root.destroy()
+
+
+if __name__ == '__main__':
+    bench_formatting()
+    bench_tk_insert()
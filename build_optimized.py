@@ -88,7 +88,19 @@ def check_source_code():
         "themes.py",
         "ui_utils.py",
         "version_utils.py",
-        "check_for_updates.py"
+        "check_for_updates.py",
+        "excel_writer.py",
+        "data_model.py",
+        "caching.py",
+        "virtual_tree.py",
+        "column_resolver.py",
+        "excel_reader.py",
+        "file_loader.py",
+        "dtype_planner.py",
+        "score_stats.py",
+        "refresh_scheduler.py",
+        "tabular_io.py",
+        "workbook_loader.py"
     ]
     
     try:
@@ -260,6 +272,18 @@ def build_executable(version, config_files):
         'ui_utils',
         'version_utils',
         'check_for_updates',
+        'excel_writer',
+        'data_model',
+        'caching',
+        'virtual_tree',
+        'column_resolver',
+        'excel_reader',
+        'file_loader',
+        'dtype_planner',
+        'score_stats',
+        'refresh_scheduler',
+        'tabular_io',
+        'workbook_loader',
         'openpyxl.cell',
         # pyparsing.testing được import trực tiếp bởi pyparsing.__init__ (phụ thuộc của matplotlib)
         'pyparsing.testing',
@@ -0,0 +1,547 @@
+"""
+Module chứa các lớp cache dùng trong ứng dụng (config, DataFrame, tìm kiếm, thống kê)
+
+Các cache phụ thuộc dữ liệu được khóa theo DataModel.version thay vì băm nội dung DataFrame.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (cần cho DataFrame.to_parquet)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class ConfigCache:
+    """Cache cho config file để tránh đọc file liên tục"""
+    _cache = None
+    _last_modified = None
+    
+    @classmethod
+    def get_config(cls, config_path):
+        """Lấy config từ cache hoặc đọc file nếu có thay đổi"""
+        try:
+            if not os.path.exists(config_path):
+                return None
+                
+            current_mtime = os.path.getmtime(config_path)
+            
+            if cls._cache is None or cls._last_modified != current_mtime:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    cls._cache = json.load(f)
+                cls._last_modified = current_mtime
+            
+            return cls._cache
+        except Exception as e:
+            print(f"Error getting config from cache: {e}")
+            return None
+    
+    @classmethod
+    def put(cls, config):
+        """Cập nhật cấu hình trong bộ nhớ (chưa ghi ra file)"""
+        cls._cache = config
+
+    @classmethod
+    def write_config(cls, config_path, config):
+        """
+        Ghi cấu hình ra file một cách nguyên tử: ghi vào file tạm cùng thư mục rồi os.replace,
+        nên file cấu hình không bao giờ bị ghi dở khi ứng dụng bị tắt giữa chừng
+        """
+        directory = os.path.dirname(os.path.abspath(config_path))
+        fd, temp_path = tempfile.mkstemp(prefix='.app_config_', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, config_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        cls._cache = config
+        cls._last_modified = os.path.getmtime(config_path)
+
+    @classmethod
+    def invalidate(cls):
+        """Xóa cache"""
+        cls._cache = None
+        cls._last_modified = None
+
+
+def copy_on_write_enabled():
+    """True nếu pandas dùng Copy-on-Write (luôn bật từ pandas 3.0, tùy chọn ở pandas 2.x)"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.options.mode.copy_on_write is True
+
+
+class DataFrameCache:
+    """
+    Cache cho DataFrame từ Excel files, giới hạn theo số file và tổng dung lượng bộ nhớ
+    
+    Dung lượng mỗi mục tính bằng memory_usage(deep=True) lúc lưu. Khi pandas dùng
+    Copy-on-Write, get/set chỉ tạo bản sao nông (không chép dữ liệu): sửa DataFrame trả về
+    sẽ tự tách khỏi bản trong cache. Nếu không có Copy-on-Write thì vẫn chép toàn bộ.
+    """
+    def __init__(self, max_size=3, max_bytes=None):
+        self.cache = OrderedDict()
+        self.sizes = {}
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _get_file_key(self, file_path):
+        """Tạo key duy nhất cho file dựa trên path và modification time"""
+        try:
+            if not os.path.exists(file_path):
+                return None
+            mtime = os.path.getmtime(file_path)
+            return f"{file_path}_{mtime}"
+        except:
+            return None
+    
+    @staticmethod
+    def _share(df):
+        """Bản sao nông nếu có Copy-on-Write, ngược lại chép toàn bộ"""
+        return df.copy(deep=not copy_on_write_enabled())
+    
+    def get(self, file_path):
+        """Lấy DataFrame từ cache"""
+        key = self._get_file_key(file_path)
+        if key and key in self.cache:
+            # Di chuyển key lên đầu (most recently used)
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self._share(self.cache[key])
+        self.misses += 1
+        return None
+    
+    def set(self, file_path, df):
+        """Lưu DataFrame vào cache"""
+        key = self._get_file_key(file_path)
+        if key is None:
+            return
+        
+        self._discard(key)
+        size = int(df.memory_usage(deep=True).sum())
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Một mình file này đã vượt ngân sách bộ nhớ
+        
+        self.cache[key] = self._share(df)
+        self.sizes[key] = size
+        self.total_bytes += size
+        self._evict()
+    
+    def _discard(self, key):
+        if key in self.cache:
+            del self.cache[key]
+            self.total_bytes -= self.sizes.pop(key)
+    
+    def _evict(self):
+        """Xóa các file lâu không dùng nhất khi vượt quá max_size hoặc max_bytes"""
+        while self.cache and (len(self.cache) > self.max_size or
+                              (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            key = next(iter(self.cache))
+            self._discard(key)
+            self.evictions += 1
+    
+    def resize(self, max_size=None, max_bytes=None):
+        """Đổi giới hạn (từ cài đặt) và loại bỏ các mục vượt quá ngay"""
+        if max_size is not None:
+            self.max_size = max_size
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self._evict()
+    
+    def stats(self):
+        """Số liệu cache để hiển thị trong phần cài đặt"""
+        return {
+            'entries': len(self.cache),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+    
+    def invalidate(self, file_path):
+        """Bỏ mọi bản cache của một file (mọi thời điểm sửa), VD khi file vừa được ghi lại"""
+        for key in [key for key in self.cache if key.rsplit('_', 1)[0] == file_path]:
+            self._discard(key)
+    
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        self.cache.clear()
+        self.sizes.clear()
+        self.total_bytes = 0
+
+
+def _write_atomic(path, write):
+    """Ghi file qua file tạm cùng thư mục rồi os.replace; write(temp_path) ghi nội dung"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.cache_', suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+MAX_CACHED_DIGESTS = 32
+
+
+def file_digest(file_path):
+    """
+    Băm nội dung file (hex), nhớ theo (đường dẫn, kích thước, thời điểm sửa) nên trong một
+    lần mở file các cache trên đĩa dùng chung một lần băm
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if memo_key in _digests:
+            _digests.move_to_end(memo_key)
+            return _digests[memo_key]
+    
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    
+    with _digests_lock:
+        _digests[memo_key] = digest.hexdigest()
+        while len(_digests) > MAX_CACHED_DIGESTS:
+            _digests.popitem(last=False)
+    return digest.hexdigest()
+
+
+class DiskFrameCache:
+    """
+    Cache DataFrame đã đọc và chuẩn hóa ra đĩa, giữ qua các lần mở ứng dụng
+    
+    Key là băm nội dung file Excel cộng các cấu hình ảnh hưởng tới kết quả đọc (dò header,
+    mẫu tên cột, tên cột), nên đổi tên/di chuyển file vẫn dùng lại được, còn sửa file hay
+    đổi cấu hình thì tự đọc lại. Dữ liệu lưu dạng Parquet khi có pyarrow, nếu không (hoặc
+    cột có kiểu Parquet không lưu được) thì dùng pickle. Tổng dung lượng bị giới hạn bởi
+    max_bytes, vượt quá thì xóa các mục lâu không dùng nhất (LRU).
+    """
+    FORMAT_VERSION = 2  # Tăng khi cách dò header hoặc dựng DataFrame thay đổi
+    INDEX_FILE = 'index.json'
+    
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+    
+    @classmethod
+    def make_key(cls, file_path, config):
+        """Key = băm nội dung file + các cấu hình đọc Excel liên quan"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(file_digest(file_path).encode('ascii'))
+        
+        excel_config = config.get('excel_reading', {})
+        settings = {
+            'format': cls.FORMAT_VERSION,
+            'header_detection': excel_config.get('header_detection'),
+            'column_patterns': excel_config.get('column_patterns'),
+            'merged_cell_handling': excel_config.get('merged_cell_handling'),
+            'streaming_threshold_mb': excel_config.get('performance', {}).get('streaming_threshold_mb'),
+            'columns': config.get('columns'),
+        }
+        digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+    
+    def _save_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        
+        def write(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                # Số kiểu numpy (vd. dòng header) được đổi về số Python
+                json.dump(self._index, f, ensure_ascii=False,
+                          default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        
+        _write_atomic(path, write)
+    
+    def _remove(self, key):
+        entry = self._index.pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError:
+                pass
+    
+    def get(self, key):
+        """Lấy DataFrame theo key, None nếu chưa có hoặc mục cache bị hỏng"""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            
+            path = os.path.join(self.directory, entry['file'])
+            try:
+                if entry['file'].endswith('.parquet'):
+                    df = pd.read_parquet(path)
+                else:
+                    df = pd.read_pickle(path)
+            except Exception as e:
+                print(f"Lỗi đọc cache trên đĩa, bỏ qua: {e}")
+                self._remove(key)
+                self._save_index()
+                return None
+            
+            df.attrs.update(entry.get('attrs', {}))
+            entry['last_used'] = time.time()
+            try:
+                self._save_index()
+            except OSError:
+                pass
+            return df
+    
+    def set(self, key, df):
+        """Lưu DataFrame vào cache, xóa các mục cũ nhất nếu vượt quá max_bytes"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            index = self._load_index()
+            self._remove(key)
+            
+            path = None
+            if PARQUET_AVAILABLE:
+                path = os.path.join(self.directory, key + '.parquet')
+                try:
+                    _write_atomic(path, lambda temp_path: df.to_parquet(temp_path, index=True))
+                except Exception:
+                    # Cột kiểu hỗn hợp (số lẫn chữ) không ghi được Parquet
+                    path = None
+            if path is None:
+                path = os.path.join(self.directory, key + '.pkl')
+                _write_atomic(path, lambda temp_path: df.to_pickle(temp_path))
+            
+            index[key] = {
+                'file': os.path.basename(path),
+                'size': os.path.getsize(path),
+                'last_used': time.time(),
+                'attrs': dict(df.attrs),
+            }
+            self._evict()
+            self._save_index()
+    
+    def _evict(self):
+        """Xóa các mục lâu không dùng nhất cho tới khi tổng dung lượng <= max_bytes"""
+        by_age = sorted(self._index, key=lambda k: self._index[k]['last_used'])
+        total = sum(entry['size'] for entry in self._index.values())
+        # Luôn giữ mục mới nhất, kể cả khi một mình nó vượt giới hạn
+        for key in by_age[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= self._index[key]['size']
+            self._remove(key)
+    
+    def total_bytes(self):
+        """Tổng dung lượng các mục đang lưu"""
+        with self._lock:
+            return sum(entry['size'] for entry in self._load_index().values())
+    
+    def clear(self):
+        """Xóa toàn bộ cache trên đĩa"""
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                self._remove(key)
+            if os.path.isdir(self.directory):
+                self._save_index()
+
+
+class MergedRangesCache:
+    """
+    Cache vùng merged cells ở phần header của từng sheet, lưu trên đĩa (một file JSON)
+    
+    Key là băm nội dung file + vị trí sheet + số dòng được dò, nên mở lại file lớn (đọc theo
+    luồng) không phải giải nén lại XML của sheet để tìm <mergeCells>. Giữ tối đa max_entries
+    mục, bỏ các mục lâu không dùng nhất.
+    """
+    FILE = 'merged_ranges.json'
+    
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = None
+    
+    @staticmethod
+    def make_key(file_path, sheet_index, max_row):
+        return f"{file_digest(file_path)}:{sheet_index}:{max_row}"
+    
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(os.path.join(self.directory, self.FILE), 'r', encoding='utf-8') as f:
+                    self._entries = OrderedDict(json.load(f))
+            except (OSError, ValueError, TypeError):
+                self._entries = OrderedDict()
+        return self._entries
+    
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        
+        def write(temp_path):
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self._entries.items()), f)
+        
+        _write_atomic(os.path.join(self.directory, self.FILE), write)
+    
+    def get(self, key):
+        """Danh sách vùng (min_row, min_col, max_row, max_col), None nếu chưa có"""
+        with self._lock:
+            entries = self._load()
+            ranges = entries.get(key)
+            if ranges is None:
+                return None
+            entries.move_to_end(key)
+            return [tuple(bounds) for bounds in ranges]
+    
+    def set(self, key, ranges):
+        """Lưu các vùng merge của một sheet"""
+        with self._lock:
+            entries = self._load()
+            entries[key] = [list(bounds) for bounds in ranges]
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._save()
+    
+    def clear(self):
+        """Xóa toàn bộ cache vùng merge"""
+        with self._lock:
+            self._entries = OrderedDict()
+            try:
+                os.remove(os.path.join(self.directory, self.FILE))
+            except OSError:
+                pass
+
+
+class SearchCache:
+    """Cache cho kết quả search (lưu vị trí dòng khớp với từ khóa, không lưu DataFrame)"""
+    def __init__(self):
+        self.cache = {}
+        self.data_version = None
+    
+    def clear_if_data_changed(self, version):
+        """Xóa cache nếu phiên bản dữ liệu (DataModel.version) thay đổi"""
+        if version != self.data_version:
+            self.cache.clear()
+            self.data_version = version
+    
+    def get(self, query):
+        """Lấy vị trí các dòng khớp với từ khóa từ cache"""
+        return self.cache.get(query.lower())
+    
+    def set(self, query, results):
+        """Lưu vị trí các dòng khớp với từ khóa vào cache"""
+        self.cache[query.lower()] = results
+    
+    def clear(self):
+        """Xóa toàn bộ cache"""
+        self.cache.clear()
+        self.data_version = None
+
+
+class StatsCache:
+    """Cache cho statistics calculations"""
+    def __init__(self):
+        self.stats = None
+        self.df_version = None
+    
+    def get_stats(self, df, version, force_recalc=False):
+        """Lấy stats từ cache hoặc tính lại nếu phiên bản dữ liệu thay đổi"""
+        if force_recalc or self.stats is None or self.df_version != version:
+            self.stats = self._calculate_stats(df)
+            self.df_version = version
+        
+        return self.stats
+    
+    def _calculate_stats(self, df):
+        """Tính toán statistics"""
+        try:
+            if df is None or len(df) == 0:
+                return {
+                    'total': 0,
+                    'scored': 0,
+                    'mean': 0,
+                    'max': 0,
+                    'min': 0
+                }
+            
+            score_col = None
+            for col in ['Điểm', 'score', 'Score']:
+                if col in df.columns:
+                    score_col = col
+                    break
+            
+            if score_col is None:
+                return {'total': len(df), 'scored': 0, 'mean': 0, 'max': 0, 'min': 0}
+            
+            scores = df[score_col].dropna()
+            return {
+                'total': len(df),
+                'scored': len(scores),
+                'mean': float(scores.mean()) if len(scores) > 0 else 0,
+                'max': float(scores.max()) if len(scores) > 0 else 0,
+                'min': float(scores.min()) if len(scores) > 0 else 0
+            }
+        except Exception as e:
+            print(f"Error calculating stats: {e}")
+            return {'total': 0, 'scored': 0, 'mean': 0, 'max': 0, 'min': 0}
+    
+    def clear(self):
+        """Xóa cache"""
+        self.stats = None
+        self.df_version = None
+
+
+class VersionedCache:
+    """Cache các kết quả tính toán (điểm cao/thấp nhất, phân loại, biểu đồ) theo phiên bản dữ liệu"""
+    def __init__(self):
+        self.entries = {}
+        self.data_version = None
+    
+    def get(self, key, version, compute):
+        """Lấy kết quả theo key, tính lại bằng compute() nếu phiên bản dữ liệu thay đổi"""
+        if version != self.data_version:
+            self.entries.clear()
+            self.data_version = version
+        if key not in self.entries:
+            self.entries[key] = compute()
+        return self.entries[key]
+    
+    def clear(self):
+        """Xóa cache"""
+        self.entries.clear()
+        self.data_version = None
@@ -0,0 +1,434 @@
+"""
+Module tìm cột dữ liệu theo tên logic (tên học sinh, mã đề, điểm...) với kết quả được cache
+
+Các pattern trong excel_reading.column_patterns được biên dịch một lần cho mỗi phiên bản
+cấu hình thành một ColumnMatcher dùng chung cho cả ba việc: tìm cột (ColumnResolver),
+phân loại tên cột (match_column_pattern) và chấm điểm dòng header (score_header_row).
+Mọi pattern được gộp thành một regex alternation trên chuỗi đã chuẩn hóa (NFC, chữ thường)
+để lọc nhanh các tên cột và dòng không chứa từ khóa nào. Kết quả tìm cột được lưu theo danh sách cột
+(schema) và chỉ bị xóa khi cấu hình thay đổi.
+"""
+
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Các cách gọi khác của tên cột (dùng khi không khớp pattern trong config)
+NAME_VARIATIONS = {
+    'tên học sinh': ['họ và tên', 'họ tên', 'tên', 'học sinh'],
+    'họ và tên': ['họ và tên', 'họ tên', 'tên', 'học sinh', 'tên học sinh'],
+    'mã đề': ['mã', 'đề', 'số đề', 'mã số đề', 'exam code'],
+    'điểm': ['điểm số', 'số điểm', 'point', 'score'],
+    'đđgck': ['đđgck', 'điểm ck', 'điểm cuối kỳ', 'ck', 'cuối kỳ'],
+    'đđggk': ['đđggk', 'điểm gk', 'điểm giữa kỳ', 'gk', 'giữa kỳ'],
+    'đđgtx': ['đđgtx', 'điểm tx', 'điểm thường xuyên', 'tx', 'thường xuyên'],
+    'đtbmhki': ['đtbmhki', 'đtb hk1', 'điểm tb', 'điểm trung bình']
+}
+
+# Từ khóa dò dòng header ngoài pattern trong config, kèm trọng số:
+# thông tin học sinh 3, cột điểm 2, thông tin khác 1
+HEADER_KEYWORDS = {
+    'họ và tên': 3, 'tên học sinh': 3, 'tên': 3, 'họ tên': 3, 'học sinh': 3,
+    'mã số': 3, 'mssv': 3, 'mã định danh': 3, 'stt': 3, 'số tt': 3,
+    'điểm': 2, 'đđgtx': 2, 'đđggk': 2, 'đđgck': 2, 'đtb': 2, 'score': 2, 'tx': 2, 'gk': 2, 'ck': 2,
+    'ngày sinh': 1, 'giới tính': 1, 'phái': 1, 'lớp': 1, 'khối': 1
+}
+GROUP_WEIGHTS = {'student_info': 3, 'score_columns': 2}
+
+MAX_CACHED_SCHEMAS = 64
+MAX_CACHED_NAMES = 4096
+MAX_HEADER_DEPTH = 3  # Số dòng header tối đa (header nhiều cấp)
+
+# Ô chuỗi chỉ có khoảng trắng trong dòng đã ghép bằng \x1f
+_BLANK_CELL = re.compile(r'(?:^|\x1f)\s*(?:\x1f|$)')
+
+
+def normalize_header(value):
+    """Chuẩn hóa tên cột để so khớp: bỏ khoảng trắng hai đầu, chữ thường, dạng NFC"""
+    text = str(value).strip().lower()
+    return text if text.isascii() else unicodedata.normalize('NFC', text)
+
+
+def _display_text(value):
+    """Tên cột giữ nguyên hoa/thường (dạng NFC) để so với regex trong config"""
+    text = str(value).strip()
+    return text if text.isascii() else unicodedata.normalize('NFC', text)
+
+
+def _alternation(words):
+    """Regex khớp một trong các từ, ưu tiên từ dài hơn"""
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+class PatternField:
+    """Một trường trong column_patterns (VD: student_info.name) đã được biên dịch"""
+
+    def __init__(self, group, name, field_config):
+        self.group = group
+        self.name = name
+        self.config = field_config
+        self.originals = [pattern for pattern in field_config.get('patterns', []) if str(pattern).strip()]
+        self.patterns = tuple(normalize_header(pattern) for pattern in self.originals)
+        self.regex = None
+        if field_config.get('regex'):
+            try:
+                self.regex = re.compile(field_config['regex'], re.IGNORECASE)
+            except re.error as e:
+                print(f"Regex không hợp lệ trong cấu hình cột: {e}")
+
+    def match(self, text, display):
+        """
+        So khớp tên cột đã chuẩn hóa (text) và tên gốc (display) với trường này
+
+        Returns:
+            tuple | None: (pattern khớp, match object của regex hoặc None)
+        """
+        for original, pattern in zip(self.originals, self.patterns):
+            if pattern in text or text in pattern:
+                return original, None
+        if self.regex is not None:
+            match = self.regex.match(display)
+            if match:
+                return self.config['regex'], match
+        return None
+
+    def describe(self, matched_pattern, match):
+        """Thông tin trả về cho match_column_pattern"""
+        if self.group == 'student_info':
+            return {
+                'type': 'student_info',
+                'field': self.name,
+                'matched_pattern': matched_pattern,
+                'required': self.config.get('required', False)
+            }
+        result = {
+            'type': 'score',
+            'score_type': self.name,
+            'matched_pattern': matched_pattern,
+            'has_sub_columns': self.config.get('has_sub_columns', False),
+            'description': self.config.get('description', '')
+        }
+        # Số thứ tự cột con (VD: ĐĐGtx 2) nếu regex có nhóm
+        if match is not None and match.groups():
+            result['sub_column'] = match.group(len(match.groups()))
+        return result
+
+
+class ColumnMatcher:
+    """
+    Các pattern của column_patterns đã biên dịch (tạo lại khi cấu hình thay đổi)
+
+    - match(name): trường đầu tiên (theo thứ tự trong config) khớp với tên cột
+    - classify_row(values): phân loại mọi ô của một dòng header
+    - score_row(values): điểm khả năng một dòng là header, một lần quét cả dòng
+    - detect_header(rows): dòng header, số dòng header và độ tin cậy trên cả vùng dò
+    """
+
+    def __init__(self, config):
+        patterns_config = (config or {}).get('excel_reading', {}).get('column_patterns', {})
+        self.fields = []
+        self._fields_by_target = {}
+        weights = dict(HEADER_KEYWORDS)
+        for group in ('student_info', 'score_columns'):
+            for name, field_config in patterns_config.get(group, {}).items():
+                field = PatternField(group, name, field_config)
+                index = len(self.fields)
+                self.fields.append(field)
+                for pattern in field.patterns:
+                    targets = self._fields_by_target.setdefault(pattern, [])
+                    if index not in targets:
+                        targets.append(index)
+                    weights[pattern] = max(weights.get(pattern, 0), GROUP_WEIGHTS[group])
+
+        # Lọc nhanh trước khi thử từng trường: tên chứa một pattern, nằm trong một pattern,
+        # hoặc khớp một regex
+        patterns = [pattern for field in self.fields for pattern in field.patterns]
+        self._pattern_re = re.compile(_alternation(patterns)) if patterns else None
+        self._joined_patterns = '\x00'.join(patterns)
+        self._regex_filter = None
+        regexes = [field.regex.pattern for field in self.fields if field.regex is not None]
+        if regexes:
+            try:
+                self._regex_filter = re.compile('|'.join(f'(?:{regex})' for regex in regexes), re.IGNORECASE)
+            except re.error:
+                self._regex_filter = False  # không gộp được: thử từng regex
+
+        self._keywords = list(weights)
+        self._keyword_index = {keyword: index for index, keyword in enumerate(self._keywords)}
+        self._keyword_weights = np.array([weights[keyword] for keyword in self._keywords], dtype=float)
+        self._keyword_re = re.compile(_alternation(weights))
+        self._names = {}
+
+    def fields_for(self, target):
+        """Các trường có target (đã chuẩn hóa) là một trong các pattern"""
+        return [self.fields[index] for index in self._fields_by_target.get(target, [])]
+
+    def _classify(self, value):
+        """(trường, pattern khớp, match object) cho một tên cột, None nếu không khớp"""
+        key = value if isinstance(value, str) else str(value)
+        if key in self._names:
+            return self._names[key]
+
+        text = normalize_header(key)
+        display = _display_text(key)
+        result = None
+        if text and ((self._pattern_re is not None and self._pattern_re.search(text))
+                     or text in self._joined_patterns
+                     or self._regex_filter is False
+                     or (self._regex_filter is not None and self._regex_filter.match(display))):
+            for field in self.fields:
+                matched = field.match(text, display)
+                if matched:
+                    result = (field,) + matched
+                    break
+
+        if len(self._names) >= MAX_CACHED_NAMES:
+            self._names.clear()
+        self._names[key] = result
+        return result
+
+    def match(self, column_name):
+        """Thông tin pattern khớp với tên cột (dict như match_column_pattern), None nếu không khớp"""
+        result = self._classify(column_name)
+        if result is None:
+            return None
+        field, matched_pattern, match = result
+        return field.describe(matched_pattern, match)
+
+    def classify_row(self, values):
+        """Tên trường khớp với từng ô của dòng (None cho ô trống hoặc không khớp)"""
+        names = []
+        for value in values:
+            result = None if _is_blank(value) else self._classify(value)
+            names.append(result[0].name if result else None)
+        return names
+
+    def score_row(self, values):
+        """
+        Điểm khả năng một dòng là header: tổng trọng số các từ khóa/pattern xuất hiện trong
+        dòng (mỗi từ tính một lần) cộng 0.5 cho mỗi ô không trống
+        """
+        return self.score_rows([[np.nan if value is None else value for value in values]])[0]
+
+    def score_rows(self, rows):
+        """score_row cho nhiều dòng (VD: cả vùng dò header, mảng 2 chiều dtype object)"""
+        values = np.asarray(rows, dtype=object)
+        if values.ndim != 2 or values.size == 0:
+            return [0] * len(values)
+        filled, hits = self._window_matrices(values)
+        return self._scores(filled, hits).tolist()
+
+    def _window_matrices(self, values):
+        """
+        Ma trận ô không trống (dòng × cột) và ma trận từ khóa xuất hiện (dòng × từ khóa)
+
+        Ô trống là NaN (như header_sample) và được đánh dấu bằng một phép so sánh trên cả vùng;
+        chỉ các ô chuỗi mới được ghép lại và quét bằng regex từ khóa, nên các ô số (phần lớn
+        vùng dữ liệu) gần như không tốn thêm gì. Dòng có từ khóa được kiểm tra lại từng từ khóa
+        vì findall bỏ qua các từ khóa lồng nhau hoặc chồng lên nhau (VD: 'tx' trong 'đđgtx').
+        """
+        filled = _filled_matrix(values)
+        hits = np.zeros((values.shape[0], len(self._keywords)), dtype=bool)
+        for i, row in enumerate(values.tolist()):
+            texts = [value for value in row if type(value) is str]
+            if not texts:
+                continue
+            joined = '\x1f'.join(texts)
+            if _BLANK_CELL.search(joined):
+                filled[i] &= [not (type(value) is str and not value.strip()) for value in row]
+            row_text = normalize_header(joined)
+            if self._keyword_re.search(row_text):
+                hits[i] = [keyword in row_text for keyword in self._keywords]
+        return filled, hits
+
+    def _scores(self, filled, hits):
+        return hits @ self._keyword_weights + filled.sum(axis=1) * 0.5
+
+    def detect_header(self, rows, min_columns_match=3, validate=True, multi_level=True,
+                      merged_ranges=None, max_depth=MAX_HEADER_DEPTH):
+        """
+        Dò dòng header, số dòng header và độ tin cậy trên vùng các dòng đầu sheet
+
+        Args:
+            rows: Các dòng đầu sheet (mảng 2 chiều, ô trống là NaN), dòng i là dòng Excel i + 1
+            min_columns_match (int): Số từ khóa cột cần khớp để tin chắc là header
+            validate (bool): Nếu dòng ngay dưới gần như trống thì header là dòng đó
+            multi_level (bool): Cho phép header nhiều dòng
+            merged_ranges: Các vùng merge (min_row, min_col, max_row, max_col) 1-based,
+                None nếu chưa biết (khi đó chỉ dựa vào nội dung các dòng)
+            max_depth (int): Số dòng header tối đa
+
+        Returns:
+            dict: header_row (0-based), header_depth, confidence (0-1), scores (theo dòng)
+        """
+        values = np.asarray(rows, dtype=object)
+        if values.ndim != 2 or values.size == 0:
+            return {'header_row': 0, 'header_depth': 1, 'confidence': 0.0, 'scores': []}
+
+        filled, hits = self._window_matrices(values)
+        scores = self._scores(filled, hits)
+        header_row = int(np.argmax(scores)) if scores.max() > 0 else 0
+        matched = int(hits[header_row].sum())
+
+        # Dòng tiếp theo phải có dữ liệu; quá ít ô thì header thực sự là dòng đó
+        if validate and header_row < len(values) - 1 and filled[header_row + 1].sum() < 2:
+            header_row += 1
+
+        depth = 1
+        if multi_level:
+            depth = self._header_depth(values, filled, header_row, merged_ranges, max_depth)
+
+        confidence = min(1.0, matched / max(min_columns_match, 1))
+        return {'header_row': header_row, 'header_depth': depth,
+                'confidence': round(confidence, 2), 'scores': scores.tolist()}
+
+    def _header_depth(self, values, filled, header_row, merged_ranges, max_depth):
+        """
+        Số dòng header: dòng bên dưới là phần tiếp của header nếu để trống ở mọi cột thông
+        tin học sinh (STT, họ tên... thường merge dọc) nhưng có ô ở cột khác (VD: TX 1, 2, 3)
+        và, khi biết vùng merge, có một vùng merge của header kéo xuống hoặc trải ngang phía trên.
+        """
+        info_columns = [col for col, value in enumerate(values[header_row].tolist())
+                        if type(value) is str and self._is_student_info(value)]
+        if not info_columns:
+            return 1
+
+        depth = 1
+        last_row = min(len(values), header_row + max_depth)
+        for row in range(header_row + 1, last_row):
+            if filled[row, info_columns].any() or not filled[row].any():
+                break
+            if merged_ranges is not None and not _merge_reaches(merged_ranges, header_row, row):
+                break
+            depth += 1
+        return depth
+
+    def _is_student_info(self, value):
+        result = self._classify(value)
+        return result is not None and result[0].group == 'student_info'
+
+
+def _merge_reaches(merged_ranges, header_row, row):
+    """Có vùng merge bắt đầu trong các dòng header (0-based) kéo xuống dòng row hoặc trải ngang ngay trên nó"""
+    first, target = header_row + 1, row + 1  # dòng Excel 1-based
+    for min_row, min_col, max_row, max_col in merged_ranges:
+        if first <= min_row < target and (max_row >= target or (min_row == target - 1 and max_col > min_col)):
+            return True
+    return False
+
+
+def _filled_matrix(values):
+    """Ma trận True ở các ô không phải NaN của mảng 2 chiều dtype object"""
+    try:
+        # NaN là giá trị duy nhất khác chính nó; so sánh cả mảng nhanh hơn pd.isna từng ô
+        return np.asarray(values == values, dtype=bool)
+    except (TypeError, ValueError):
+        return ~pd.isna(values)
+
+
+def _is_blank(value):
+    """Ô trống: None, NaN hoặc chuỗi chỉ có khoảng trắng"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    return value != value  # NaN
+
+
+class ColumnResolver:
+    """
+    Ánh xạ tên cột logic → tên cột thực trong DataFrame
+
+    - Pattern/regex được biên dịch một lần cho mỗi cấu hình (matcher)
+    - Kết quả được cache theo (danh sách cột, tên cần tìm)
+    - Gọi invalidate() khi cấu hình cột thay đổi
+    - An toàn khi gọi từ luồng đọc file nền
+    """
+
+    def __init__(self):
+        self._matcher = None
+        self._results = {}
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        """Xóa pattern đã biên dịch và toàn bộ kết quả (khi cấu hình thay đổi)"""
+        with self._lock:
+            self._matcher = None
+            self._results.clear()
+
+    def matcher(self, config):
+        """ColumnMatcher của cấu hình hiện tại (biên dịch lần đầu khi cần)"""
+        with self._lock:
+            if self._matcher is None:
+                self._matcher = ColumnMatcher(config)
+            return self._matcher
+
+    def resolve(self, columns, target_name, config):
+        """
+        Tìm cột khớp nhất với target_name
+
+        Args:
+            columns: Danh sách cột của DataFrame
+            target_name (str): Tên cột cần tìm (VD: 'Tên Học Sinh', 'Điểm')
+            config (dict): Cấu hình ứng dụng (dùng excel_reading.column_patterns)
+
+        Returns:
+            Tên cột thực hoặc None
+        """
+        columns = tuple(columns)
+        target_lower = normalize_header(target_name)
+        key = (columns, target_lower)
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+
+            matcher = self.matcher(config)
+            if len(self._results) >= MAX_CACHED_SCHEMAS * 8:
+                self._results.clear()
+
+            result = self._find(matcher, columns, target_lower)
+            self._results[key] = result
+            return result
+
+    def mapping(self, columns, config):
+        """Ánh xạ các khóa trong config['columns'] (name, exam_code, score...) → cột thực"""
+        result = {}
+        for key, configured_name in config.get('columns', {}).items():
+            if configured_name and configured_name.strip():
+                matched = self.resolve(columns, configured_name, config)
+                if matched:
+                    result[key] = matched
+        return result
+
+    @staticmethod
+    def _find(matcher, columns, target_lower):
+        normalized = [normalize_header(col) for col in columns]
+
+        # Direct match first (case insensitive)
+        for col, col_lower in zip(columns, normalized):
+            if col_lower == target_lower:
+                return col
+
+        # Pattern trong config: cột khớp với một trong các trường mà target_name thuộc về
+        fields = matcher.fields_for(target_lower)
+        if fields:
+            for col, col_lower in zip(columns, normalized):
+                display = _display_text(col)
+                for field in fields:
+                    if field.match(col_lower, display):
+                        return col
+
+        # Fallback to old variations
+        for col, col_lower in zip(columns, normalized):
+            for key, variations in NAME_VARIATIONS.items():
+                if target_lower == key or target_lower in variations:
+                    if any(var in col_lower for var in variations):
+                        return col
+                    # Partial match
+                    if any(col_lower in var or var in col_lower for var in variations):
+                        return col
+
+        return None
@@ -0,0 +1,431 @@
+"""
+Module quản lý dữ liệu học sinh: chỉ mục tra cứu dòng, tìm kiếm tên, phiên bản dữ liệu và lịch sử hoàn tác
+"""
+
+import bisect
+import sys
+import unicodedata
+from datetime import datetime
+
+import pandas as pd
+
+from dtype_planner import set_value
+
+
+def fold_text(value):
+    """
+    Chuẩn hóa chuỗi để tìm kiếm: chữ thường, bỏ dấu tiếng Việt, gộp khoảng trắng
+
+    Ví dụ: "Nguyễn  Văn Đức" → "nguyen van duc"
+    """
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFD', str(value).lower())
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return ' '.join(text.replace('đ', 'd').split())
+
+
+class NameSearchIndex:
+    """
+    Chỉ mục n-gram (1 đến 3 ký tự) trên tên đã bỏ dấu
+
+    - Truy vấn ngắn (≤ 3 ký tự): tra trực tiếp một n-gram
+    - Truy vấn dài: lấy tập ứng viên nhỏ nhất theo trigram rồi kiểm tra chuỗi con
+    """
+
+    MAX_GRAM = 3
+
+    def __init__(self):
+        self.texts = []
+        self.grams = {}
+
+    def _grams_of(self, text):
+        """Tập các n-gram của chuỗi đã chuẩn hóa"""
+        result = set()
+        for size in range(1, self.MAX_GRAM + 1):
+            for start in range(len(text) - size + 1):
+                result.add(text[start:start + size])
+        return result
+
+    def _add(self, position, text):
+        for gram in self._grams_of(text):
+            self.grams.setdefault(gram, set()).add(position)
+
+    def rebuild(self, values):
+        """Xây dựng lại chỉ mục từ danh sách tên theo thứ tự dòng"""
+        self.texts = [fold_text(value) for value in values]
+        self.grams = {}
+        for position, text in enumerate(self.texts):
+            self._add(position, text)
+
+    def append(self, value):
+        """Thêm tên của một dòng mới ở cuối"""
+        self.texts.append(fold_text(value))
+        self._add(len(self.texts) - 1, self.texts[-1])
+
+    def update(self, position, value):
+        """Cập nhật tên của dòng ở vị trí position"""
+        for gram in self._grams_of(self.texts[position]):
+            rows = self.grams.get(gram)
+            if rows is not None:
+                rows.discard(position)
+                if not rows:
+                    del self.grams[gram]
+        self.texts[position] = fold_text(value)
+        self._add(position, self.texts[position])
+
+    def find(self, query):
+        """
+        Tìm các dòng có tên chứa query (không phân biệt hoa thường, dấu)
+
+        Returns:
+            list: Vị trí dòng theo thứ tự tăng dần
+        """
+        query = fold_text(query)
+        if not query:
+            return list(range(len(self.texts)))
+        if len(query) <= self.MAX_GRAM:
+            return sorted(self.grams.get(query, ()))
+
+        candidates = None
+        for start in range(len(query) - self.MAX_GRAM + 1):
+            rows = self.grams.get(query[start:start + self.MAX_GRAM])
+            if not rows:
+                return []
+            if candidates is None or len(rows) < len(candidates):
+                candidates = rows
+        return sorted(pos for pos in candidates if query in self.texts[pos])
+
+
+class RowIndex:
+    """
+    Chỉ mục tra cứu vị trí dòng trong DataFrame với độ phức tạp O(1)
+
+    - Tên học sinh → danh sách vị trí dòng (hỗ trợ trùng tên)
+    - Mã học sinh (nếu có) → vị trí dòng
+    - Treeview item id → vị trí dòng, để thao tác chỉnh sửa đúng dòng được chọn
+    - Chỉ mục n-gram cho tìm kiếm tên không dấu
+    """
+
+    def __init__(self):
+        self.name_col = None
+        self.id_col = None
+        self.by_name = {}
+        self.by_id = {}
+        self.by_item = {}
+        self.row_count = 0
+        self.keys = []
+        self.names = NameSearchIndex()
+
+    @staticmethod
+    def _key(value):
+        """Chuẩn hóa giá trị dùng làm khóa tra cứu"""
+        if value is None:
+            return ''
+        try:
+            if pd.isna(value):
+                return ''
+        except (TypeError, ValueError):
+            pass
+        return str(value).strip()
+
+    def rebuild(self, df, name_col, id_col=None):
+        """
+        Xây dựng lại chỉ mục (chỉ cần khi cấu trúc dòng thay đổi: tải file, thêm dòng, undo...)
+
+        Args:
+            df (DataFrame): Dữ liệu hiện tại
+            name_col (str): Tên cột họ tên
+            id_col (str, optional): Tên cột mã học sinh
+        """
+        self.name_col = name_col
+        self.id_col = id_col if id_col in getattr(df, 'columns', []) else None
+        self.by_name = {}
+        self.by_id = {}
+        self.by_item = {}
+        self.row_count = 0
+        self.keys = []
+        self.names = NameSearchIndex()
+        if df is None or name_col not in df.columns:
+            return
+
+        self.keys = [self._key(value) for value in df[name_col].tolist()]
+        for pos, key in enumerate(self.keys):
+            self.by_name.setdefault(key, []).append(pos)
+        self.names.rebuild(self.keys)
+        if self.id_col:
+            for pos, value in enumerate(df[self.id_col].tolist()):
+                key = self._key(value)
+                if key:
+                    self.by_id.setdefault(key, pos)
+        self.row_count = len(df)
+
+    def append_row(self, name, student_id=None):
+        """Cập nhật chỉ mục khi thêm một dòng mới vào cuối DataFrame"""
+        pos = self.row_count
+        self.keys.append(self._key(name))
+        self.by_name.setdefault(self.keys[pos], []).append(pos)
+        self.names.append(self.keys[pos])
+        if student_id is not None and self._key(student_id):
+            self.by_id.setdefault(self._key(student_id), pos)
+        self.row_count += 1
+        return pos
+
+    def update_name(self, position, name):
+        """Cập nhật chỉ mục khi tên của một dòng thay đổi"""
+        old_positions = self.by_name.get(self.keys[position], [])
+        if position in old_positions:
+            old_positions.remove(position)
+            if not old_positions:
+                del self.by_name[self.keys[position]]
+        self.keys[position] = self._key(name)
+        bisect.insort(self.by_name.setdefault(self.keys[position], []), position)
+        self.names.update(position, self.keys[position])
+
+    def contains_name(self, name):
+        """Kiểm tra tên đã tồn tại chưa"""
+        return bool(self.by_name.get(self._key(name)))
+
+    def find(self, query):
+        """Tìm vị trí các dòng có tên chứa query (không phân biệt hoa thường, dấu)"""
+        return self.names.find(query)
+
+    def positions_for_name(self, name):
+        """Trả về danh sách vị trí dòng có tên này"""
+        return list(self.by_name.get(self._key(name), []))
+
+    def position_for_id(self, student_id):
+        """Trả về vị trí dòng có mã học sinh này hoặc None"""
+        return self.by_id.get(self._key(student_id))
+
+    def clear_items(self):
+        """Xóa ánh xạ treeview item (gọi khi treeview được làm mới)"""
+        self.by_item = {}
+
+    def bind_item(self, item_id, position):
+        """Ghi nhận treeview item hiển thị dòng ở vị trí position"""
+        self.by_item[item_id] = int(position)
+
+    def position_for_item(self, item_id, fallback_name=None):
+        """
+        Tìm vị trí dòng cho treeview item được chọn
+
+        Args:
+            item_id: Id của item trong treeview
+            fallback_name: Tên hiển thị, dùng khi item không có trong chỉ mục
+
+        Returns:
+            int | None: Vị trí dòng hoặc None nếu không tìm thấy
+        """
+        position = self.by_item.get(item_id)
+        if position is not None and position < self.row_count:
+            return position
+        if fallback_name is not None:
+            positions = self.positions_for_name(fallback_name)
+            if positions:
+                return positions[0]
+        return None
+
+
+class DataModel:
+    """
+    Đối tượng trung tâm giữ DataFrame hiện tại và phiên bản dữ liệu
+
+    Mọi thay đổi (tải file, nhập điểm, thêm học sinh, hoàn tác/làm lại, phục hồi)
+    đều đi qua DataModel để tăng version. Các cache dùng version làm khóa nên
+    không bao giờ trả về kết quả cũ sau khi dữ liệu thay đổi.
+
+    - version: tăng sau mọi thay đổi
+    - structure_version: chỉ tăng khi tập dòng thay đổi (dùng cho cache tìm kiếm theo tên)
+
+    Các listener (add_listener) được gọi sau mỗi thay đổi với danh sách ô đã đổi
+    (vị trí dòng, tên cột, giá trị cũ, giá trị mới), hoặc None nếu dữ liệu bị thay toàn bộ.
+    """
+
+    def __init__(self):
+        self.df = None
+        self.version = 0
+        self.structure_version = 0
+        self.row_index = RowIndex()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Đăng ký callback(model, cells) nhận thông báo thay đổi dữ liệu"""
+        self._listeners.append(callback)
+
+    def _notify(self, cells):
+        for callback in self._listeners:
+            callback(self, cells)
+
+    def replace(self, df):
+        """Thay toàn bộ dữ liệu (tải file, thêm dòng, hoàn tác, phục hồi)"""
+        self.df = df
+        self.version += 1
+        self.structure_version += 1
+        self._notify(None)
+        return self.version
+
+    def update(self, df=None, cells=None):
+        """
+        Ghi nhận thay đổi giá trị ô (nhập điểm); các dòng giữ nguyên vị trí
+
+        Args:
+            cells: Các ô đã đổi (vị trí dòng, tên cột, giá trị cũ, giá trị mới);
+                   None nếu không rõ ô nào đổi (listener sẽ tính lại toàn bộ)
+        """
+        if df is not None:
+            self.df = df
+        self.version += 1
+        self._notify(list(cells) if cells is not None else None)
+        return self.version
+
+
+class UndoEntry:
+    """
+    Một bước trong lịch sử hoàn tác, lưu dưới dạng diff thay vì bản sao DataFrame
+
+    - cells: danh sách (vị trí dòng, tên cột, giá trị cũ, giá trị mới)
+    - added_rows: DataFrame các dòng được thêm vào cuối (nếu có)
+    """
+
+    def __init__(self, action, cells=None, added_rows=None):
+        self.action = action
+        self.cells = list(cells or [])
+        self.added_rows = added_rows
+        self.timestamp = datetime.now()
+        self.size = self._estimate_size()
+
+    def _estimate_size(self):
+        """Ước lượng bộ nhớ (byte) của bước hoàn tác"""
+        size = sys.getsizeof(self.cells)
+        for row, column, old, new in self.cells:
+            size += 64 + sys.getsizeof(column) + sys.getsizeof(old) + sys.getsizeof(new)
+        if self.added_rows is not None:
+            size += int(self.added_rows.memory_usage(deep=True).sum())
+        return size
+
+    @property
+    def structural(self):
+        """True nếu bước này thay đổi số dòng"""
+        return self.added_rows is not None
+
+    @property
+    def rows(self):
+        """Vị trí các dòng bị thay đổi giá trị ô"""
+        return sorted({row for row, _, _, _ in self.cells})
+
+    @property
+    def columns(self):
+        """Các cột bị thay đổi giá trị ô"""
+        return list(dict.fromkeys(column for _, column, _, _ in self.cells))
+
+    @staticmethod
+    def _set_cell(df, row, column, value):
+        set_value(df, row, column, value)
+
+    def revert(self, df):
+        """Áp dụng patch ngược lên df (sửa trực tiếp các ô), trả về DataFrame sau khi hoàn tác"""
+        for row, column, old, _ in reversed(self.cells):
+            self._set_cell(df, row, column, old)
+        if self.added_rows is not None:
+            df = df.iloc[:len(df) - len(self.added_rows)].copy()
+        return df
+
+    def changes(self, redo=False):
+        """Các ô thay đổi khi áp dụng bước này (redo) hoặc hoàn tác nó, dạng (dòng, cột, cũ, mới)"""
+        if redo:
+            return list(self.cells)
+        return [(row, column, new, old) for row, column, old, new in reversed(self.cells)]
+
+    def reapply(self, df):
+        """Áp dụng lại patch lên df, trả về DataFrame sau khi làm lại"""
+        if self.added_rows is not None:
+            df = pd.concat([df, self.added_rows], ignore_index=True)
+        for row, column, _, new in self.cells:
+            self._set_cell(df, row, column, new)
+        return df
+
+
+class UndoManager:
+    """Quản lý undo/redo cho các thao tác chỉnh sửa dữ liệu (lưu diff từng ô, giới hạn bộ nhớ)"""
+    def __init__(self, max_history=50, max_bytes=16 * 1024 * 1024):
+        self.undo_stack = []  # Stack lưu các bước đã thực hiện
+        self.redo_stack = []  # Stack lưu các bước đã undo
+        self.max_history = max_history
+        self.max_bytes = max_bytes
+
+    @property
+    def memory_usage(self):
+        """Tổng bộ nhớ ước lượng (byte) của lịch sử"""
+        return sum(entry.size for entry in self.undo_stack) + sum(entry.size for entry in self.redo_stack)
+
+    def record(self, action_name, cells=None, added_rows=None):
+        """Ghi nhận một thao tác đã thực hiện
+
+        Args:
+            action_name: Tên hành động (VD: "Nhập điểm cho Nguyễn Văn A")
+            cells: Danh sách (vị trí dòng, tên cột, giá trị cũ, giá trị mới)
+            added_rows: DataFrame các dòng đã thêm vào cuối
+        """
+        entry = UndoEntry(action_name, cells, added_rows)
+        if not entry.cells and not entry.structural:
+            return None
+        self.undo_stack.append(entry)
+        # Clear redo stack khi có thay đổi mới
+        self.redo_stack.clear()
+        # Giới hạn số bước và bộ nhớ, luôn giữ lại bước mới nhất
+        while len(self.undo_stack) > 1 and (
+                len(self.undo_stack) > self.max_history or self.memory_usage > self.max_bytes):
+            self.undo_stack.pop(0)
+        return entry
+
+    def undo(self):
+        """Hoàn tác thao tác cuối cùng
+
+        Returns:
+            tuple: (UndoEntry, action_name) hoặc (None, None) nếu không thể undo.
+            Gọi entry.revert(df) để áp dụng patch ngược.
+        """
+        if self.can_undo():
+            current = self.undo_stack.pop()
+            self.redo_stack.append(current)
+            return current, current.action
+        return None, None
+
+    def redo(self):
+        """Làm lại thao tác đã hoàn tác
+
+        Returns:
+            tuple: (UndoEntry, action_name) hoặc (None, None) nếu không thể redo.
+            Gọi entry.reapply(df) để áp dụng lại patch.
+        """
+        if self.can_redo():
+            current = self.redo_stack.pop()
+            self.undo_stack.append(current)
+            return current, current.action
+        return None, None
+
+    def can_undo(self):
+        """Kiểm tra có thể undo không"""
+        return len(self.undo_stack) > 0
+
+    def can_redo(self):
+        """Kiểm tra có thể redo không"""
+        return len(self.redo_stack) > 0
+
+    def clear(self):
+        """Xóa toàn bộ history"""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def get_undo_info(self):
+        """Lấy thông tin về thao tác có thể undo"""
+        if self.can_undo():
+            return self.undo_stack[-1].action
+        return None
+
+    def get_redo_info(self):
+        """Lấy thông tin về thao tác có thể redo"""
+        if self.can_redo():
+            return self.redo_stack[-1].action
+        return None
@@ -0,0 +1,190 @@
+"""
+Module thu gọn kiểu dữ liệu của bảng điểm sau khi đọc
+
+Vai trò của từng cột (điểm, mã/nhóm ít giá trị, chuỗi tên) do nơi gọi xác định từ cấu hình;
+module này chỉ chọn kiểu gọn nhất không làm mất dữ liệu cho từng vai trò:
+- Mã đề, giới tính, lớp: category (mỗi ô chỉ còn một mã số nhỏ)
+- Điểm: float32 nếu mọi giá trị giữ nguyên khi đổi kiểu (VD 8.25), ngược lại giữ float64
+- Tên: chuỗi lưu bằng Arrow nếu có pyarrow
+
+Vì các cột không còn là object/float64, gán giá trị vào từng ô phải đi qua set_value để
+thêm category mới hoặc nâng kiểu số khi cần. Điểm và mã đề nhập từ giao diện đi qua
+set_score/set_exam_code: chỉ giá trị được ghi bị kiểm tra và chuẩn hóa, không phải cả bảng.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_integer_dtype, is_bool_dtype
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def arrow_string_dtype():
+    """Kiểu chuỗi lưu bằng Arrow (giá trị thiếu là NaN như chuỗi thường), None nếu không có"""
+    if not PYARROW_AVAILABLE:
+        return None
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)  # pandas >= 2.3
+    except TypeError:
+        try:
+            return pd.StringDtype('pyarrow_numpy')  # pandas 2.1 - 2.2
+        except (TypeError, ValueError):
+            return None
+
+
+def _is_missing(value):
+    try:
+        return value is None or bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _fits_float32(values):
+    """True nếu đổi sang float32 rồi đổi lại không làm thay đổi giá trị nào"""
+    as_float = values.astype(np.float64)
+    return np.array_equal(as_float.astype(np.float32).astype(np.float64), as_float, equal_nan=True)
+
+
+def plan_dtypes(df, score_columns=(), category_columns=(), text_columns=()):
+    """
+    Chọn kiểu dữ liệu gọn cho các cột theo vai trò
+
+    Args:
+        df (DataFrame): Dữ liệu đã chuẩn hóa (điểm là số, mã đề là chuỗi)
+        score_columns: Các cột điểm
+        category_columns: Các cột ít giá trị khác nhau (mã đề, giới tính, lớp)
+        text_columns: Các cột chuỗi nhiều giá trị (tên học sinh)
+
+    Returns:
+        dict: Cột → kiểu mới, chỉ gồm các cột cần đổi
+    """
+    plan = {}
+    for col in dict.fromkeys(score_columns):
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if (is_numeric_dtype(series.dtype) and not is_bool_dtype(series.dtype)
+                and series.dtype != np.float32 and _fits_float32(series.to_numpy(dtype=np.float64, na_value=np.nan))):
+            plan[col] = np.dtype(np.float32)
+
+    for col in dict.fromkeys(category_columns):
+        if col not in df.columns or col in plan or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        # Chỉ đáng đổi khi giá trị lặp lại (số giá trị khác nhau ít hơn nửa số dòng)
+        if df[col].nunique(dropna=True) * 2 <= len(df[col]):
+            plan[col] = 'category'
+
+    string_dtype = arrow_string_dtype()
+    if string_dtype is not None:
+        for col in dict.fromkeys(text_columns):
+            if col in df.columns and col not in plan and df[col].dtype != string_dtype:
+                plan[col] = string_dtype
+    return plan
+
+
+def apply_dtypes(df, plan):
+    """Trả về DataFrame với các cột đã đổi kiểu theo plan (cột nào lỗi thì giữ nguyên)"""
+    if not plan:
+        return df
+    result = df.copy(deep=False)
+    for col, dtype in plan.items():
+        try:
+            result[col] = result[col].astype(dtype)
+        except (TypeError, ValueError) as e:
+            print(f"Không thể đổi kiểu cột {col} sang {dtype}: {str(e)}")
+    return result
+
+
+def memory_bytes(df):
+    """Bộ nhớ thực tế DataFrame đang dùng (byte)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def set_value(df, row_pos, column, value):
+    """
+    Gán giá trị vào một ô (sửa trực tiếp df), tự điều chỉnh kiểu cột khi giá trị mới không vừa:
+    thêm category mới, nâng float32/số nguyên lên float64, đổi số sang chuỗi ở cột chuỗi.
+    Chỉ chép lại cả cột trong các trường hợp điều chỉnh đó.
+    """
+    col_pos = df.columns.get_loc(column)
+    # Chỉ lấy Series của cột khi cần đổi kiểu: giữ tham chiếu tới cột trong lúc gán sẽ khiến
+    # Copy-on-Write chép lại cả cột
+    dtype = df.iloc[:, col_pos].dtype
+
+    if not _is_missing(value):
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            if not is_numeric_dtype(categories.dtype) and not isinstance(value, str):
+                value = str(value)
+            if value not in categories:
+                column_values = df.iloc[:, col_pos].cat.add_categories([value])
+                # Giữ category theo thứ tự giá trị để sắp xếp theo cột (VD: mã đề) đúng thứ tự
+                try:
+                    column_values = column_values.cat.reorder_categories(sorted(column_values.cat.categories))
+                except TypeError:
+                    pass
+                df.isetitem(col_pos, column_values)
+        elif isinstance(dtype, pd.StringDtype):
+            if not isinstance(value, str):
+                value = str(value)
+        elif is_integer_dtype(dtype) and not is_bool_dtype(dtype):
+            if not float(value).is_integer():
+                df.isetitem(col_pos, df.iloc[:, col_pos].astype(np.float64))
+        elif dtype == np.float32:
+            if float(np.float32(value)) != float(value):
+                df.isetitem(col_pos, df.iloc[:, col_pos].astype(np.float64))
+    elif is_integer_dtype(dtype) and not is_bool_dtype(dtype):
+        df.isetitem(col_pos, df.iloc[:, col_pos].astype(np.float64))
+
+    df.iat[row_pos, col_pos] = value
+
+
+def sort_key(values, numeric=False):
+    """
+    Khóa sắp xếp theo giá trị của một cột: số nếu numeric, còn lại là chuỗi (ô trống giữ NaN)
+
+    Cột category được đổi về giá trị thường vì sort_values trên category sắp theo thứ tự category.
+    """
+    if numeric:
+        return pd.to_numeric(values, errors='coerce')
+    keys = values.astype(object)
+    return keys.where(keys.isna(), keys.astype(str))
+
+
+def coerce_score(value):
+    """Chuẩn hóa điểm nhập vào thành số thực; None/chuỗi rỗng là chưa có điểm (NaN)"""
+    if _is_missing(value) or (isinstance(value, str) and not value.strip()):
+        return np.nan
+    score = float(value)
+    if not np.isfinite(score):
+        raise ValueError(f"Điểm không hợp lệ: {value}")
+    return score
+
+
+def coerce_exam_code(value):
+    """Chuẩn hóa mã đề thành chuỗi (705, 705.0, ' 705 ' → '705'); thiếu mã đề là chuỗi rỗng"""
+    if _is_missing(value):
+        return ''
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def set_score(df, row_pos, column, value):
+    """Ghi một ô điểm (O(1)), trả về giá trị đã chuẩn hóa; ValueError nếu không phải số"""
+    score = coerce_score(value)
+    set_value(df, row_pos, column, score)
+    return score
+
+
+def set_exam_code(df, row_pos, column, value):
+    """Ghi một ô mã đề (O(1)), trả về mã đề đã chuẩn hóa"""
+    code = coerce_exam_code(value)
+    set_value(df, row_pos, column, code)
+    return code
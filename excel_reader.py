@@ -0,0 +1,799 @@
+"""
+Module đọc sheet Excel trong một lần duyệt
+
+Sheet được mở bằng openpyxl ở chế độ read_only và XML của sheet chỉ được duyệt một lần:
+các dòng được chuyển thành danh sách giá trị giống pandas.read_excel, còn vùng merged cells
+nằm trong thẻ <mergeCells> ở cuối XML được lấy ra ngay trong lần duyệt đó. Dò header,
+kiểm tra merged cells và dựng DataFrame đều dùng lại kết quả này thay vì mở file nhiều lần.
+
+Mặc định (fast=True) XML của sheet được dựng thẳng bằng expat theo từng lô dòng cùng bảng
+sharedStrings và styles đọc sẵn, không đi qua bộ phân tích ô của openpyxl; file có cấu trúc
+lạ (Strict OOXML, thẻ có tiền tố namespace, thiếu phần trong gói...) tự quay về openpyxl.
+
+Khi đọc theo luồng, dòng header phải được dò trước khi tới <mergeCells>; read_merged_ranges
+lấy riêng các vùng merge bằng cách quét thẳng XML của sheet trong file .xlsx (không dựng ô
+nào), và MergedRanges giữ chúng dạng khoảng thay vì một mục cho mỗi ô bị merge.
+"""
+
+import gc
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.xml.constants import SHEET_MAIN_NS
+from openpyxl.worksheet._reader import WorkSheetParser
+from pandas.api.types import is_object_dtype, is_string_dtype
+from pandas.io.parsers import TextParser
+
+PROGRESS_EVERY = 2000  # Số dòng giữa hai lần báo tiến trình khi đọc cả sheet
+SCAN_CHUNK = 1024 * 1024  # Số byte XML giải nén mỗi lần khi tìm <mergeCells>
+
+# Thẻ <mergeCell ref="A1:E1"/> (có thể có tiền tố namespace); '<' trong nội dung ô luôn bị
+# escape nên mẫu này chỉ khớp thẻ thật
+_MERGE_CELL = re.compile(rb'<(?:[\w.-]+:)?mergeCell\s[^>]*?\bref="([A-Za-z]+[0-9]+(?::[A-Za-z]+[0-9]+)?)"')
+_MERGE_CELLS = b'mergeCells'
+_DIMENSION = re.compile(rb'<(?:[\w.-]+:)?dimension\s[^>]*?\bref="([^"]+)"')
+_WORKSHEET = re.compile(rb'<([\w.-]+:)?worksheet\b([^>]*)>')
+_NAMESPACE_DECLARATION = re.compile(rb'\bxmlns(?::[\w.-]+)?="[^"]*"')
+
+_ROW = f'{{{SHEET_MAIN_NS}}}row'
+_VALUE = f'{{{SHEET_MAIN_NS}}}v'
+_INLINE_STRING = f'{{{SHEET_MAIN_NS}}}is'
+_TEXT = f'{{{SHEET_MAIN_NS}}}t'
+_RUN = f'{{{SHEET_MAIN_NS}}}r'
+_STRING_ITEM = f'{{{SHEET_MAIN_NS}}}si'
+_DIGITS = '0123456789'
+
+
+def _convert_value(value, data_type):
+    """Chuyển giá trị ô giống pandas: ô trống → '', lỗi → NaN, số nguyên dạng float → int"""
+    if value is None:
+        return ""
+    if data_type == TYPE_ERROR:
+        return np.nan
+    if data_type == TYPE_NUMERIC:
+        as_int = int(value)
+        return as_int if as_int == value else float(value)
+    return value
+
+
+def _trim(values):
+    """Bỏ các ô trống ở cuối dòng"""
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+
+class SheetData:
+    """
+    Dữ liệu thô của một sheet sau một lần đọc
+
+    Attributes:
+        rows (list): Các dòng của sheet (dòng i là dòng Excel i + 1), ô trống là ''
+        merged_ranges (list): Các vùng merge dạng (min_row, min_col, max_row, max_col), 1-based
+        sheet_name (str): Tên sheet
+    """
+
+    def __init__(self, rows, merged_ranges, sheet_name=None):
+        # Bỏ các dòng trống ở cuối và nới các dòng về cùng độ rộng như pandas
+        while rows and not rows[-1]:
+            rows.pop()
+        width = max((len(row) for row in rows), default=0)
+        for row in rows:
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+
+        self.rows = rows
+        self.merged_ranges = merged_ranges
+        self.sheet_name = sheet_name
+
+    @property
+    def width(self):
+        return len(self.rows[0]) if self.rows else 0
+
+    def header_sample(self, max_rows):
+        """DataFrame không header gồm max_rows dòng đầu (ô trống là NaN) để dò dòng header"""
+        sample = [[np.nan if value == "" else value for value in row] for row in self.rows[:max_rows]]
+        return pd.DataFrame(sample)
+
+    def to_frame(self, header_row=0, header_depth=1, separator='_'):
+        """
+        Dựng DataFrame với header ở dòng header_row (0-based theo sheet)
+
+        Args:
+            header_row (int): Dòng header đầu tiên, giống pd.read_excel(header=...)
+            header_depth (int): Số dòng header; > 1 thì các dòng được ghép bằng separator
+            separator (str): Ký tự nối tên cột nhiều cấp
+
+        Returns:
+            pd.DataFrame: Dữ liệu bên dưới header
+        """
+        if header_row >= len(self.rows):
+            return pd.DataFrame()
+
+        header_depth = max(1, min(header_depth, len(self.rows) - header_row))
+        data = [list(row) for row in self.rows] if header_depth > 1 else self.rows
+        header = header_row
+        if header_depth > 1:
+            header = list(range(header_row, header_row + header_depth))
+            # Điền tiếp tên cột cấp trên sang các ô trống bên phải (giống pandas)
+            control = [True] * self.width
+            for index in header:
+                data[index], control = _fill_header_row(data[index], control)
+
+        parser = TextParser(data, header=header, skip_blank_lines=False)
+        try:
+            frame = parser.read()
+        finally:
+            parser.close()
+
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = [separator.join(str(i) for i in col if str(i) != 'nan').strip(separator)
+                             for col in frame.columns.values]
+        return frame
+
+
+def _fill_header_row(row, control):
+    """Điền tên cột nhiều cấp sang phải cho tới ô có giá trị (pandas fill_mi_header)"""
+    last = row[0]
+    for i in range(1, len(row)):
+        if not control[i]:
+            last = row[i]
+        if row[i] == "" or row[i] is None:
+            row[i] = last
+        else:
+            control[i] = False
+            last = row[i]
+    return row, control
+
+
+def _open_source(wb, ws):
+    """Mở XML của sheet read_only; None nếu openpyxl không còn các thuộc tính nội bộ cần dùng"""
+    try:
+        return ws._get_source(), ws._shared_strings
+    except AttributeError:
+        return None, None
+
+
+def _iter_rows(wb, source, shared_strings, merged_ranges):
+    """
+    Duyệt XML của sheet một lần, sinh từng dòng (list giá trị, đã bỏ ô trống cuối dòng)
+
+    Dòng không có trong XML được sinh ra dưới dạng []. Khi duyệt xong, các vùng merge
+    (thẻ <mergeCells> nằm sau <sheetData>) được thêm vào merged_ranges.
+    """
+    with source:
+        parser = WorkSheetParser(source, shared_strings, data_only=True, epoch=wb.epoch,
+                                 date_formats=wb._date_formats,
+                                 timedelta_formats=wb._timedelta_formats)
+        next_row = 1
+        for row_number, cells in parser.parse():
+            # Các dòng không có trong XML là dòng trống
+            while next_row < row_number:
+                next_row += 1
+                yield []
+            values = [""] * (cells[-1]['column'] if cells else 0)
+            for cell in cells:
+                values[cell['column'] - 1] = _convert_value(cell['value'], cell['data_type'])
+            next_row += 1
+            yield _trim(values)
+
+        if parser.merged_cells is not None:
+            for merged in parser.merged_cells.mergeCell:
+                min_col, min_row, max_col, max_row = range_boundaries(merged.ref)
+                merged_ranges.append((min_row, min_col, max_row, max_col))
+
+
+class MergedRanges:
+    """
+    Các vùng merge của một sheet dạng khoảng (min_row, min_col, max_row, max_col), 1-based
+
+    Các vùng được sắp theo dòng bắt đầu; một banner merge cả trăm cột vẫn chỉ là một mục.
+    Duyệt (for) như danh sách các bộ 4 số.
+    """
+
+    def __init__(self, ranges=()):
+        self.ranges = sorted(tuple(bounds) for bounds in ranges)
+        self._starts = [bounds[0] for bounds in self.ranges]
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __eq__(self, other):
+        if isinstance(other, MergedRanges):
+            return self.ranges == other.ranges
+        return NotImplemented
+
+    def __repr__(self):
+        return f"MergedRanges({self.ranges!r})"
+
+    def find(self, row, col):
+        """Vùng merge chứa ô (row, col), None nếu ô không bị merge"""
+        for bounds in self.ranges[:bisect_right(self._starts, row)]:
+            min_row, min_col, max_row, max_col = bounds
+            if row <= max_row and min_col <= col <= max_col:
+                return bounds
+        return None
+
+    def starting_within(self, max_row):
+        """Các vùng bắt đầu từ dòng max_row trở lên (VD: vùng dò header)"""
+        return MergedRanges(self.ranges[:bisect_right(self._starts, max_row)])
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _relationships(archive, part):
+    """{Id: (đường dẫn đích trong gói, kiểu quan hệ)} của một phần trong gói .xlsx"""
+    folder, name = posixpath.split(part)
+    try:
+        root = ET.fromstring(archive.read(posixpath.join(folder, '_rels', name + '.rels')))
+    except KeyError:
+        return {}
+    result = {}
+    for rel in root:
+        target = rel.get('Target', '')
+        path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(folder, target))
+        result[rel.get('Id')] = (path, rel.get('Type', ''))
+    return result
+
+
+def _workbook_part(archive):
+    """Đường dẫn workbook.xml trong gói"""
+    return next(path for path, kind in _relationships(archive, '').values()
+                if kind.endswith('/officeDocument'))
+
+
+def _worksheet_parts(archive, workbook_root=None):
+    """(tên sheet, đường dẫn XML) các worksheet theo thứ tự như wb.worksheets (bỏ qua chartsheet)"""
+    workbook = _workbook_part(archive)
+    rels = _relationships(archive, workbook)
+    if workbook_root is None:
+        workbook_root = ET.fromstring(archive.read(workbook))
+    parts = []
+    for element in workbook_root.iter():
+        if _local_name(element.tag) != 'sheet':
+            continue
+        rel_id = next((value for key, value in element.attrib.items() if _local_name(key) == 'id'), None)
+        path, kind = rels.get(rel_id, (None, ''))
+        if path is not None and kind.endswith('/worksheet'):
+            parts.append((element.get('name'), path))
+    return parts
+
+
+def _merge_section(source):
+    """Phần XML từ thẻ <mergeCells> tới hết sheet; b'' nếu sheet không có vùng merge"""
+    tail = b''
+    for chunk in iter(lambda: source.read(SCAN_CHUNK), b''):
+        data = tail + chunk
+        start = data.find(_MERGE_CELLS)
+        if start >= 0:
+            return data[start:] + source.read()
+        tail = data[-len(_MERGE_CELLS):]
+    return b''
+
+
+def read_merged_ranges(file_path, sheet_index=0, max_row=None):
+    """
+    Đọc vùng merged cells của một sheet thẳng từ XML trong file .xlsx
+
+    XML của sheet được giải nén theo từng khối và chỉ tìm thẻ <mergeCells> (nằm sau
+    <sheetData>), không dựng ô nào, nên nhanh hơn nhiều so với load_workbook.
+
+    Args:
+        file_path (str): Đường dẫn file .xlsx
+        sheet_index (int): Vị trí sheet (như wb.worksheets)
+        max_row (int): Chỉ giữ các vùng bắt đầu từ dòng này trở lên (1-based), None để giữ hết
+
+    Returns:
+        MergedRanges
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(_worksheet_parts(archive)[sheet_index][1]) as source:
+            section = _merge_section(source)
+
+    ranges = []
+    for ref in _MERGE_CELL.findall(section):
+        min_col, min_row, max_col, last_row = range_boundaries(ref.decode('ascii').upper())
+        if max_row is None or min_row <= max_row:
+            ranges.append((min_row, min_col, last_row, max_col))
+    return MergedRanges(ranges)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Tạm tắt bộ gom rác vòng tham chiếu khi dựng một lô đối tượng (không tạo vòng tham chiếu),
+    để gc không quét lại mọi dòng đã đọc sau mỗi vài trăm đối tượng mới
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _element_batches(source, tag, item_end, wrapper_start=None, tail=None):
+    """
+    Chia phần bên trong thẻ tag (VD: sheetData, sst) thành các lô XML hoàn chỉnh
+
+    XML được giải nén theo khối SCAN_CHUNK và cắt sau thẻ đóng item_end cuối cùng của khối
+    ('<' trong nội dung luôn bị escape nên không cắt nhầm), nên mỗi lô gồm trọn các phần tử
+    con và dựng được bằng một lần ET.fromstring. Lô được bọc bởi wrapper_start (mặc định là
+    chính thẻ mở của tag, gồm các khai báo namespace) và thẻ đóng của tag. Phần XML sau thẻ
+    đóng tag được thêm vào danh sách tail nếu có.
+    """
+    opening, closing = b'<' + tag, b'</' + tag + b'>'
+    buffer = b''
+    while True:
+        start = buffer.find(opening)
+        end = buffer.find(b'>', start) if start >= 0 else -1
+        if end >= 0:
+            break
+        chunk = source.read(SCAN_CHUNK)
+        if not chunk:
+            return  # Không có thẻ tag
+        buffer += chunk
+
+    self_closing = buffer[end - 1:end] == b'/'
+    if wrapper_start is None:
+        wrapper_start = buffer[start:end] + b'>' if self_closing else buffer[start:end + 1]
+    buffer = buffer[end + 1:]
+    while not self_closing:
+        stop = buffer.find(closing)
+        if stop >= 0:
+            yield wrapper_start + buffer[:stop] + closing
+            buffer = buffer[stop:]
+            break
+        cut = buffer.rfind(item_end)
+        if cut >= 0:
+            cut += len(item_end)
+            yield wrapper_start + buffer[:cut] + closing
+            buffer = buffer[cut:]
+        chunk = source.read(SCAN_CHUNK)
+        if not chunk:
+            raise ValueError(f"XML bị cắt cụt (thiếu {closing.decode()})")
+        buffer += chunk
+    if tail is not None:
+        tail.append(buffer + source.read())
+
+
+def _text_content(element):
+    """Chữ của <si>/<is> như openpyxl Text.content: <t> trực tiếp cộng <t> của các run"""
+    if len(element) == 1 and element[0].tag == _TEXT:
+        return element[0].text or ''
+    parts = []
+    for child in element:
+        if child.tag == _TEXT:
+            parts.append(child.text or '')
+        elif child.tag == _RUN:
+            text = child.find(_TEXT)
+            if text is not None:
+                parts.append(text.text or '')
+    return ''.join(parts)
+
+
+def _read_shared_strings(archive, path):
+    strings = []
+    if path is None:
+        return strings
+    with archive.open(path) as source:
+        for batch in _element_batches(source, b'sst', b'</si>'):
+            with _gc_paused():
+                strings.extend(_text_content(item).replace('x005F_', '')
+                               for item in ET.fromstring(batch) if item.tag == _STRING_ITEM)
+    return strings
+
+
+class _FastSheet:
+    """
+    Một sheet mở cho đường đọc nhanh
+
+    sharedStrings, các style ngày giờ (từ styles.xml) và epoch được đọc trước. rows() giải
+    nén XML của sheet theo từng khối, cắt ở thẻ </row> cuối cùng của khối và dựng cả lô dòng
+    bằng một lần gọi expat (ET.fromstring), thay vì xử lý từng sự kiện iterparse cho mỗi
+    thẻ <c>/<v>; giá trị ô được chuyển giống WorkSheetParser + _convert_value.
+    """
+
+    def __init__(self, archive, sheet_index):
+        self._archive = archive
+        workbook = _workbook_part(archive)
+        root = ET.fromstring(archive.read(workbook))
+        if root.tag != f'{{{SHEET_MAIN_NS}}}workbook':
+            raise ValueError("không phải SpreadsheetML transitional")
+        self.sheet_name, self._part = _worksheet_parts(archive, root)[sheet_index]
+
+        properties = root.find(f'{{{SHEET_MAIN_NS}}}workbookPr')
+        date1904 = properties is not None and properties.get('date1904', '').lower() in ('1', 'true')
+        self._epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        rels = _relationships(archive, workbook)
+        by_kind = {kind.rsplit('/', 1)[-1]: path for path, kind in rels.values()}
+        self._shared_strings = _read_shared_strings(archive, by_kind.get('sharedStrings'))
+        date_styles, timedelta_styles = set(), set()
+        if 'styles' in by_kind:
+            stylesheet = Stylesheet.from_tree(ET.fromstring(archive.read(by_kind['styles'])))
+            date_styles, timedelta_styles = stylesheet.date_formats, stylesheet.timedelta_formats
+        # So sánh thẳng với thuộc tính s (chuỗi); ô không có s là style 0
+        self._date_styles = {str(index) for index in date_styles} | ({None} if 0 in date_styles else set())
+        self._timedelta_styles = {str(index) for index in timedelta_styles} | ({None} if 0 in timedelta_styles else set())
+
+        # Thẻ gốc (khai báo namespace dùng lại khi dựng từng lô dòng) và <dimension> ở đầu XML
+        with archive.open(self._part) as source:
+            preamble = source.read(64 * 1024)
+        worksheet = _WORKSHEET.search(preamble)
+        if worksheet is None or worksheet.group(1) or f'xmlns="{SHEET_MAIN_NS}"'.encode() not in worksheet.group(2):
+            raise ValueError("thẻ <worksheet> có tiền tố hoặc namespace lạ")
+        declarations = b' '.join(_NAMESPACE_DECLARATION.findall(worksheet.group(2)))
+        self._wrapper_start = b'<sheetData ' + declarations + b'>'
+        self._columns = {}  # Chữ cột → số cột (1-based)
+
+        self.max_row = self.max_column = 0
+        match = _DIMENSION.search(preamble)
+        if match:
+            try:
+                _, _, self.max_column, self.max_row = range_boundaries(match.group(1).decode('ascii'))
+            except ValueError:
+                pass
+            self.max_row = self.max_row or 0
+            self.max_column = self.max_column or 0
+
+    def rows(self, merged_ranges):
+        """Sinh từng dòng như _iter_rows; vùng merge được thêm vào merged_ranges khi duyệt xong"""
+        position = [0, 1]  # Số dòng Excel của thẻ <row> trước, dòng sẽ sinh tiếp theo
+        tail = []
+        with self._archive.open(self._part) as source:
+            for batch in _element_batches(source, b'sheetData', b'</row>', self._wrapper_start, tail):
+                with _gc_paused():
+                    rows = self._batch_rows(ET.fromstring(batch), position)
+                yield from rows
+
+            # Vùng merge nằm trong thẻ <mergeCells> sau </sheetData>
+            for ref in _MERGE_CELL.findall(b''.join(tail)):
+                min_col, min_row, max_col, max_row = range_boundaries(ref.decode('ascii').upper())
+                merged_ranges.append((min_row, min_col, max_row, max_col))
+
+    def _batch_rows(self, batch, position):
+        """Các dòng (list giá trị) của một lô <row>; dòng không có trong XML là []"""
+        shared_strings = self._shared_strings
+        date_styles = self._date_styles
+        columns = self._columns
+        row_number, next_row = position
+        rows = []
+        for element in batch:
+            if element.tag != _ROW:
+                continue
+            number = element.get('r')
+            row_number = int(number) if number else row_number + 1
+            while next_row < row_number:
+                next_row += 1
+                rows.append([])
+            values = []
+            column = 0
+            for cell in element:
+                ref = cell.get('r')
+                if ref:
+                    letters = ref.rstrip(_DIGITS)
+                    column = columns.get(letters)
+                    if column is None:
+                        column = columns[letters] = column_index_from_string(letters)
+                else:
+                    column += 1
+                kind = cell.get('t')
+                if kind == 'inlineStr':
+                    child = cell.find(_INLINE_STRING)
+                    value = _text_content(child) if child is not None else ""
+                else:
+                    text = cell.findtext(_VALUE)
+                    if not text:
+                        value = ""
+                    elif kind is None or kind == 'n':
+                        if '.' in text or 'E' in text or 'e' in text:
+                            value = float(text)
+                            if value.is_integer():
+                                value = int(value)
+                        else:
+                            value = int(text)
+                        style = cell.get('s')
+                        if style in date_styles:
+                            try:
+                                value = from_excel(value, self._epoch, timedelta=style in self._timedelta_styles)
+                            except (OverflowError, ValueError):
+                                value = np.nan
+                    elif kind == 's':
+                        value = shared_strings[int(text)]
+                    elif kind == 'b':
+                        value = bool(int(text))
+                    elif kind == 'e':
+                        value = np.nan
+                    elif kind == 'd':
+                        value = from_ISO8601(text)
+                    else:
+                        value = text
+                if column > len(values):
+                    values.extend([""] * (column - 1 - len(values)))
+                    values.append(value)
+                else:
+                    values[column - 1] = value
+            next_row += 1
+            rows.append(_trim(values))
+        position[:] = row_number, next_row
+        return rows
+
+    def close(self):
+        self._archive.close()
+
+
+def _open_fast(file_path, sheet_index):
+    """Mở sheet cho đường đọc nhanh; None nếu file cần openpyxl (cấu trúc gói lạ)"""
+    archive = zipfile.ZipFile(file_path)
+    try:
+        return _FastSheet(archive, sheet_index)
+    except (KeyError, IndexError, StopIteration, ValueError, TypeError, ET.ParseError) as e:
+        print(f"Đọc nhanh không dùng được cho {file_path}, dùng openpyxl: {e}")
+        archive.close()
+        return None
+    except BaseException:
+        archive.close()
+        raise
+
+
+def _collect_rows(rows, progress, total_rows):
+    result = []
+    for row in rows:
+        result.append(row)
+        if progress and len(result) % PROGRESS_EVERY == 0:
+            progress(len(result), total_rows)
+    return result
+
+
+def list_sheets(file_path):
+    """Tên các sheet trong workbook theo thứ tự (chỉ đọc mục lục workbook, không đọc dữ liệu)"""
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_sheet(file_path, sheet_index=0, progress=None, fast=True):
+    """
+    Đọc một sheet trong một lần duyệt: giá trị các dòng và vùng merged cells
+
+    Args:
+        file_path (str): Đường dẫn file .xlsx
+        sheet_index (int): Vị trí sheet trong workbook
+        progress: Hàm progress(rows_read, total_rows) được gọi sau mỗi PROGRESS_EVERY dòng
+        fast (bool): Duyệt XML trực tiếp (mặc định), False để luôn đọc qua openpyxl
+
+    Returns:
+        SheetData
+    """
+    if fast:
+        sheet = _open_fast(file_path, sheet_index)
+        if sheet is not None:
+            try:
+                merged_ranges = []
+                rows = _collect_rows(sheet.rows(merged_ranges), progress, sheet.max_row)
+                return SheetData(rows, merged_ranges, sheet.sheet_name)
+            finally:
+                sheet.close()
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_index]
+        source, shared_strings = _open_source(wb, ws)
+        if source is None:
+            # Dự phòng: đọc một lần ở chế độ đầy đủ
+            return _read_sheet_full(file_path, sheet_index)
+
+        merged_ranges = []
+        rows = _collect_rows(_iter_rows(wb, source, shared_strings, merged_ranges), progress, ws.max_row or 0)
+        return SheetData(rows, merged_ranges, ws.title)
+    finally:
+        wb.close()
+
+
+class SheetStream:
+    """
+    Đọc sheet theo từng khối dòng với bộ nhớ giới hạn (dùng cho file lớn)
+
+    Các dòng đầu được giữ lại để dò header (head); sau đó blocks() sinh từng DataFrame
+    block_size dòng đã suy kiểu giống pandas, nên không lúc nào giữ toàn bộ sheet
+    dưới dạng list Python. Kiểu được suy theo từng khối; read_frame đọc lại riêng các cột
+    là chữ ở khối này nhưng thành số ở khối khác (VD: mã đề '001' lẫn 'A1') để kết quả
+    giống hệt read_sheet(...).to_frame bất kể cách chia khối.
+
+    Args:
+        file_path (str): Đường dẫn file .xlsx
+        sheet_index (int): Vị trí sheet trong workbook
+        block_size (int): Số dòng dữ liệu mỗi khối
+        fast (bool): Duyệt XML trực tiếp như read_sheet, False để luôn đọc qua openpyxl
+    """
+
+    def __init__(self, file_path, sheet_index=0, block_size=5000, fast=True):
+        self.file_path = file_path
+        self.sheet_index = sheet_index
+        self.block_size = block_size
+        self.merged_ranges = []
+        self.rows_read = 0
+        self.used_width = 0
+        self._head = []
+        self._data_start = 0
+        self._wb = None
+        self._use_fast = fast
+        self._fast = _open_fast(file_path, sheet_index) if fast else None
+        if self._fast is not None:
+            self.sheet_name = self._fast.sheet_name
+            self.total_rows = self._fast.max_row
+            self.declared_width = self._fast.max_column
+            self._rows = self._fast.rows(self.merged_ranges)
+            return
+
+        self._wb = load_workbook(file_path, read_only=True, data_only=True)
+        ws = self._wb.worksheets[sheet_index]
+        self.sheet_name = ws.title
+        # Kích thước khai báo trong thẻ <dimension>, chỉ dùng để ước lượng tiến trình và số cột
+        self.total_rows = ws.max_row or 0
+        self.declared_width = ws.max_column or 0
+
+        source, shared_strings = _open_source(self._wb, ws)
+        if source is not None:
+            self._rows = _iter_rows(self._wb, source, shared_strings, self.merged_ranges)
+        else:
+            self._rows = (_trim([_convert_value(cell.value, cell.data_type) for cell in row])
+                          for row in ws.iter_rows(min_row=1, min_col=1))
+
+    def head(self, count):
+        """count dòng đầu của sheet (được giữ lại cho blocks())"""
+        while len(self._head) < count:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._head.append(row)
+        return self._head[:count]
+
+    def header_sample(self, max_rows):
+        """DataFrame không header gồm max_rows dòng đầu (ô trống là NaN) để dò dòng header"""
+        return SheetData([list(row) for row in self.head(max_rows)], []).header_sample(max_rows)
+
+    def blocks(self, header_row=0, header_depth=1, separator='_'):
+        """
+        Sinh các DataFrame liên tiếp chứa dữ liệu bên dưới header
+
+        Args:
+            header_row (int): Dòng header đầu tiên (0-based theo sheet)
+            header_depth (int): Số dòng header
+            separator (str): Ký tự nối tên cột nhiều cấp
+        """
+        header_rows = self.head(header_row + header_depth)[header_row:]
+        if not header_rows:
+            return
+        # pandas lấy độ rộng lớn nhất của mọi dòng, kể cả các dòng phía trên header
+        self.used_width = max(len(row) for row in self._head)
+        width = max(self.declared_width, self.used_width)
+
+        # Tên cột giống pandas (Unnamed: i, cột trùng tên, header nhiều cấp)
+        padded = [row + [""] * (width - len(row)) for row in header_rows]
+        columns = SheetData(padded, []).to_frame(0, len(header_rows), separator).columns.tolist()
+
+        self._data_start = header_row + len(header_rows)
+        block = []
+        for row in self._data_rows(width):
+            block.append(row)
+            if len(block) >= self.block_size:
+                yield _typed_block(block, columns)
+                block = []
+        if block:
+            yield _typed_block(block, columns)
+
+    def _data_rows(self, width):
+        """Các dòng bên dưới header (từ self._data_start), nới/cắt về width cột"""
+        data_rows = iter(self._head[self._data_start:])
+        self._head = []
+        blank_rows = 0
+        for row in chain(data_rows, self._rows):
+            self.rows_read += 1
+            if not row:
+                # Dòng trống ở cuối sheet bị bỏ như pandas, chỉ giữ khi còn dữ liệu phía sau
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield [""] * width
+            blank_rows = 0
+            self.used_width = max(self.used_width, len(row))
+            yield (row + [""] * (width - len(row)))[:width]
+
+    def _reread_columns(self, columns, positions):
+        """Đọc lại giá trị thô của vài cột trên cả sheet và suy kiểu một lần như read_sheet"""
+        with SheetStream(self.file_path, self.sheet_index, fast=self._use_fast) as stream:
+            stream.head(self._data_start)
+            stream._data_start = self._data_start
+            width = max(positions) + 1
+            rows = [[row[i] for i in positions] for row in stream._data_rows(width)]
+        return _typed_block(rows, columns)
+
+    def read_frame(self, header_row=0, header_depth=1, separator='_', progress=None):
+        """
+        Đọc toàn bộ dữ liệu thành DataFrame, ghép từ các khối đã suy kiểu
+
+        Args:
+            progress: Hàm progress(rows_read, total_rows) được gọi sau mỗi khối
+        """
+        frames = []
+        for frame in self.blocks(header_row, header_depth, separator):
+            frames.append(frame)
+            if progress:
+                progress(self.rows_read, self.total_rows)
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) > 1:
+            dtypes = [frame.dtypes for frame in frames]
+            result = pd.concat(frames, ignore_index=True)
+            # Cột có kiểu khác nhau giữa các khối (VD: khối toàn ô trống) được suy kiểu lại một lần
+            mixed = [col for col in result.columns if any(d[col] != dtypes[0][col] for d in dtypes[1:])]
+            # Cột là chữ ở khối này nhưng đã bị đổi thành số ở khối khác: giá trị gốc ('001') đã mất
+            # nên đọc lại riêng các cột này từ file
+            text = [col for col in mixed if any(is_object_dtype(d[col]) or is_string_dtype(d[col]) for d in dtypes)]
+            if text:
+                reread = self._reread_columns(text, [result.columns.get_loc(col) for col in text])
+                for col in text:
+                    result[col] = reread[col]
+            mixed = [col for col in mixed if col not in text]
+            if mixed:
+                result[mixed] = result[mixed].infer_objects()
+        else:
+            result = frames[0]
+        # Bỏ các cột trống ở cuối chỉ có trong <dimension>, pandas không tạo các cột này
+        return result.iloc[:, :self.used_width] if self.used_width < result.shape[1] else result
+
+    def close(self):
+        if self._fast is not None:
+            self._fast.close()
+        if self._wb is not None:
+            self._wb.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _typed_block(rows, columns):
+    """Suy kiểu một khối dòng bằng TextParser giống pd.read_excel"""
+    parser = TextParser(rows, names=columns, header=None, skip_blank_lines=False)
+    try:
+        return parser.read()
+    finally:
+        parser.close()
+
+
+def _read_sheet_full(file_path, sheet_index=0):
+    """Đọc sheet ở chế độ đầy đủ của openpyxl (dự phòng)"""
+    wb = load_workbook(file_path, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_index]
+        rows = [_trim([_convert_value(cell.value, cell.data_type) for cell in row])
+                for row in ws.iter_rows(min_row=1, min_col=1)]
+        merged_ranges = [(r.min_row, r.min_col, r.max_row, r.max_col) for r in ws.merged_cells.ranges]
+        return SheetData(rows, merged_ranges, ws.title)
+    finally:
+        wb.close()
@@ -0,0 +1,629 @@
+"""
+Module ghi dữ liệu điểm trở lại file Excel theo từng ô (incremental writeback)
+
+Thay vì ghi lại toàn bộ DataFrame bằng ``df.to_excel`` sau mỗi lần nhập điểm,
+workbook gốc được mở một lần bằng openpyxl và chỉ các ô đã thay đổi (điểm,
+mã đề) được vá lại. Header nhiều cấp, merged cells và định dạng được giữ
+nguyên vì phần header của sheet không bao giờ bị ghi đè.
+
+Việc ghi được thực hiện bởi một luồng nền (WriteBehindQueue) gộp các lần sửa
+liên tiếp thành một lần ghi, ghi ra file tạm rồi đổi tên để tránh hỏng file.
+"""
+
+import os
+import queue
+from bisect import bisect_right
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from tabular_io import write_table
+
+# Key trong DataFrame.attrs chứa thông tin vị trí dữ liệu trong sheet gốc
+SOURCE_LAYOUT_KEY = 'source_layout'
+# Key trong DataFrame.attrs của bảng ghép từ nhiều sheet/file: danh sách các phần nguồn
+SOURCE_PARTS_KEY = 'source_parts'
+
+def make_source_layout(header_row, header_depth, source_width, sheet_index=0):
+    """
+    Tạo thông tin layout của sheet nguồn để gắn vào DataFrame.attrs
+
+    Args:
+        header_row (int): Chỉ số dòng header (0-based) như khi gọi pd.read_excel(header=...)
+        header_depth (int): Số dòng header (1 nếu header đơn, >1 nếu multi-level)
+        source_width (int): Số cột đọc được từ file
+        sheet_index (int): Vị trí sheet trong workbook
+
+    Returns:
+        dict: Layout với các dòng/cột tính theo chỉ số Excel (1-based)
+    """
+    return {
+        'sheet_index': sheet_index,
+        'header_last_row': header_row + header_depth,
+        'data_start_row': header_row + header_depth + 1,
+        'source_width': source_width
+    }
+
+
+def make_source_part(file_path, layout, start, stop, columns, sheet_name=None):
+    """
+    Mô tả một phần của bảng ghép (các dòng start:stop) được đọc từ một sheet
+
+    Args:
+        file_path (str): File chứa sheet
+        layout (dict | None): Layout của sheet (make_source_layout), None nếu không ghi lại được
+        start, stop (int): Vị trí dòng của phần này trong bảng ghép
+        columns (list): Các cột của sheet theo thứ tự trong file (không gồm cột gắn thêm khi ghép)
+        sheet_name (str): Tên sheet (để báo cho người dùng)
+    """
+    return {
+        'file_path': file_path,
+        'sheet_name': sheet_name,
+        'layout': dict(layout) if layout is not None else None,
+        'start': start,
+        'stop': stop,
+        'columns': list(columns)
+    }
+
+
+def unwritable_parts(parts):
+    """Các phần của bảng ghép không ghi lại được về sheet nguồn (không có layout hoặc không phải .xlsx)"""
+    return [part for part in parts
+            if part['layout'] is None or not part['file_path'].lower().endswith('.xlsx')]
+
+
+def to_cell_value(value):
+    """
+    Chuyển giá trị pandas/numpy sang giá trị openpyxl có thể ghi
+
+    Chuỗi được ghi nguyên dạng chữ như df.to_excel (mã định danh "012345" hay mã đề "701" không
+    bị đổi thành số); cột điểm đã có kiểu số nên không cần chuyển.
+    """
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+    return value
+
+
+class WriteBatch:
+    """Một lần ghi: các ô đã đổi và/hoặc ảnh chụp DataFrame cần ghi lại"""
+
+    def __init__(self, file_path, layout, columns, kind='cells', cells=None,
+                 frame=None, previous_rows=0, edits=0):
+        self.file_path = file_path
+        self.layout = layout
+        self.columns = columns
+        # 'cells': chỉ vá ô; 'data': ghi lại vùng dữ liệu; 'file': ghi lại cả file
+        self.kind = kind
+        self.cells = cells if cells is not None else {}
+        self.frame = frame
+        self.previous_rows = previous_rows
+        self.edits = edits
+
+    def merge(self, newer):
+        """Gộp một batch mới hơn của cùng file vào batch này"""
+        if newer.kind != 'cells':
+            self.kind = newer.kind
+            self.frame = newer.frame
+            self.cells = {}
+        self.cells.update(newer.cells)
+        self.layout = newer.layout
+        self.columns = newer.columns
+        self.previous_rows = max(self.previous_rows, newer.previous_rows)
+        self.edits += newer.edits
+
+
+    @property
+    def sheet_index(self):
+        return self.layout.get('sheet_index', 0) if self.layout else 0
+
+
+def merge_batches(batches):
+    """Gộp các batch liên tiếp của cùng một sheet thành một lần ghi"""
+    merged = []
+    for batch in batches:
+        if (merged and merged[-1].file_path == batch.file_path
+                and merged[-1].sheet_index == batch.sheet_index):
+            merged[-1].merge(batch)
+        else:
+            merged.append(WriteBatch(batch.file_path, batch.layout, batch.columns, batch.kind,
+                                     dict(batch.cells), batch.frame, batch.previous_rows, batch.edits))
+    return merged
+
+
+def atomic_save(file_path, write_func):
+    """
+    Ghi file an toàn: ghi ra file tạm cùng thư mục rồi đổi tên đè lên file đích
+
+    Args:
+        file_path (str): File đích
+        write_func (callable): Hàm nhận đường dẫn file tạm và ghi dữ liệu vào đó
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    name, ext = os.path.splitext(os.path.basename(file_path))
+    tmp_path = os.path.join(directory, f".~{name}.saving{ext}")
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+class WorkbookPatcher:
+    """Giữ workbook đã mở và áp dụng các WriteBatch vào file"""
+
+    def __init__(self):
+        self.file_path = None
+        self.workbook = None
+        self._mtime = None
+        self._extra_columns = {}  # vị trí sheet → {tên cột thêm sau vùng dữ liệu: cột Excel}
+
+    def close(self):
+        """Đóng workbook đang giữ"""
+        if self.workbook is not None:
+            try:
+                self.workbook.close()
+            except Exception:
+                pass
+        self.file_path = None
+        self.workbook = None
+        self._mtime = None
+        self._extra_columns = {}
+
+    def _worksheet(self, batch):
+        """Mở workbook một lần, mở lại chỉ khi đổi file hoặc file bị sửa từ bên ngoài"""
+        mtime = os.path.getmtime(batch.file_path)
+        if self.workbook is None or self.file_path != batch.file_path or self._mtime != mtime:
+            self.close()
+            self.workbook = load_workbook(batch.file_path)
+            self.file_path = batch.file_path
+            self._mtime = mtime
+        ws = self._sheet(batch.layout)
+        if batch.sheet_index not in self._extra_columns:
+            self._extra_columns[batch.sheet_index] = self._discover_extra_columns(ws, batch.layout)
+        return ws
+
+    def _sheet(self, layout):
+        index = layout.get('sheet_index', 0)
+        worksheets = self.workbook.worksheets
+        return worksheets[index] if index < len(worksheets) else self.workbook.active
+
+    @staticmethod
+    def _discover_extra_columns(ws, layout):
+        """Tìm lại các cột đã được thêm vào sau vùng dữ liệu gốc ở lần ghi trước"""
+        extra = {}
+        header_row = layout['header_last_row']
+        for col_idx in range(layout['source_width'] + 1, ws.max_column + 1):
+            value = ws.cell(row=header_row, column=col_idx).value
+            if value is not None:
+                extra[str(value)] = col_idx
+        return extra
+
+    def _column_index(self, ws, batch, column):
+        """Trả về chỉ số cột Excel (1-based) cho cột DataFrame, cấp cột mới nếu cần"""
+        pos = batch.columns.index(column)
+        layout = batch.layout
+        if pos < layout['source_width']:
+            return pos + 1
+        extra_columns = self._extra_columns[batch.sheet_index]
+        if column not in extra_columns:
+            new_col = max([ws.max_column, layout['source_width']] + list(extra_columns.values())) + 1
+            ws.cell(row=layout['header_last_row'], column=new_col, value=str(column))
+            extra_columns[column] = new_col
+        return extra_columns[column]
+
+    def _write_cell(self, ws, batch, row_pos, column, value):
+        if column not in batch.columns:
+            return
+        ws.cell(row=batch.layout['data_start_row'] + row_pos,
+                column=self._column_index(ws, batch, column),
+                value=to_cell_value(value))
+
+    def _rewrite_data(self, ws, batch):
+        """Ghi lại toàn bộ vùng dữ liệu (chỉ khi số dòng thay đổi), giữ nguyên header"""
+        frame = batch.frame
+        for col_pos, column in enumerate(batch.columns):
+            values = frame.iloc[:, col_pos].tolist()
+            for row_pos, value in enumerate(values):
+                self._write_cell(ws, batch, row_pos, column, value)
+        # Xóa các dòng thừa nếu DataFrame ngắn hơn (VD: undo thao tác thêm học sinh)
+        last_col = max([batch.layout['source_width']] + list(self._extra_columns[batch.sheet_index].values()))
+        for row_pos in range(len(frame), batch.previous_rows):
+            excel_row = batch.layout['data_start_row'] + row_pos
+            for col_idx in range(1, last_col + 1):
+                ws.cell(row=excel_row, column=col_idx, value=None)
+
+    def apply(self, batch):
+        """
+        Ghi một batch vào file
+
+        Args:
+            batch (WriteBatch): Các thay đổi cần ghi
+        """
+        if batch.kind == 'file':
+            # Ghi lại cả file bằng pandas theo định dạng của file (Excel, CSV, Parquet)
+            self.close()
+            atomic_save(batch.file_path, lambda tmp: write_table(batch.frame, tmp))
+            if not batch.cells:
+                return
+
+        ws = self._worksheet(batch)
+        if batch.kind == 'data':
+            self._rewrite_data(ws, batch)
+        for (row_pos, column), value in batch.cells.items():
+            self._write_cell(ws, batch, row_pos, column, value)
+        atomic_save(batch.file_path, self.workbook.save)
+        self._mtime = os.path.getmtime(batch.file_path)
+
+
+class ExcelWriteback:
+    """
+    Vá các ô đã thay đổi vào workbook gốc thay vì ghi lại toàn bộ file
+
+    Với bảng ghép từ nhiều sheet/file (attrs[SOURCE_PARTS_KEY]), mỗi ô được ghi về đúng
+    sheet nguồn của dòng đó; bảng ghép không bao giờ được ghi đè lên một file nguồn.
+    """
+
+    def __init__(self):
+        self.file_path = None
+        self.layout = None
+        self.parts = []
+        self.patcher = WorkbookPatcher()
+        self._row_count = 0
+        self._dirty = {}
+        self._full_rewrite = False
+
+    def attach(self, file_path, df):
+        """
+        Gắn engine với file vừa được tải
+
+        Args:
+            file_path (str): Đường dẫn file Excel gốc
+            df (DataFrame): DataFrame đọc từ file (layout lấy từ df.attrs)
+        """
+        self.detach()
+        if df is None:
+            return
+        parts = df.attrs.get(SOURCE_PARTS_KEY)
+        if parts:
+            # Chỉ cần một phần không ghi lại được là không ghi từng ô (save_excel báo lỗi, giữ thay đổi)
+            if not unwritable_parts(parts):
+                self.parts = [dict(part) for part in parts]
+                self._row_count = len(df)
+            return
+        layout = df.attrs.get(SOURCE_LAYOUT_KEY)
+        if not file_path or not layout or not file_path.lower().endswith('.xlsx'):
+            return
+        self.file_path = file_path
+        self.layout = dict(layout)
+        self._row_count = len(df)
+
+    def detach(self):
+        """Bỏ gắn file hiện tại"""
+        self.file_path = None
+        self.layout = None
+        self.parts = []
+        self._row_count = 0
+        self._dirty = {}
+        self._full_rewrite = False
+
+    def reset_to_plain_layout(self, file_path, df):
+        """Gắn lại sau khi file được ghi đè bằng df.to_excel (header ở dòng 1)"""
+        self.detach()
+        if df is None or not file_path or not file_path.lower().endswith('.xlsx'):
+            return
+        self.file_path = file_path
+        self.layout = make_source_layout(0, 1, len(df.columns))
+        self._row_count = len(df)
+
+    @property
+    def can_patch(self):
+        """True nếu file hiện tại hỗ trợ ghi từng ô"""
+        return bool(self.parts) or (self.file_path is not None and self.layout is not None)
+
+    @property
+    def pending_count(self):
+        """Số ô đang chờ ghi"""
+        return sum(len(cols) for cols in self._dirty.values())
+
+    def has_pending(self):
+        """Kiểm tra có thay đổi chưa được ghi không"""
+        return self._full_rewrite or bool(self._dirty)
+
+    def mark_dirty(self, row_positions, columns):
+        """
+        Đánh dấu các ô đã thay đổi
+
+        Args:
+            row_positions: Vị trí dòng (0-based, theo thứ tự trong DataFrame)
+            columns: Danh sách tên cột đã thay đổi
+        """
+        if np.ndim(row_positions) == 0:
+            row_positions = [row_positions]
+        for pos in row_positions:
+            self._dirty.setdefault(int(pos), set()).update(columns)
+
+    def mark_all_dirty(self):
+        """Đánh dấu cần ghi lại toàn bộ vùng dữ liệu (VD: sau undo/restore)"""
+        self._full_rewrite = True
+
+    def _dirty_cells(self, df):
+        """Giá trị hiện tại của các ô đã đánh dấu: {(vị trí dòng, cột): giá trị}"""
+        cells = {}
+        for row_pos, row_columns in self._dirty.items():
+            if row_pos >= len(df):
+                continue
+            for column in row_columns:
+                if column in df.columns:
+                    cells[(row_pos, column)] = df.iat[row_pos, df.columns.get_loc(column)]
+        return cells
+
+    def _snapshot_parts(self, df):
+        """Tách các thay đổi của bảng ghép thành từng batch theo sheet nguồn"""
+        batches = []
+        if self._full_rewrite:
+            edits = max(self.pending_count, 1)
+            for part in self.parts:
+                frame = df.iloc[part['start']:part['stop']].reindex(columns=part['columns'])
+                batches.append(WriteBatch(part['file_path'], dict(part['layout']), list(part['columns']),
+                                          kind='data', frame=frame.reset_index(drop=True),
+                                          previous_rows=part['stop'] - part['start'], edits=edits))
+                edits = 0
+            return batches
+
+        starts = [part['start'] for part in self.parts]
+        by_part = {}
+        for (row_pos, column), value in self._dirty_cells(df).items():
+            index = bisect_right(starts, row_pos) - 1
+            if index < 0 or row_pos >= self.parts[index]['stop']:
+                continue
+            by_part.setdefault(index, {})[(row_pos - starts[index], column)] = value
+        for index, cells in sorted(by_part.items()):
+            part = self.parts[index]
+            batches.append(WriteBatch(part['file_path'], dict(part['layout']), list(part['columns']),
+                                      cells=cells, previous_rows=part['stop'] - part['start'],
+                                      edits=len(cells)))
+        return batches
+
+    def snapshot(self, df):
+        """
+        Chụp lại giá trị các ô đã thay đổi để ghi ở luồng khác
+
+        Args:
+            df (DataFrame): DataFrame hiện tại
+
+        Returns:
+            list | None: Các WriteBatch cần ghi (một batch cho mỗi sheet có thay đổi),
+            None nếu không thể ghi từng ô (cần ghi lại toàn bộ file; với bảng ghép: số dòng
+            đã đổi nên không ghi được về các sheet nguồn), khi đó các thay đổi vẫn được giữ
+        """
+        if not self.can_patch or df is None:
+            return None
+        if self.parts and len(df) != self._row_count:
+            # Không biết dòng thêm/bớt thuộc sheet nào: không ghi để tránh làm hỏng file nguồn,
+            # các ô đã sửa vẫn được giữ là chưa lưu
+            return None
+
+        if self.parts:
+            batches = self._snapshot_parts(df)
+        elif self._full_rewrite or len(df) != self._row_count:
+            batches = [WriteBatch(self.file_path, dict(self.layout), list(df.columns), kind='data',
+                                  frame=df.copy(), previous_rows=self._row_count,
+                                  edits=max(self.pending_count, 1))]
+        else:
+            cells = self._dirty_cells(df)
+            batches = [WriteBatch(self.file_path, dict(self.layout), list(df.columns), cells=cells,
+                                  previous_rows=self._row_count, edits=len(cells))]
+
+        if not self.parts:
+            self._row_count = len(df)
+        self._dirty = {}
+        self._full_rewrite = False
+        return [batch for batch in batches if batch.kind != 'cells' or batch.cells]
+
+    def flush(self, df):
+        """
+        Ghi ngay các thay đổi đang chờ vào file (đồng bộ)
+
+        Args:
+            df (DataFrame): DataFrame hiện tại
+
+        Returns:
+            bool: False nếu không thể ghi từng ô, khi đó cần ghi lại toàn bộ file
+        """
+        batches = self.snapshot(df)
+        if batches is None:
+            return False
+        try:
+            for batch in batches:
+                self.patcher.apply(batch)
+        except Exception as e:
+            print(f"Lỗi khi ghi từng ô vào Excel, chuyển sang ghi toàn bộ: {e}")
+            self.patcher.close()
+            self.detach()
+            return False
+        return True
+
+
+class WriteBehindQueue:
+    """
+    Luồng ghi nền: nhận các batch qua queue, gộp các lần sửa liên tiếp
+    thành một lần ghi để không chặn main loop của Tk
+
+    Batch ghi lỗi (VD: file đang mở trong Excel) được giữ lại và ghi lại trước các thay đổi
+    mới ở lần submit/drain tiếp theo, nên thay đổi không bị mất khi một lần ghi thất bại.
+    """
+
+    _STOP = object()
+    _WAKE = object()
+
+    def __init__(self, writeback, coalesce_delay=1.0, max_delay=10.0):
+        """
+        Args:
+            writeback (ExcelWriteback): Engine tạo batch và giữ workbook
+            coalesce_delay (float): Thời gian chờ (giây) không có sửa đổi mới trước khi ghi
+            max_delay (float): Thời gian tối đa (giây) một thay đổi được phép chờ
+        """
+        self.writeback = writeback
+        self.coalesce_delay = coalesce_delay
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._flush_now = threading.Event()
+        self._lock = threading.Lock()
+        self._pending_edits = 0
+        self._last_latency = None
+        self._last_edits = 0
+        self._last_error = None
+        self._flush_count = 0
+        self._failed = []
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="excel-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, df):
+        """
+        Đưa các thay đổi hiện tại của df vào hàng đợi ghi
+
+        Returns:
+            bool: False nếu file không hỗ trợ ghi từng ô (dùng submit_frame thay thế)
+        """
+        batches = self.writeback.snapshot(df)
+        if batches is None:
+            return False
+        self.retry_failed()
+        for batch in batches:
+            self._put(batch)
+        return True
+
+    def submit_frame(self, file_path, frame):
+        """Đưa yêu cầu ghi lại toàn bộ file từ một bản sao DataFrame vào hàng đợi"""
+        self.retry_failed()
+        self._put(WriteBatch(file_path, None, list(frame.columns), kind='file',
+                             frame=frame, edits=1))
+
+    def retry_failed(self):
+        """Đưa lại các batch ghi lỗi vào hàng đợi (trước các thay đổi mới hơn)"""
+        with self._lock:
+            failed, self._failed = self._failed, []
+        for batch in failed:
+            self._put(batch)
+
+    def _put(self, batch):
+        with self._lock:
+            self._pending_edits += batch.edits
+        self._ensure_thread()
+        self._queue.put(batch)
+
+    def _collect(self, first):
+        """Gom các batch đến trong khoảng coalesce_delay (tối đa max_delay)"""
+        batches = [first]
+        processed = 1
+        stop = False
+        started = time.monotonic()
+        while True:
+            if self._flush_now.is_set():
+                timeout = 0
+            else:
+                timeout = min(self.coalesce_delay, self.max_delay - (time.monotonic() - started))
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            processed += 1
+            if item is self._STOP:
+                stop = True
+                break
+            if item is not self._WAKE:
+                batches.append(item)
+        return batches, processed, stop
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+            if item is self._WAKE:
+                self._queue.task_done()
+                continue
+
+            batches, processed, stop = self._collect(item)
+            edits = sum(batch.edits for batch in batches)
+            started = time.perf_counter()
+            error = None
+            failed = []
+            for batch in merge_batches(batches):
+                try:
+                    self.writeback.patcher.apply(batch)
+                except Exception as e:
+                    error = str(e)
+                    failed.append(batch)
+                    self.writeback.patcher.close()
+                    print(f"Lỗi khi ghi file nền, giữ lại {batch.edits} thay đổi để ghi lại: {e}")
+
+            with self._lock:
+                self._failed.extend(failed)
+                self._pending_edits -= edits
+                self._last_latency = time.perf_counter() - started
+                self._last_edits = edits
+                self._last_error = error
+                self._flush_count += 1
+            for _ in range(processed):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def drain(self):
+        """Ghi ngay mọi thay đổi đang chờ (kể cả các batch ghi lỗi trước đó) và đợi đến khi hoàn tất"""
+        self.retry_failed()
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._flush_now.set()
+        self._queue.put(self._WAKE)
+        self._queue.join()
+        self._flush_now.clear()
+
+    def stop(self):
+        """Ghi hết thay đổi đang chờ rồi dừng luồng ghi"""
+        self.drain()
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        """
+        Trạng thái hàng đợi để hiển thị trên status bar
+
+        Returns:
+            dict: pending, failed (số thay đổi ghi lỗi chưa được lưu), last_latency (giây),
+            last_edits, last_error, flushes
+        """
+        with self._lock:
+            return {
+                'pending': self._pending_edits,
+                'failed': sum(batch.edits for batch in self._failed),
+                'last_latency': self._last_latency,
+                'last_edits': self._last_edits,
+                'last_error': self._last_error,
+                'flushes': self._flush_count
+            }
@@ -0,0 +1,139 @@
+"""
+Module đọc file ở luồng nền, có thể hủy
+
+Công việc đọc chạy trên một luồng riêng. Tiến trình, kết quả và lỗi chỉ được chuyển cho
+giao diện qua poll() được gọi định kỳ bằng root.after, nên Tk không bao giờ bị gọi từ luồng
+nền và dữ liệu cũ chỉ được thay khi việc đọc hoàn tất. Bắt đầu công việc mới sẽ hủy công
+việc đang chạy; kết quả của công việc đã hủy bị bỏ qua.
+"""
+
+import queue
+import threading
+import traceback
+
+
+class LoadCancelled(Exception):
+    """Công việc đọc đã bị hủy (người dùng bấm hủy hoặc mở file khác)"""
+
+
+class LoadJob:
+    """Một lần đọc file; report() được gọi từ luồng nền để báo tiến trình"""
+
+    def __init__(self, job_id, on_done, on_error=None, on_cancel=None, on_progress=None):
+        self.id = job_id
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress
+        self.progress = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, done, total=None):
+        """Ghi nhận tiến trình (gọi từ luồng nền); đây cũng là điểm dừng khi bị hủy"""
+        if self.cancel_event.is_set():
+            raise LoadCancelled()
+        self.progress = (done, total)
+
+
+class BackgroundLoader:
+    """
+    Chạy từng công việc đọc file trên luồng nền và trả kết quả về luồng giao diện
+
+    Args:
+        schedule: Hàm schedule(ms, callback), thường là root.after
+        poll_interval_ms (int): Chu kỳ kiểm tra kết quả khi đang có công việc
+    """
+
+    def __init__(self, schedule, poll_interval_ms=100):
+        self.schedule = schedule
+        self.poll_interval_ms = poll_interval_ms
+        self._results = queue.Queue()
+        self._job = None
+        self._next_id = 0
+        self._poll_scheduled = False
+        self._last_progress = None
+
+    @property
+    def busy(self):
+        return self._job is not None
+
+    def start(self, task, on_done, on_error=None, on_cancel=None, on_progress=None):
+        """
+        Bắt đầu đọc ở luồng nền, hủy công việc đang chạy (nếu có)
+
+        Args:
+            task: Hàm task(report) chạy ở luồng nền, trả về kết quả;
+                  report(done, total) báo tiến trình và ném LoadCancelled khi bị hủy
+            on_done(result), on_error(exception), on_cancel(), on_progress(done, total):
+                Các callback, luôn được gọi trên luồng giao diện
+
+        Returns:
+            LoadJob
+        """
+        self.cancel()
+        self._next_id += 1
+        job = LoadJob(self._next_id, on_done, on_error, on_cancel, on_progress)
+        self._job = job
+        self._last_progress = None
+        thread = threading.Thread(target=self._run, args=(job, task),
+                                  name=f"file-loader-{job.id}", daemon=True)
+        thread.start()
+        self._schedule_poll()
+        return job
+
+    def _run(self, job, task):
+        try:
+            result = task(job.report)
+        except LoadCancelled:
+            self._results.put((job, 'cancelled', None))
+        except Exception as e:
+            traceback.print_exc()
+            self._results.put((job, 'error', e))
+        else:
+            self._results.put((job, 'cancelled' if job.cancelled else 'done', result))
+
+    def cancel(self):
+        """Hủy công việc đang chạy; on_cancel được gọi ngay. Trả về True nếu có công việc bị hủy"""
+        job = self._job
+        if job is None:
+            return False
+        job.cancel_event.set()
+        self._job = None
+        if job.on_cancel:
+            job.on_cancel()
+        return True
+
+    def poll(self):
+        """Chuyển tiến trình và kết quả sang luồng giao diện (được gọi qua schedule)"""
+        self._poll_scheduled = False
+        while True:
+            try:
+                job, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if job is not self._job:
+                continue  # Kết quả của công việc đã bị hủy
+            self._job = None
+            if kind == 'done':
+                job.on_done(payload)
+            elif kind == 'error' and job.on_error:
+                job.on_error(payload)
+            elif kind == 'cancelled' and job.on_cancel:
+                job.on_cancel()
+
+        job = self._job
+        if job is not None:
+            progress = job.progress
+            if job.on_progress and progress is not None and progress != self._last_progress:
+                self._last_progress = progress
+                job.on_progress(*progress)
+            self._schedule_poll()
+
+    def _schedule_poll(self):
+        if not self._poll_scheduled:
+            self._poll_scheduled = True
+            self.schedule(self.poll_interval_ms, self.poll)
@@ -1,3 +1,9 @@
+import multiprocessing
+
+# Bản đóng gói (PyInstaller): tiến trình con đọc sheet song song chạy lại file exe,
+# freeze_support chuyển nó sang chạy tác vụ được giao trước khi nạp thư viện giao diện
+multiprocessing.freeze_support()
+
 import tkinter as tk
 import customtkinter as ctk
 from tkinter import ttk, messagebox, filedialog, simpledialog
@@ -6,6 +12,8 @@ from pandas import CategoricalDtype
 import os
 import sys
 import json
+import copy
+import heapq
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 from matplotlib.figure import Figure
@@ -18,195 +26,41 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import threading
+import time
 import requests
 import re
-from collections import OrderedDict
 from openpyxl import load_workbook
 
 # Import các module mới
 import version_utils
 import themes
 import ui_utils
+from excel_writer import ExcelWriteback, WriteBehindQueue, SOURCE_LAYOUT_KEY, SOURCE_PARTS_KEY, make_source_layout, unwritable_parts
+from data_model import DataModel, UndoManager
+from caching import ConfigCache, DataFrameCache, DiskFrameCache, MergedRangesCache, SearchCache, VersionedCache
+from virtual_tree import VirtualTreeview, format_display_rows
+from column_resolver import ColumnResolver
+from excel_reader import read_sheet, read_merged_ranges, MergedRanges, SheetStream
+from tabular_io import CsvSource, PARQUET_AVAILABLE, file_format, read_parquet
+from workbook_loader import list_sources, read_sheets, combine_parts
+from file_loader import BackgroundLoader
+from score_stats import ScoreStats
+from refresh_scheduler import RefreshScheduler
+from dtype_planner import plan_dtypes, apply_dtypes, set_score, set_exam_code, coerce_exam_code, sort_key
 
 # ========================================
 # CACHING LAYER
 # ========================================
 
-class ConfigCache:
-    """Cache cho config file để tránh đọc file liên tục"""
-    _cache = None
-    _last_modified = None
-    
-    @classmethod
-    def get_config(cls, config_path):
-        """Lấy config từ cache hoặc đọc file nếu có thay đổi"""
-        try:
-            if not os.path.exists(config_path):
-                return None
-                
-            current_mtime = os.path.getmtime(config_path)
-            
-            if cls._cache is None or cls._last_modified != current_mtime:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    cls._cache = json.load(f)
-                cls._last_modified = current_mtime
-            
-            return cls._cache
-        except Exception as e:
-            print(f"Error getting config from cache: {e}")
-            return None
-    
-    @classmethod
-    def invalidate(cls):
-        """Xóa cache"""
-        cls._cache = None
-        cls._last_modified = None
-
-
-class DataFrameCache:
-    """Cache cho DataFrame từ Excel files"""
-    def __init__(self, max_size=3):
-        self.cache = OrderedDict()
-        self.max_size = max_size
-    
-    def _get_file_key(self, file_path):
-        """Tạo key duy nhất cho file dựa trên path và modification time"""
-        try:
-            if not os.path.exists(file_path):
-                return None
-            mtime = os.path.getmtime(file_path)
-            return f"{file_path}_{mtime}"
-        except:
-            return None
-    
-    def get(self, file_path):
-        """Lấy DataFrame từ cache"""
-        key = self._get_file_key(file_path)
-        if key and key in self.cache:
-            # Di chuyển key lên đầu (most recently used)
-            self.cache.move_to_end(key)
-            return self.cache[key].copy()
-        return None
-    
-    def set(self, file_path, df):
-        """Lưu DataFrame vào cache"""
-        key = self._get_file_key(file_path)
-        if key is None:
-            return
-        
-        # Xóa file cũ nếu vượt quá max_size
-        if len(self.cache) >= self.max_size:
-            self.cache.popitem(last=False)  # Xóa oldest
-        
-        self.cache[key] = df.copy()
-    
-    def clear(self):
-        """Xóa toàn bộ cache"""
-        self.cache.clear()
-
-
-class SearchCache:
-    """Cache cho kết quả search"""
-    def __init__(self):
-        self.cache = {}
-        self.df_hash = None
-    
-    def _get_df_hash(self, df):
-        """Tạo hash cho DataFrame để detect thay đổi"""
-        try:
-            return hash(f"{len(df)}_{df.shape[1]}_{df.iloc[0].sum() if len(df) > 0 else 0}")
-        except:
-            return None
-    
-    def clear_if_data_changed(self, df):
-        """Xóa cache nếu DataFrame thay đổi"""
-        current_hash = self._get_df_hash(df)
-        if current_hash != self.df_hash:
-            self.cache.clear()
-            self.df_hash = current_hash
-    
-    def get(self, query):
-        """Lấy kết quả search từ cache"""
-        return self.cache.get(query.lower())
-    
-    def set(self, query, results):
-        """Lưu kết quả search vào cache"""
-        self.cache[query.lower()] = results
-    
-    def clear(self):
-        """Xóa toàn bộ cache"""
-        self.cache.clear()
-        self.df_hash = None
-
-
-class StatsCache:
-    """Cache cho statistics calculations"""
-    def __init__(self):
-        self.stats = None
-        self.df_version = None
-    
-    def _get_df_version(self, df):
-        """Tạo version identifier cho DataFrame"""
-        try:
-            if df is None or len(df) == 0:
-                return "empty"
-            return f"{len(df)}_{df.shape[1]}_{df.iloc[0].sum() if len(df) > 0 else 0}"
-        except:
-            return None
-    
-    def get_stats(self, df, force_recalc=False):
-        """Lấy stats từ cache hoặc tính lại nếu cần"""
-        current_version = self._get_df_version(df)
-        
-        if force_recalc or self.stats is None or self.df_version != current_version:
-            self.stats = self._calculate_stats(df)
-            self.df_version = current_version
-        
-        return self.stats
-    
-    def _calculate_stats(self, df):
-        """Tính toán statistics"""
-        try:
-            if df is None or len(df) == 0:
-                return {
-                    'total': 0,
-                    'scored': 0,
-                    'mean': 0,
-                    'max': 0,
-                    'min': 0
-                }
-            
-            score_col = None
-            for col in ['Điểm', 'score', 'Score']:
-                if col in df.columns:
-                    score_col = col
-                    break
-            
-            if score_col is None:
-                return {'total': len(df), 'scored': 0, 'mean': 0, 'max': 0, 'min': 0}
-            
-            scores = df[score_col].dropna()
-            return {
-                'total': len(df),
-                'scored': len(scores),
-                'mean': float(scores.mean()) if len(scores) > 0 else 0,
-                'max': float(scores.max()) if len(scores) > 0 else 0,
-                'min': float(scores.min()) if len(scores) > 0 else 0
-            }
-        except Exception as e:
-            print(f"Error calculating stats: {e}")
-            return {'total': 0, 'scored': 0, 'mean': 0, 'max': 0, 'min': 0}
-    
-    def clear(self):
-        """Xóa cache"""
-        self.stats = None
-        self.df_version = None
-
-
 # Khởi tạo global cache instances
 _df_cache = DataFrameCache(max_size=3)
 _search_cache = SearchCache()
-_stats_cache = StatsCache()
+_score_stats = ScoreStats()  # Thống kê điểm cập nhật theo từng ô thay đổi
+_score_cache = VersionedCache()  # Điểm cao/thấp nhất, phân loại, biểu đồ theo phiên bản dữ liệu
+_column_resolver = ColumnResolver()  # Ánh xạ tên cột logic → cột thực, xóa khi cấu hình thay đổi
+_writeback = ExcelWriteback()  # Ghi từng ô đã thay đổi vào workbook gốc
+_write_queue = WriteBehindQueue(_writeback)  # Luồng ghi nền, gộp các lần sửa liên tiếp
+_file_loader = BackgroundLoader(lambda ms, callback: root.after(ms, callback))  # Đọc file ở luồng nền
 
 # ========================================
 # END CACHING LAYER
@@ -246,82 +100,6 @@ class ToolTip:
             self.tooltip.destroy()
             self.tooltip = None
 
-# Undo/Redo Manager
-class UndoManager:
-    """Quản lý undo/redo cho các thao tác chỉnh sửa dữ liệu"""
-    def __init__(self, max_history=50):
-        self.undo_stack = []  # Stack lưu các state trước đó
-        self.redo_stack = []  # Stack lưu các state đã undo
-        self.max_history = max_history
-    
-    def push_state(self, state, action_name):
-        """Lưu state hiện tại vào undo stack
-        
-        Args:
-            state: DataFrame copy hoặc dict chứa thông tin state
-            action_name: Tên hành động (VD: "Nhập điểm cho Nguyễn Văn A")
-        """
-        if state is not None:
-            self.undo_stack.append({
-                'state': state.copy() if hasattr(state, 'copy') else state,
-                'action': action_name,
-                'timestamp': datetime.now()
-            })
-            # Giới hạn kích thước stack
-            if len(self.undo_stack) > self.max_history:
-                self.undo_stack.pop(0)
-            # Clear redo stack khi có thay đổi mới
-            self.redo_stack.clear()
-    
-    def undo(self):
-        """Hoàn tác thao tác cuối cùng
-        
-        Returns:
-            tuple: (state, action_name) hoặc (None, None) nếu không thể undo
-        """
-        if self.can_undo():
-            current = self.undo_stack.pop()
-            self.redo_stack.append(current)
-            return current['state'], current['action']
-        return None, None
-    
-    def redo(self):
-        """Làm lại thao tác đã hoàn tác
-        
-        Returns:
-            tuple: (state, action_name) hoặc (None, None) nếu không thể redo
-        """
-        if self.can_redo():
-            current = self.redo_stack.pop()
-            self.undo_stack.append(current)
-            return current['state'], current['action']
-        return None, None
-    
-    def can_undo(self):
-        """Kiểm tra có thể undo không"""
-        return len(self.undo_stack) > 0
-    
-    def can_redo(self):
-        """Kiểm tra có thể redo không"""
-        return len(self.redo_stack) > 0
-    
-    def clear(self):
-        """Xóa toàn bộ history"""
-        self.undo_stack.clear()
-        self.redo_stack.clear()
-    
-    def get_undo_info(self):
-        """Lấy thông tin về thao tác có thể undo"""
-        if self.can_undo():
-            return self.undo_stack[-1]['action']
-        return None
-    
-    def get_redo_info(self):
-        """Lấy thông tin về thao tác có thể redo"""
-        if self.can_redo():
-            return self.redo_stack[-1]['action']
-        return None
-
 # Toast Notification System
 class ToastNotification:
     """Hệ thống thông báo toast hiện đại bằng CustomTkinter Frame"""
@@ -406,6 +184,10 @@ def get_config_path():
     
     return os.path.join(appdata_local, 'app_config.json')
 
+def get_cache_dir():
+    """Thư mục cache dữ liệu đã đọc từ file Excel, nằm cạnh file config"""
+    return os.path.join(os.path.dirname(get_config_path()), 'cache')
+
 def load_bundled_config():
     """Tải config mẫu từ file được bundle với ứng dụng"""
     try:
@@ -427,13 +209,16 @@ def load_bundled_config():
 
 # Cấu hình cơ bản - tải từ file thay vì hardcode
 def load_config():
-    """Tải cấu hình từ file JSON"""
+    """Tải cấu hình qua ConfigCache (chỉ đọc lại file JSON khi file thay đổi)"""
     try:
         config_path = get_config_path()
-        print(f"Đường dẫn config: {config_path}")  # Debug
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(config_path)
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        cached_config = ConfigCache.get_config(config_path)
+        if cached_config is None:
+            raise ValueError(f"Không đọc được file config: {config_path}")
+        return cached_config
     except FileNotFoundError:
         print("File config chưa tồn tại, tạo config mặc định")
         
@@ -495,8 +280,7 @@ def load_config():
         
         # Lưu config mặc định ngay lập tức
         try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, ensure_ascii=False, indent=4)
+            ConfigCache.write_config(config_path, default_config)
             print(f"Đã tạo file config mới tại: {config_path}")
         except Exception as e:
             print(f"Không thể lưu config mặc định: {str(e)}")
@@ -562,13 +346,54 @@ config = load_config()
 config['ui']['dark_mode'] = True
 # Áp dụng theme tối trực tiếp vào config
 config = themes.apply_theme_to_config(config, True)
+ConfigCache.put(config)
+
+# Giới hạn cache DataFrame trong bộ nhớ theo cấu hình
+_df_cache.resize(
+    max_size=config.get('excel_reading', {}).get('performance', {}).get('cache_max_files', 3),
+    max_bytes=config.get('excel_reading', {}).get('performance', {}).get('cache_max_mb', 256) * 1024 * 1024)
+
+# Cache dữ liệu đã đọc trên đĩa, giữ qua các lần mở ứng dụng
+_disk_cache = DiskFrameCache(
+    get_cache_dir(),
+    max_bytes=config.get('excel_reading', {}).get('performance', {}).get('disk_cache_max_mb', 200) * 1024 * 1024)
+
+# Vùng merged cells ở phần header theo băm nội dung file (cache_merged_info)
+_merged_cache = MergedRangesCache(get_cache_dir())
+
+CONFIG_SAVE_DELAY_MS = 500  # Gộp các lần lưu cấu hình liên tiếp trong khoảng này
+_config_save_job = None
+
+def save_config(immediate=False):
+    """
+    Lưu cấu hình ra file JSON trong AppData
+    
+    Cấu hình trong bộ nhớ được cập nhật ngay; việc ghi file được gộp lại và thực hiện
+    sau CONFIG_SAVE_DELAY_MS (hoặc ngay lập tức nếu immediate=True).
+    """
+    global _config_save_job
+    ConfigCache.put(config)
+    _column_resolver.invalidate()
+    
+    if _config_save_job is not None:
+        root.after_cancel(_config_save_job)
+        _config_save_job = None
+    
+    if immediate:
+        flush_config()
+    else:
+        _config_save_job = root.after(CONFIG_SAVE_DELAY_MS, flush_config)
 
-def save_config():
-    """Lưu cấu hình ra file JSON trong AppData"""
+def flush_config():
+    """Ghi cấu hình đang chờ ra file (ghi nguyên tử qua file tạm)"""
+    global _config_save_job
+    if _config_save_job is not None:
+        root.after_cancel(_config_save_job)
+        _config_save_job = None
+    
     try:
         config_path = get_config_path()
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
+        ConfigCache.write_config(config_path, config)
         print(f"Đã lưu config tại: {config_path}")  # Debug
     except Exception as e:
         print(f"Lỗi khi lưu cấu hình: {str(e)}")
@@ -638,16 +463,27 @@ ctk.set_appearance_mode("Dark")
 root.title("Quản lí điểm học sinh")
 df = None
 file_path = None
-undo_stack = []
-undo_manager = UndoManager(max_history=50)  # Quản lý undo/redo
+undo_manager = UndoManager(max_history=50)  # Quản lý undo/redo (lưu diff từng ô)
 search_timer_id = None  # Thêm biến để theo dõi timer
-search_index = None    # Thêm biến để lưu search index
+data_model = DataModel()    # Giữ df hiện tại và phiên bản dữ liệu (khóa cho mọi cache)
+ui_refresh = RefreshScheduler(root.after_idle)    # Gộp các lần vẽ lại panel thống kê vào một lần khi Tk rảnh
+search_index = data_model.row_index    # Chỉ mục tra cứu vị trí dòng (tên/mã học sinh, treeview item)
+display_columns = {}    # Cột hiển thị trên danh sách học sinh: name/exam_code/score
+student_view = None    # Danh sách ảo hiển thị học sinh (VirtualTreeview)
 last_activity_time = None  # Thêm biến để theo dõi thời gian hoạt động cuối cùng
 lock_window = None  # Thêm biến để theo dõi cửa sổ khóa
 lock_time = None  # Thêm biến để theo dõi thời gian khóa
 current_filter_type = 'all'  # Lọc mặc định là tất cả
 
 
+# Cột có tên chứa các từ này là cột điểm (chuyển sang số khi đọc)
+SCORE_COLUMN_PATTERNS = ['điểm', 'đđg', 'đtb', 'score', 'point']
+
+def is_score_column(column):
+    """True nếu tên cột là cột điểm số"""
+    col_lower = str(column).lower()
+    return any(pattern in col_lower for pattern in SCORE_COLUMN_PATTERNS)
+
 def ensure_proper_dtypes(df_input):
     """
     Đảm bảo các kiểu dữ liệu đúng cho các cột quan trọng, đặc biệt là xử lý cột Categorical
@@ -659,10 +495,8 @@ def ensure_proper_dtypes(df_input):
     df_copy = df_input.copy()
     
     # Xử lý tất cả các cột điểm số (tìm theo pattern)
-    score_patterns = ['điểm', 'đđg', 'đtb', 'score', 'point']
     for col in df_copy.columns:
-        col_lower = str(col).lower()
-        if any(pattern in col_lower for pattern in score_patterns):
+        if is_score_column(col):
             # Chuyển đổi sang dạng số
             try:
                 df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce')
@@ -699,7 +533,14 @@ def ensure_proper_dtypes(df_input):
         except Exception as e:
             print(f"Lỗi khi chuyển đổi cột {name_col}: {str(e)}")
     
-    return df_copy
+    # Thu gọn kiểu dữ liệu: mã đề/giới tính/lớp → category, điểm → float32, tên → chuỗi Arrow
+    score_columns = [col for col in df_copy.columns if is_score_column(col)]
+    category_columns = [col for col in ('Mã đề',
+                                        find_matching_column(df_copy, 'Giới tính'),
+                                        find_matching_column(df_copy, 'Lớp')) if col]
+    plan = plan_dtypes(df_copy, score_columns=score_columns, category_columns=category_columns,
+                       text_columns=[name_col])
+    return apply_dtypes(df_copy, plan)
 
 
 
@@ -842,136 +683,62 @@ def update_activity_time(event=None):
     global last_activity_time
     last_activity_time = datetime.now()
 
-def load_excel_lazily(file_path, chunk_size=1000, header_row=None):
+def load_excel_lazily(file_path, chunk_size=5000, header_row=None, config=None, progress=None):
     """
-    Đọc file Excel với kỹ thuật lazy loading để xử lý dữ liệu lớn
+    Đọc file Excel lớn theo luồng (openpyxl read_only), mỗi lần chỉ giữ một khối dòng
+    
+    Không dùng giao diện nên có thể chạy ở luồng nền.
     
     Args:
         file_path (str): Đường dẫn tới file Excel
-        chunk_size (int): Kích thước mỗi chunk khi đọc dữ liệu
-        header_row (int): Dòng chứa tiêu đề, None nếu cần tự động tìm
+        chunk_size (int): Số dòng mỗi khối khi đọc dữ liệu
+        header_row (int): Dòng chứa tiêu đề (0-based), None nếu cần tự động tìm
+        config (dict): Cấu hình đọc Excel, None để dùng cấu hình hiện tại
+        progress: Hàm progress(rows_read, total_rows) được gọi sau mỗi khối
         
     Returns:
-        pd.DataFrame: DataFrame hoàn chỉnh sau khi đọc
+        pd.DataFrame: Dữ liệu thô (chưa chuẩn hóa kiểu), có layout sheet gốc trong attrs
     """
-    from pandas.io.excel._openpyxl import OpenpyxlReader
-    global _df_cache
-    
-    # Trạng thái tiến trình
-    status_label.configure(text=f"Đang lập kế hoạch đọc file lớn: {os.path.basename(file_path)}...", 
-)
-    root.update()
-    
-    try:
-        # Check cache
+    if config is None:
         config = load_config()
-        enable_caching = config.get('excel_reading', {}).get('performance', {}).get('enable_caching', True)
-        
-        if enable_caching:
-            cached_df = _df_cache.get(file_path)
-            if cached_df is not None:
-                status_label.configure(text=f"Đã load file từ cache")
-                return cached_df
-        
-        # Đọc thông tin file để tìm hiểu số dòng
-        excel_reader = pd.ExcelFile(file_path, engine='openpyxl')
-        sheet_name = excel_reader.sheet_names[0]  # Lấy sheet đầu tiên
-        
-        # Chỉ đọc header để phân tích
+    header_config = config.get('excel_reading', {}).get('header_detection', {})
+    
+    fast = config.get('excel_reading', {}).get('performance', {}).get('fast_reader', True)
+    with SheetStream(file_path, block_size=chunk_size, fast=fast) as stream:
+        header_depth = 1
         if header_row is None:
-            # Đọc nhiều dòng hơn để phân tích header
-            max_rows = config.get('excel_reading', {}).get('header_detection', {}).get('max_search_rows', 50)
-            header_sample = pd.read_excel(excel_reader, sheet_name=sheet_name, nrows=max_rows)
-            
-            # Tìm hàng chứa header với scoring
-            header_row = find_header_row(header_sample, config)
-        
-        # Cập nhật trạng thái
-        status_label.configure(text=f"Đang đọc dữ liệu theo chunk từ dòng {header_row+1}...", 
-)
-        root.update()
-        
-        # Check multi-level headers
-        multi_level = config.get('excel_reading', {}).get('header_detection', {}).get('multi_level_support', True)
-        header_rows_list = None
-        
-        if multi_level and header_row < max_rows - 1:
-            # Có thể có multi-level, đọc thêm vài dòng
-            header_rows_to_read = min(3, max_rows - header_row)
-            if header_rows_to_read > 1:
-                header_rows_list = list(range(header_row, header_row + header_rows_to_read))
-        
-        # Đọc dữ liệu theo từng chunk
-        chunks = []
-        if header_rows_list:
-            reader = pd.read_excel(
-                excel_reader, 
-                sheet_name=sheet_name,
-                header=header_rows_list,
-                chunksize=chunk_size
-            )
-        else:
-            reader = pd.read_excel(
-                excel_reader, 
-                sheet_name=sheet_name,
-                header=header_row,
-                chunksize=chunk_size
-            )
-        
-        total_rows = 0
-        
-        for i, chunk in enumerate(reader):
-            # Flatten MultiIndex columns nếu có
-            if isinstance(chunk.columns, pd.MultiIndex):
-                separator = config.get('excel_reading', {}).get('header_detection', {}).get('merge_separator', '_')
-                chunk.columns = [separator.join(str(i) for i in col if str(i) != 'nan').strip(separator) 
-                                for col in chunk.columns.values]
-            
-            chunks.append(chunk)
-            
-            total_rows += len(chunk)
-            status_label.configure(text=f"Đang đọc dữ liệu: {total_rows} dòng...", 
-)
-            root.update()
-            
-            # Nếu đã đọc quá nhiều, hiển thị cảnh báo
-            if total_rows > 10000:
-                status_label.configure(text=f"File lớn: đã đọc {total_rows} dòng...", 
-)            # Ghép các chunk lại
-        
-        if chunks:
-            status_label.configure(text=f"Đang ghép {len(chunks)} chunk dữ liệu...", 
-)
-            root.update()
-        
-            result = pd.concat(chunks, ignore_index=True)
-        
-            # Đảm bảo kiểu dữ liệu phù hợp cho các cột quan trọng
-            result = ensure_proper_dtypes(result)
-            
-            # Cache result
-            if enable_caching:
-                _df_cache.set(file_path, result)
-        
-            status_label.configure(text=f"Đã đọc xong {total_rows} dòng dữ liệu", 
-)
-            return result
-        else:
-            return pd.DataFrame()
-            
-    except Exception as e:
-        status_label.configure(text=f"Lỗi khi đọc file: {str(e)}", 
-)
-        ToastNotification.show(
-            f"❌ Không thể đọc file Excel\n"
-            f"📄 Lỗi: {str(e)}\n"
-            f"💡 Kiểm tra:\n"
-            f"  • File có đúng định dạng .xlsx?\n"
-            f"  • File có đang mở ở ứng dụng khác?\n"
-            f"  • File có bị hỏng không?", 
-            "error")
-        print(f"Chi tiết lỗi: {traceback.format_exc()}")
-        return pd.DataFrame()  # Trả về DataFrame rỗng thay vì None
+            # Dò header trên các dòng đầu, các dòng này được giữ lại cho phần dữ liệu.
+            # <mergeCells> nằm sau dữ liệu nên vùng merge được đọc riêng (hoặc lấy từ cache)
+            max_rows = header_config.get('max_search_rows', 50)
+            detection = detect_header(stream.header_sample(max_rows), config,
+                                      load_merged_ranges(file_path, config))
+            header_row = detection['header_row']
+            header_depth = detection['header_depth']
+        
+        separator = header_config.get('merge_separator', '_')
+        result = stream.read_frame(header_row, header_depth, separator, progress=progress)
+    
+    if not result.empty:
+        # Lưu vị trí dữ liệu trong sheet gốc để save_excel chỉ vá các ô thay đổi
+        result.attrs[SOURCE_LAYOUT_KEY] = make_source_layout(header_row, header_depth, len(result.columns))
+    return result
+
+def load_csv(file_path, config):
+    """
+    Đọc file CSV: dò bảng mã, dấu phân cách và dòng header như file Excel rồi đọc dữ liệu bằng pandas
+    
+    Chỉ các cột điểm được chuyển sang số, các cột khác giữ nguyên dạng chữ như trong file.
+    
+    Returns:
+        pd.DataFrame: Dữ liệu thô (chưa chuẩn hóa kiểu), các lựa chọn để ghi lại file nằm trong attrs
+    """
+    header_config = config.get('excel_reading', {}).get('header_detection', {})
+    source = CsvSource(file_path)
+    max_rows = header_config.get('max_search_rows', 50)
+    detection = detect_header(source.header_sample(max_rows), config)
+    separator = header_config.get('merge_separator', '_')
+    return source.read_frame(detection['header_row'], detection['header_depth'], separator,
+                             numeric=is_score_column)
 
 def add_to_recent_files(filepath):
     """Thêm file vào danh sách recent files"""
@@ -996,8 +763,6 @@ def add_to_recent_files(filepath):
 
 def open_recent_file(filepath):
     """Mở file từ danh sách recent files"""
-    global df, file_path
-    
     # Kiểm tra file có tồn tại không
     if not os.path.exists(filepath):
         ToastNotification.show(f"File không tồn tại: {os.path.basename(filepath)}", "error")
@@ -1008,31 +773,7 @@ def open_recent_file(filepath):
             update_recent_files_menu()
         return
     
-    file_path = filepath
-    status_label.configure(text=f"Đang đọc file: {os.path.basename(file_path)}...")
-    root.update()
-    
-    try:
-        df = read_excel_file(file_path)
-        
-        if df is not None and not df.empty:
-            total_students = len(df)
-            status_label.configure(text=f"Đã đọc xong: {os.path.basename(file_path)} ({total_students} học sinh)")
-            
-            df = ensure_required_columns(df)
-            refresh_ui()
-            
-            # Thêm vào recent files
-            add_to_recent_files(file_path)
-            
-            ToastNotification.show(f"Đã mở file {os.path.basename(file_path)}", "success")
-        else:
-            status_label.configure(text="Không có dữ liệu để hiển thị")
-    except Exception as e:
-        error_message = str(e)
-        status_label.configure(text=f"Lỗi: {error_message[:50]}")
-        ToastNotification.show(f"Lỗi khi đọc file: {error_message[:100]}", "error")
-        traceback.print_exc()
+    load_excel_in_background(filepath, lambda result: finish_file_load(filepath, result))
 
 file_menu_widget = None
 
@@ -1085,10 +826,14 @@ def update_recent_files_menu():
         file_menu.delete(0, 'end')
         
         # 1. Các lệnh cơ bản
-        file_menu.add_command(label="📂 Mở file Excel...", accelerator="Ctrl+O", 
+        file_menu.add_command(label="📂 Mở file (Excel/CSV/Parquet)...", accelerator="Ctrl+O", 
                              command=select_file)
-        file_menu.add_command(label="💾 Lưu file (Excel)", accelerator="Ctrl+S", 
+        file_menu.add_command(label="📚 Mở nhiều lớp/sheet...", 
+                             command=open_multiple_files)
+        file_menu.add_command(label="💾 Lưu file", accelerator="Ctrl+S", 
                              command=lambda: save_excel() if df is not None else None)
+        file_menu.add_command(label="📤 Xuất dữ liệu (Excel/CSV/Parquet)...", 
+                             command=export_data)
         file_menu.add_command(label="📑 Xuất báo cáo (PDF)", 
                              command=generate_report)
         
@@ -1126,56 +871,219 @@ def update_recent_files_menu():
         traceback.print_exc()
 
 def select_file():
-    global df, file_path
-    file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx *.xls")]
+    new_file_path = filedialog.askopenfilename(
+        filetypes=[("Bảng điểm", "*.xlsx *.xls *.csv *.parquet"), ("Excel files", "*.xlsx *.xls"),
+                   ("CSV", "*.csv"), ("Parquet", "*.parquet")]
     )
-    if file_path:
-        # Hiển thị thông báo trạng thái khi bắt đầu đọc file
-        status_label.configure(text=f"Đang đọc file: {os.path.basename(file_path)}...", 
-)
-        root.update()  # Cập nhật giao diện ngay lập tức để hiển thị trạng thái
-        
-        try:
-            # Đọc file Excel bình thường
-            df = read_excel_file(file_path)
-            
-            if df is not None and not df.empty:
-                # Hiển thị số lượng học sinh
-                total_students = len(df)
-                status_label.configure(
-                    text=f"Đã đọc xong: {os.path.basename(file_path)} ({total_students} học sinh)",
+    if new_file_path:
+        load_excel_in_background(new_file_path, lambda result: finish_file_load(new_file_path, result))
 
-                )
-                
-                # Đảm bảo các cột cần thiết tồn tại
-                df = ensure_required_columns(df)
-                
+def load_excel_in_background(path, on_loaded):
+    """
+    Đọc file Excel ở luồng nền; on_loaded(df) được gọi trên luồng giao diện khi đọc xong
+    
+    Dữ liệu đang mở được giữ nguyên cho tới khi on_loaded thay thế. Mở file khác trong lúc
+    đang đọc sẽ hủy lần đọc trước.
+    """
+    name = os.path.basename(path)
+    _file_loader.cancel()
+    
+    # Bản sao cấu hình để luồng nền không đọc cấu hình đang bị sửa
+    config_snapshot = copy.deepcopy(config)
+    enable_caching = config_snapshot.get('excel_reading', {}).get('performance', {}).get('enable_caching', True)
+    
+    # Ghi xong các thay đổi đang chờ trước khi tra cache, kẻo mở lại file vừa sửa lại ra bảng cũ
+    write_stats = _write_queue.stats()
+    if write_stats['pending'] or write_stats['failed']:
+        _write_queue.drain()
+        _df_cache.invalidate(path)
+    
+    if enable_caching:
+        cached_df = _df_cache.get(path)
+        if cached_df is not None:
+            status_label.configure(text=f"Đã load file từ cache")
+            on_loaded(cached_df)
+            return
+    
+    def on_progress(rows_read, total_rows):
+        if total_rows:
+            status_label.configure(text=f"Đang đọc {name}: {rows_read:,}/{total_rows:,} dòng...")
+        else:
+            status_label.configure(text=f"Đang đọc {name}: {rows_read:,} dòng...")
+    
+    def on_done(result):
+        cancel_load_button.pack_forget()
+        if enable_caching and not result.empty:
+            _df_cache.set(path, result)
+        on_loaded(result)
+    
+    def on_error(error):
+        cancel_load_button.pack_forget()
+        error_message = str(error)
+        status_label.configure(text=f"Lỗi: {error_message[:50] + '...' if len(error_message) > 50 else error_message}")
+        ToastNotification.show(
+            f"❌ Không thể đọc file {name}\n"
+            f"📄 Lỗi: {error_message[:100]}\n"
+            f"💡 Kiểm tra:\n"
+            f"  • File có đúng định dạng .xlsx, .csv hoặc .parquet?\n"
+            f"  • File có đang mở ở ứng dụng khác?\n"
+            f"  • File có bị hỏng không?", 
+            "error")
+    
+    def on_cancel():
+        cancel_load_button.pack_forget()
+        status_label.configure(text=f"Đã hủy đọc file: {name}")
+    
+    status_label.configure(text=f"Đang đọc file: {name}...")
+    cancel_load_button.pack(side='left', padx=5)
+    _file_loader.start(lambda report: read_excel_cached(path, config_snapshot, report),
+                       on_done, on_error=on_error, on_cancel=on_cancel, on_progress=on_progress)
+
+def open_multiple_files():
+    """Mở nhiều file và/hoặc nhiều sheet (mỗi sheet thường là một lớp) thành một bảng chung"""
+    paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx")])
+    if not paths:
+        return
+    try:
+        sources = list_sources(paths)
+    except Exception as e:
+        ToastNotification.show(f"❌ Không thể đọc danh sách sheet\n📄 Lỗi: {str(e)[:100]}", "error")
+        return
+    
+    if len(sources) == 1:
+        path = sources[0][0]
+        load_excel_in_background(path, lambda result: finish_file_load(path, result))
+    elif sources:
+        choose_sheets(sources, load_workbooks_in_background)
+
+def choose_sheets(sources, on_chosen):
+    """Hộp thoại chọn các sheet cần mở (mặc định chọn tất cả)"""
+    sheet_window = tk.Toplevel(root)
+    sheet_window.title("📚 Chọn lớp/sheet cần mở")
+    sheet_window.geometry("420x450")
+    sheet_window.transient(root)
+    sheet_window.grab_set()
+    
+    multi_file = len({path for path, _, _ in sources}) > 1
+    ttk.Label(sheet_window, text=f"Tìm thấy {len(sources)} sheet, chọn các sheet cần ghép:").pack(pady=5)
+    
+    list_frame = ttk.Frame(sheet_window)
+    list_frame.pack(fill="both", expand=True, padx=10, pady=5)
+    canvas = tk.Canvas(list_frame, highlightthickness=0)
+    scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=canvas.yview)
+    inner = ttk.Frame(canvas)
+    inner.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+    canvas.create_window((0, 0), window=inner, anchor="nw")
+    canvas.configure(yscrollcommand=scrollbar.set)
+    canvas.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+    
+    selected = []
+    for path, index, name in sources:
+        var = tk.BooleanVar(value=True)
+        label = f"{os.path.basename(path)} / {name}" if multi_file else name
+        ttk.Checkbutton(inner, text=label, variable=var).pack(anchor="w")
+        selected.append(var)
+    
+    def set_all(value):
+        for var in selected:
+            var.set(value)
+    
+    def open_selected():
+        chosen = [source for source, var in zip(sources, selected) if var.get()]
+        if not chosen:
+            ToastNotification.show("ℹ️ Vui lòng chọn ít nhất một sheet", "info")
+            return
+        sheet_window.destroy()
+        on_chosen(chosen)
+    
+    button_frame = ttk.Frame(sheet_window)
+    button_frame.pack(fill="x", padx=10, pady=10)
+    ttk.Button(button_frame, text="Chọn tất cả", command=lambda: set_all(True)).pack(side="left", padx=5)
+    ttk.Button(button_frame, text="Bỏ chọn", command=lambda: set_all(False)).pack(side="left", padx=5)
+    ttk.Button(button_frame, text="Mở", command=open_selected).pack(side="right", padx=5)
+
+def load_workbooks_in_background(sources):
+    """
+    Đọc các sheet đã chọn ở luồng nền (mỗi sheet một tiến trình) rồi ghép thành một bảng
+    
+    Dữ liệu đang mở được giữ nguyên cho tới khi đọc xong; có thể hủy như khi mở một file.
+    """
+    _file_loader.cancel()
+    config_snapshot = copy.deepcopy(config)
+    first_path = sources[0][0]
+    
+    def on_progress(sheets_done, total_sheets):
+        status_label.configure(text=f"Đang đọc {sheets_done}/{total_sheets} sheet...")
+    
+    def on_done(result):
+        cancel_load_button.pack_forget()
+        finish_file_load(first_path, result)
+    
+    def on_error(error):
+        cancel_load_button.pack_forget()
+        error_message = str(error)
+        status_label.configure(text=f"Lỗi: {error_message[:50] + '...' if len(error_message) > 50 else error_message}")
+        ToastNotification.show(f"❌ Không thể đọc các sheet đã chọn\n📄 Lỗi: {error_message[:100]}", "error")
+    
+    def on_cancel():
+        cancel_load_button.pack_forget()
+        status_label.configure(text="Đã hủy đọc các sheet")
+    
+    status_label.configure(text=f"Đang đọc {len(sources)} sheet...")
+    cancel_load_button.pack(side='left', padx=5)
+    _file_loader.start(lambda report: parse_workbooks(sources, config_snapshot, report),
+                       on_done, on_error=on_error, on_cancel=on_cancel, on_progress=on_progress)
+
+def cancel_file_load():
+    """Hủy việc đọc file đang chạy ở luồng nền"""
+    _file_loader.cancel()
+
+def finish_file_load(path, result):
+    """Thay dữ liệu đang mở bằng dữ liệu vừa đọc xong (chạy trên luồng giao diện)"""
+    global df, file_path
+    
+    # Ghi hết thay đổi của file đang mở trước khi chuyển file
+    _write_queue.drain()
+    file_path = path
+    
+    try:
+        if result is not None and not result.empty:
+            # Đảm bảo các cột cần thiết tồn tại
+            df = ensure_required_columns(result)
+            _writeback.attach(file_path, df)
+            set_dataframe(df, reset_history=True)
+            
+            # Cập nhật giao diện (danh sách, thống kê, điểm cao/thấp)
+            refresh_ui()
+            
+            if is_combined_data(df):
+                part_count = len(df.attrs[SOURCE_PARTS_KEY])
+                status_label.configure(text=f"Đã đọc xong {part_count} sheet ({len(df)} học sinh)")
+                ToastNotification.show(f"Đã ghép {part_count} sheet thành một danh sách", "success")
+                unwritable = unwritable_parts(df.attrs[SOURCE_PARTS_KEY])
+                if unwritable:
+                    names = ", ".join(f"{os.path.basename(part['file_path'])}/{part['sheet_name']}"
+                                      for part in unwritable[:5])
+                    ToastNotification.show(
+                        f"⚠️ Không ghi lại được về sheet nguồn: {names}\n"
+                        f"💡 Thay đổi trên dữ liệu ghép chỉ lưu được bằng \"Xuất dữ liệu\"",
+                        "warning")
+            else:
                 # Thêm vào recent files
                 add_to_recent_files(file_path)
-                
-                # Cập nhật giao diện
-                refresh_ui()
-                
-                # Tự động làm mới dữ liệu sau khi mở file
-                update_stats()
-                update_score_extremes()
-                
+                status_label.configure(text=f"Đã đọc xong: {os.path.basename(file_path)} ({len(df)} học sinh)")
                 ToastNotification.show(f"Đã mở file {os.path.basename(file_path)}", "success")
-            else:
-                status_label.configure(
-                    text="Không có dữ liệu để hiển thị, vui lòng tải file Excel có dữ liệu",
-
-                )
-                
-        except Exception as e:
-            error_message = str(e)
-            status_label.configure(
-                text=f"Lỗi: {error_message[:50] + '...' if len(error_message) > 50 else error_message}",
-
-            )
-            ToastNotification.show(f"Lỗi: {error_message[:100]}", "error")
-            traceback.print_exc()  # In chi tiết lỗi ra console để debug
+        else:
+            set_dataframe(result, reset_history=True)
+            status_label.configure(text="Không có dữ liệu để hiển thị, vui lòng tải file Excel có dữ liệu")
+            
+    except Exception as e:
+        error_message = str(e)
+        status_label.configure(
+            text=f"Lỗi: {error_message[:50] + '...' if len(error_message) > 50 else error_message}")
+        ToastNotification.show(f"Lỗi: {error_message[:100]}", "error")
+        traceback.print_exc()  # In chi tiết lỗi ra console để debug
 
 def read_excel_normally(file_path):
     """Đọc file Excel theo cách thông thường"""
@@ -1207,146 +1115,168 @@ def read_excel_normally(file_path):
         print(f"Chi tiết lỗi đọc file Excel: {traceback.format_exc()}")
         raise Exception(f"Lỗi khi đọc file Excel: {str(e)}")
 
-def save_state():
-    """Lưu trạng thái hiện tại để hoàn tác"""
-    if df is not None:
-        undo_stack.append(df.copy())
-        if len(undo_stack) > 10:  # Giới hạn 10 bước hoàn tác
-            undo_stack.pop(0)
-
 def undo(event=None):
-    """Hoàn tác thay đổi gần nhất"""
-    global df
-    if undo_stack:
-        df = undo_stack.pop()
-        save_excel()
-        search_student()
+    """Hoàn tác thay đổi gần nhất (phím tắt tùy chỉnh)"""
+    perform_undo()
 
 def save_excel():
-    """Lưu file Excel"""
+    """
+    Lưu file qua luồng ghi nền, chỉ ghi các ô đã thay đổi khi có thể
+    
+    File CSV/Parquet được ghi lại theo đúng định dạng gốc (CSV giữ bảng mã và dấu phân cách).
+    """
     if df is not None and file_path:
-        # Đảm bảo kiểu dữ liệu phù hợp trước khi lưu
-        df_to_save = ensure_proper_dtypes(df)
-        df_to_save.to_excel(file_path, index=False)
-        # Cập nhật thống kê sau khi lưu
-        update_stats()
-        update_score_extremes()
+        # Ghi từng ô vào workbook gốc, chỉ ghi lại toàn bộ file khi không thể vá
+        if not _write_queue.submit(df):
+            if is_combined_data(df):
+                # Không ghi đè bảng ghép lên một file nguồn; các ô đã sửa vẫn được giữ là chưa lưu
+                messagebox.showerror(
+                    "Không thể lưu",
+                    "Không thể ghi thay đổi về các sheet nguồn: số dòng của dữ liệu ghép từ nhiều "
+                    "sheet đã thay đổi (thêm/xóa học sinh, phục hồi bản sao lưu) hoặc có file nguồn "
+                    "không phải .xlsx.\n\n"
+                    "Các thay đổi chưa được lưu. Dùng \"Xuất dữ liệu\" để lưu ra file mới.")
+                return
+            # Bản sao làm snapshot cho luồng ghi (kiểu dữ liệu đã chuẩn hóa khi đọc file)
+            df_to_save = df.copy()
+            _write_queue.submit_frame(file_path, df_to_save)
+            _writeback.reset_to_plain_layout(file_path, df_to_save)
+        update_save_status()
+
+def export_data():
+    """Xuất dữ liệu đang mở ra file Excel, CSV hoặc Parquet (ghi ở luồng ghi nền)"""
+    if df is None:
+        return
+    name = os.path.splitext(os.path.basename(file_path))[0] if file_path else "bang_diem"
+    export_path = filedialog.asksaveasfilename(
+        defaultextension=".csv", initialfile=name,
+        filetypes=[("CSV", "*.csv"), ("Excel files", "*.xlsx"), ("Parquet", "*.parquet")])
+    if not export_path:
+        return
+    if file_format(export_path) == 'parquet' and not PARQUET_AVAILABLE:
+        ToastNotification.show("❌ Xuất Parquet cần cài pyarrow hoặc fastparquet", "error")
+        return
+    if file_path and os.path.abspath(export_path) == os.path.abspath(file_path):
+        save_excel()
+        return
+    _write_queue.submit_frame(export_path, df.copy())
+    update_save_status()
+
+save_status_job = None  # Timer cập nhật trạng thái ghi file nền
+
+def update_save_status():
+    """Hiển thị số thay đổi đang chờ ghi và thời gian ghi lần cuối trên status bar"""
+    global save_status_job
+    if save_status_job is not None:
+        root.after_cancel(save_status_job)
+        save_status_job = None
+    
+    stats = _write_queue.stats()
+    if stats['pending'] > 0:
+        status_label.configure(text=f"💾 Đang chờ ghi {stats['pending']} thay đổi...")
+        save_status_job = root.after(250, update_save_status)
+    elif stats['failed'] > 0:
+        status_label.configure(
+            text=f"❌ {stats['failed']} thay đổi chưa lưu được (sẽ ghi lại khi lưu tiếp): {(stats['last_error'] or '')[:60]}")
+    elif stats['last_error']:
+        status_label.configure(text=f"❌ Lỗi khi lưu file: {stats['last_error'][:60]}")
+    elif stats['last_latency'] is not None:
+        status_label.configure(
+            text=f"💾 Đã lưu {stats['last_edits']} thay đổi ({stats['last_latency'] * 1000:.0f} ms)")
 
 def find_matching_column(df, target_name):
-    """Find column that best matches the target name using config patterns"""
-    target_name_lower = target_name.lower().strip()
-    
-    # Direct match first (case insensitive)
-    for col in df.columns:
-        if str(col).lower().strip() == target_name_lower:
-            return col
-    
-    # Try using new pattern matching system
-    try:
-        config = load_config()
-        patterns_config = config.get('excel_reading', {}).get('column_patterns', {})
-        
-        # Check if target_name matches any known field
-        for col in df.columns:
-            col_str = str(col).strip()
-            
-            # Try matching with student_info patterns
-            for field_name, field_config in patterns_config.get('student_info', {}).items():
-                patterns = field_config.get('patterns', [])
-                for pattern in patterns:
-                    if pattern.lower() == target_name_lower:
-                        # This is the field we're looking for
-                        # Check if col matches this field
-                        for col_pattern in patterns:
-                            if col_pattern.lower() in col_str.lower() or col_str.lower() in col_pattern.lower():
-                                return col
-                        # Try regex
-                        regex = field_config.get('regex', '')
-                        if regex:
-                            try:
-                                if re.match(regex, col_str, re.IGNORECASE):
-                                    return col
-                            except:
-                                pass
-            
-            # Try matching with score_columns patterns
-            for score_type, score_config in patterns_config.get('score_columns', {}).items():
-                patterns = score_config.get('patterns', [])
-                for pattern in patterns:
-                    if pattern.lower() == target_name_lower:
-                        # This is the field we're looking for
-                        # Check if col matches this field
-                        for col_pattern in patterns:
-                            if col_pattern.lower() in col_str.lower() or col_str.lower() in col_pattern.lower():
-                                return col
-                        # Try regex
-                        regex = score_config.get('regex', '')
-                        if regex:
-                            try:
-                                if re.match(regex, col_str, re.IGNORECASE):
-                                    return col
-                            except:
-                                pass
-    except Exception as e:
-        print(f"Error using pattern matching: {e}")
-    
-    # Fallback to old variations
-    name_variations = {
-        'tên học sinh': ['họ và tên', 'họ tên', 'tên', 'học sinh'],
-        'họ và tên': ['họ và tên', 'họ tên', 'tên', 'học sinh', 'tên học sinh'],
-        'mã đề': ['mã', 'đề', 'số đề', 'mã số đề', 'exam code'],
-        'điểm': ['điểm số', 'số điểm', 'point', 'score'],
-        'đđgck': ['đđgck', 'điểm ck', 'điểm cuối kỳ', 'ck', 'cuối kỳ'],
-        'đđggk': ['đđggk', 'điểm gk', 'điểm giữa kỳ', 'gk', 'giữa kỳ'],
-        'đđgtx': ['đđgtx', 'điểm tx', 'điểm thường xuyên', 'tx', 'thường xuyên'],
-        'đtbmhki': ['đtbmhki', 'đtb hk1', 'điểm tb', 'điểm trung bình']
-    }
-    
-    # Check variations
-    for col in df.columns:
-        col_lower = str(col).lower().strip()
-        for key, variations in name_variations.items():
-            if target_name_lower == key or target_name_lower in variations:
-                if any(var in col_lower for var in variations):
-                    return col
-                # Partial match
-                if any(col_lower in var or var in col_lower for var in variations):
-                    return col
-    
-    return None
+    """Find column that best matches the target name using config patterns (kết quả được cache theo danh sách cột)"""
+    return _column_resolver.resolve(df.columns, target_name, config)
 
-def search_student(event=None):
-    """Tìm kiếm học sinh với search caching"""
+def rebuild_row_index():
+    """Xây dựng lại chỉ mục tra cứu dòng khi cấu trúc dữ liệu thay đổi (tải file, thêm dòng, hoàn tác)"""
+    display_columns.clear()
+    if df is None:
+        search_index.rebuild(None, None)
+        return
+    name_col = find_matching_column(df, config['columns']['name'])
+    display_columns['name'] = name_col
+    for key, default in (('exam_code', 'Mã đề'), ('score', 'Điểm')):
+        matched = find_matching_column(df, config['columns'][key]) or default
+        display_columns[key] = matched if matched in df.columns else None
+    fields = _column_resolver.matcher(config).classify_row(df.columns)
+    id_col = next((col for col, field in zip(df.columns, fields) if field == 'student_id'), None)
+    search_index.rebuild(df, name_col, id_col)
+
+def set_dataframe(new_df, rebuild_index=True, reset_history=False):
+    """
+    Thay dữ liệu hiện tại qua data_model; version mới làm mọi cache tự tính lại
+
+    Args:
+        rebuild_index: Dựng lại chỉ mục tra cứu dòng
+        reset_history: Xóa lịch sử hoàn tác (khi tải file hoặc phục hồi, các diff cũ không còn áp dụng được)
+    """
+    global df
+    df = new_df
+    data_model.replace(new_df)
+    if rebuild_index:
+        rebuild_row_index()
+    if reset_history:
+        undo_manager.clear()
+        update_undo_redo_buttons()
+
+def format_student_rows(positions):
+    """
+    Định dạng các dòng hiển thị trên danh sách (tên, mã đề, điểm) và tag màu theo điểm
+
+    Args:
+        positions: Vị trí các dòng trong df cần hiển thị
+
+    Returns:
+        list: Danh sách (values, tag)
+    """
+    return format_display_rows(df, positions,
+                               display_columns.get('name'),
+                               display_columns.get('exam_code'),
+                               display_columns.get('score'))
+
+def resolve_selected_row(item_id):
+    """
+    Tìm vị trí dòng trong df tương ứng với item đang chọn trên treeview
+
+    Returns:
+        tuple: (vị trí dòng hoặc None, tên hiển thị)
+    """
+    values = tree.item(item_id)['values']
+    selected = values[0] if values else None
+    if df is None or selected is None:
+        return None, selected
+    if search_index.row_count != len(df):
+        rebuild_row_index()
+    return search_index.position_for_item(item_id, fallback_name=selected), selected
+
+def search_student(event=None, keep_offset=False):
+    """Tìm kiếm học sinh với search caching
+
+    Args:
+        keep_offset: Giữ nguyên vị trí cuộn của danh sách (khi làm mới sau khi nhập điểm)
+    """
     global df, search_timer_id, search_index, _search_cache
     
     # Reset timer
     search_timer_id = None
     
-    # Clear search cache if data changed
-    if df is not None:
-        _search_cache.clear_if_data_changed(df)
+    # Kết quả tìm kiếm chỉ phụ thuộc tập dòng, xóa cache khi cấu trúc dữ liệu thay đổi
+    _search_cache.clear_if_data_changed(data_model.structure_version)
     
     # Hiển thị thông báo xử lý nếu dữ liệu lớn
     if df is not None and len(df) > 1000:
         status_label.configure(text="Đang tìm kiếm trong dữ liệu lớn...")
         root.update()  # Cập nhật giao diện trước khi thực hiện tìm kiếm
     
-    # Clear existing items
-    for item in tree.get_children():
-        tree.delete(item)
-        
     if df is None or df.empty:
+        student_view.show_message("Không có dữ liệu để hiển thị. Vui lòng tải file Excel.")
         ToastNotification.show("ℹ️ Chưa có dữ liệu học sinh", "info")
-        update_stats()
+        ui_refresh.mark_dirty('stats', 'extremes')
         return
 
     # Find matching columns
-    column_mapping = {}
-    for key, configured_name in config['columns'].items():
-        if configured_name.strip():
-            matched_col = find_matching_column(df, configured_name)
-            if matched_col:
-                column_mapping[key] = matched_col
+    column_mapping = _column_resolver.mapping(df.columns, config)
 
     if not column_mapping.get('name'):
         ToastNotification.show(
@@ -1359,97 +1289,48 @@ def search_student(event=None):
     ten_hoc_sinh = entry_student_name.get().strip().lower()  # Chuyển về chữ thường để tìm kiếm không phân biệt hoa thường
     name_col = column_mapping['name']
     
-    # 1. Lấy dữ liệu cơ sở và áp dụng Quick Filter nếu có
-    result = df.copy()
+    # 1. Tìm theo tên qua chỉ mục n-gram (không dấu), cache vị trí dòng theo từ khóa
+    if search_index.row_count != len(df) or search_index.name_col != name_col:
+        rebuild_row_index()
+    if ten_hoc_sinh:
+        row_positions = _search_cache.get(ten_hoc_sinh)
+        if row_positions is None:
+            row_positions = np.asarray(search_index.find(ten_hoc_sinh), dtype=np.intp)
+            _search_cache.set(ten_hoc_sinh, row_positions)
+    else:
+        row_positions = np.arange(len(df))
+    
+    # 2. Áp dụng Quick Filter nếu có (trên các dòng đã tìm được)
     if 'current_filter_type' in globals() and current_filter_type != 'all':
         score_col = column_mapping.get('score')
         if not score_col:
-            score_col = find_matching_column(result, 'Điểm')
+            score_col = find_matching_column(df, 'Điểm')
             
         if score_col:
-            temp_scores = pd.to_numeric(result[score_col], errors='coerce')
+            temp_scores = pd.to_numeric(df[score_col].iloc[row_positions], errors='coerce').to_numpy(dtype=float)
             if current_filter_type == 'high':
-                result = result[temp_scores >= 7]
+                row_positions = row_positions[temp_scores >= 7]
             elif current_filter_type == 'medium':
-                result = result[(temp_scores >= 5) & (temp_scores < 7)]
+                row_positions = row_positions[(temp_scores >= 5) & (temp_scores < 7)]
             elif current_filter_type == 'low':
-                result = result[temp_scores < 5]
+                row_positions = row_positions[temp_scores < 5]
             elif current_filter_type == 'no_score':
-                result = result[temp_scores.isna()]
-                
-    # 2. Áp dụng tìm kiếm (với kết quả đã lọc)
-    if ten_hoc_sinh:
-        mask = result[name_col].astype(str).str.lower().str.contains(ten_hoc_sinh, na=False)
-        result = result[mask]
-
-    # Get display values helper (giữ nguyên)
-    def get_display_values(row):
-        values = []
-        for col_key in ['name', 'exam_code', 'score']:
-            if col_key in column_mapping:
-                value = row[column_mapping[col_key]]
-                if col_key == 'score':
-                    # Convert to float safely
-                    try:
-                        score_val = pd.to_numeric(value, errors='coerce')
-                        values.append(f"{score_val:.2f}" if pd.notna(score_val) else 'Chưa có điểm')
-                    except:
-                        values.append('Chưa có điểm')
-                else:
-                    values.append(str(value) if pd.notna(value) else '')
-        return values
-
-    # Hàm áp dụng màu theo điểm
-    def apply_color_by_score(item_id, score_value):
-        """Tô màu dòng theo điểm số"""
-        try:
-            if pd.notna(score_value):
-                score = float(score_value)
-                if score < 5:
-                    tree.item(item_id, tags=('low_score',))
-                elif score < 7:
-                    tree.item(item_id, tags=('medium_score',))
-                else:
-                    tree.item(item_id, tags=('high_score',))
-            else:
-                tree.item(item_id, tags=('no_score',))
-        except:
-            tree.item(item_id, tags=('no_score',))
+                row_positions = row_positions[np.isnan(temp_scores)]
     
-    # Display results with improved performance
-    if result.empty:
-        tree.insert('', 'end', values=('Không tìm thấy kết quả phù hợp', '', ''))
+    # Hiển thị kết quả trên danh sách ảo (toàn bộ kết quả, chỉ vẽ các dòng nhìn thấy)
+    if len(row_positions) == 0:
+        student_view.show_message('Không tìm thấy kết quả phù hợp')
     else:
-        # Giới hạn kết quả hiển thị
-        result_limit = 200 if len(result) > 200 else len(result)
-        
-        # Đưa kết quả vào treeview
-        for _, row in result.head(result_limit).iterrows():
-            values = get_display_values(row)
-            if values:
-                item_id = tree.insert('', 'end', values=values)
-                # Áp dụng màu theo điểm
-                if 'score' in column_mapping:
-                    apply_color_by_score(item_id, row[column_mapping['score']])
-        
-        # Thông báo nếu có quá nhiều kết quả
-        if len(result) > result_limit:
-            msg = f"--- Hiển thị {result_limit}/{len(result)} kết quả. Thêm ký tự để tìm kiếm chi tiết ---"
-            tree.insert('', 'end', values=(msg, "", ""))
+        student_view.set_rows(row_positions, keep_offset=keep_offset)
                 
         # Nếu chỉ tìm thấy một học sinh, tự động chọn học sinh đó
-        if len(result) == 1:
-            first_item = tree.get_children()[0]
-            tree.selection_set(first_item)
-            tree.focus(first_item)
-            tree.see(first_item)
+        if len(row_positions) == 1:
+            student_view.select_index(0)
     
     # Cập nhật trạng thái
 
     if df is not None and len(df) > 1000:
         status_label.configure(text=f"Đã tải file: {os.path.basename(file_path)}")
-                
-    update_stats()
 
 def add_student():
     """Thêm học sinh mới"""
@@ -1463,21 +1344,27 @@ def add_student():
         ToastNotification.show("ℹ️ Vui lòng nhập tên học sinh để thêm", "info")
         return
     
-    # Lưu state trước khi thêm
-    undo_manager.push_state(df, f"Thêm học sinh '{ten_hoc_sinh}'")
-
-    if ten_hoc_sinh in df[config['columns']['name']].values:
+    if is_combined_data(df):
+        # Dòng mới không thuộc sheet nguồn nào nên không ghi lại được
+        ToastNotification.show("⚠️ Không thể thêm học sinh khi đang mở nhiều sheet\n💡 Mở riêng sheet của lớp để thêm", "warning")
+        return
+    
+    if search_index.row_count != len(df):
+        rebuild_row_index()
+    if search_index.contains_name(ten_hoc_sinh):
         ToastNotification.show("⚠️ Học sinh đã tồn tại trong danh sách", "warning")
     else:
-        save_state()
-        new_row = pd.DataFrame({config['columns']['name']: [ten_hoc_sinh], 'Điểm': [None]})
+        # Dòng trống cùng kiểu với các cột hiện có để nối vào không làm đổi kiểu cột
+        new_row = df.iloc[:0].reindex([0])
+        new_row.iloc[0, new_row.columns.get_loc(config['columns']['name'])] = ten_hoc_sinh
         df = pd.concat([df, new_row], ignore_index=True)
+        undo_manager.record(f"Thêm học sinh '{ten_hoc_sinh}'", added_rows=new_row)
+        search_index.append_row(ten_hoc_sinh)
+        set_dataframe(df, rebuild_index=False)
         save_excel()
         search_student()
         
-        # Cập nhật thống kê
-        update_stats()
-        update_score_extremes()
+        # Thống kê tự vẽ lại theo thông báo thay đổi dữ liệu
         update_undo_redo_buttons()  # Cập nhật trạng thái undo/redo
 
 def calculate_score(event=None):
@@ -1492,10 +1379,10 @@ def calculate_score(event=None):
         ToastNotification.show("Vui lòng chọn học sinh để nhập điểm", "warning")
         return
 
-    selected = tree.item(selected_item[0])['values'][0]
-    
-    # Lưu state trước khi thay đổi
-    undo_manager.push_state(df, f"Tính điểm cho '{selected}'")
+    row_pos, selected = resolve_selected_row(selected_item[0])
+    if row_pos is None:
+        ToastNotification.show("Vui lòng chọn học sinh để nhập điểm", "warning")
+        return
     
     try:
         so_cau_dung = int(entry_correct_count.get())
@@ -1512,7 +1399,7 @@ def calculate_score(event=None):
                 return
         # Nếu để trống thì giữ nguyên mã đề cũ
         else:
-            ma_de = df.loc[df[config['columns']['name']] == selected, 'Mã đề'].iloc[0]
+            ma_de = df['Mã đề'].iat[row_pos]
             
         if not (0 <= so_cau_dung <= config['max_questions']):
             ToastNotification.show(f"Số câu đúng phải từ 0 đến {config['max_questions']}", "error")
@@ -1524,29 +1411,29 @@ def calculate_score(event=None):
             ToastNotification.show("Điểm tính được vượt quá 10", "error")
             return
             
-        save_state()
-        
-        # Đảm bảo kiểu dữ liệu phù hợp cho DataFrame trước khi gán giá trị
-        df_proper = ensure_proper_dtypes(df)
+        # Gán điểm và mã đề trực tiếp vào ô của dòng được chọn (kiểu dữ liệu đã chuẩn hóa
+        # khi đọc file nên chỉ giá trị mới cần kiểm tra), ghi lại giá trị cũ để hoàn tác
+        ma_de = coerce_exam_code(ma_de)
+        changes = [(row_pos, 'Điểm', df['Điểm'].iat[row_pos], diem)]
+        set_score(df, row_pos, 'Điểm', diem)
+        if ma_de != df['Mã đề'].iat[row_pos]:
+            changes.append((row_pos, 'Mã đề', df['Mã đề'].iat[row_pos], ma_de))
+            set_exam_code(df, row_pos, 'Mã đề', ma_de)
         
-        # Gán điểm và mã đề
-        df_proper.loc[df_proper[config['columns']['name']] == selected, 'Điểm'] = diem
-        if ma_de != df_proper.loc[df_proper[config['columns']['name']] == selected, 'Mã đề'].iloc[0]:
-            df_proper.loc[df_proper[config['columns']['name']] == selected, 'Mã đề'] = ma_de
+        data_model.update(df, cells=changes)
+        undo_manager.record(f"Tính điểm cho '{selected}'", cells=changes)
         
-        # Cập nhật df chính
-        df = df_proper
+        # Ghi nhận dòng đã thay đổi để chỉ ghi lại các ô này
+        _writeback.mark_dirty(row_pos, ['Điểm', 'Mã đề'])
         
         save_excel()
         
         # Lưu index của học sinh hiện tại
-        current_index = tree.index(selected_item[0])
+        current_index = student_view.index_of_position(row_pos)
         
-        search_student()
+        search_student(keep_offset=True)
         
-        # Cập nhật thống kê
-        update_stats()
-        update_score_extremes()
+        # Thống kê tự vẽ lại theo thông báo thay đổi dữ liệu
         update_undo_redo_buttons()  # Cập nhật trạng thái undo/redo
         
         # Hiển thị toast thành công
@@ -1556,12 +1443,8 @@ def calculate_score(event=None):
         entry_correct_count.delete(0, tk.END)
         
         # Tự động chọn học sinh tiếp theo
-        children = tree.get_children()
-        if children and current_index + 1 < len(children):
-            next_item = children[current_index + 1]
-            tree.selection_set(next_item)
-            tree.focus(next_item)
-            tree.see(next_item)
+        if current_index is not None and current_index + 1 < len(student_view.rows):
+            student_view.select_index(current_index + 1)
             # Focus vào ô nhập số câu đúng để tiếp tục nhập
             entry_correct_count.focus_set()
     except ValueError:
@@ -1598,6 +1481,17 @@ def focus_student_search(event=None):
     entry_student_name.focus_set()
     entry_student_name.select_range(0, tk.END)
 
+def apply_history_entry(entry, redo=False):
+    """Áp dụng patch của một bước trong lịch sử lên df (sửa trực tiếp các ô) và ghi nhận thay đổi"""
+    global df
+    df = entry.reapply(df) if redo else entry.revert(df)
+    if entry.structural:
+        set_dataframe(df)
+    else:
+        data_model.update(df, cells=entry.changes(redo))
+    if entry.cells:
+        _writeback.mark_dirty(entry.rows, entry.columns)
+
 def perform_undo():
     """Thực hiện hoàn tác thao tác cuối"""
     global df, undo_manager
@@ -1606,9 +1500,9 @@ def perform_undo():
         ToastNotification.show("ℹ️ Không có thao tác nào để hoàn tác", "info")
         return
     
-    previous_state, action_name = undo_manager.undo()
-    if previous_state is not None:
-        df = previous_state.copy()
+    entry, action_name = undo_manager.undo()
+    if entry is not None:
+        apply_history_entry(entry)
         refresh_ui()
         save_excel()
         ToastNotification.show(f"⏪ Đã hoàn tác: {action_name}", "success")
@@ -1622,9 +1516,9 @@ def perform_redo():
         ToastNotification.show("ℹ️ Không có thao tác nào để làm lại", "info")
         return
     
-    next_state, action_name = undo_manager.redo()
-    if next_state is not None:
-        df = next_state.copy()
+    entry, action_name = undo_manager.redo()
+    if entry is not None:
+        apply_history_entry(entry, redo=True)
         refresh_ui()
         save_excel()
         ToastNotification.show(f"⏩ Đã làm lại: {action_name}", "success")
@@ -1658,10 +1552,10 @@ def calculate_score_direct(event=None):
         ToastNotification.show("Vui lòng chọn học sinh để nhập điểm", "warning")
         return
 
-    selected = tree.item(selected_item[0])['values'][0]
-    
-    # Lưu state trước khi thay đổi
-    undo_manager.push_state(df, f"Nhập điểm trực tiếp cho '{selected}'")
+    row_pos, selected = resolve_selected_row(selected_item[0])
+    if row_pos is None:
+        ToastNotification.show("Vui lòng chọn học sinh để nhập điểm", "warning")
+        return
     
     try:
         diem = float(entry_direct_score.get())
@@ -1678,35 +1572,35 @@ def calculate_score_direct(event=None):
                 return
         # Nếu để trống thì giữ nguyên mã đề cũ
         else:
-            ma_de = df.loc[df[config['columns']['name']] == selected, 'Mã đề'].iloc[0]
+            ma_de = df['Mã đề'].iat[row_pos]
             
         if not (0 <= diem <= 10):
             ToastNotification.show("Điểm phải từ 0 đến 10", "error")
             return
             
-        save_state()
+        # Gán điểm và mã đề trực tiếp vào ô của dòng được chọn (kiểu dữ liệu đã chuẩn hóa
+        # khi đọc file nên chỉ giá trị mới cần kiểm tra), ghi lại giá trị cũ để hoàn tác
+        ma_de = coerce_exam_code(ma_de)
+        changes = [(row_pos, 'Điểm', df['Điểm'].iat[row_pos], diem)]
+        set_score(df, row_pos, 'Điểm', diem)
+        if ma_de != df['Mã đề'].iat[row_pos]:
+            changes.append((row_pos, 'Mã đề', df['Mã đề'].iat[row_pos], ma_de))
+            set_exam_code(df, row_pos, 'Mã đề', ma_de)
         
-        # Đảm bảo kiểu dữ liệu phù hợp cho DataFrame trước khi gán giá trị
-        df_proper = ensure_proper_dtypes(df)
+        data_model.update(df, cells=changes)
+        undo_manager.record(f"Nhập điểm trực tiếp cho '{selected}'", cells=changes)
         
-        # Gán điểm và mã đề
-        df_proper.loc[df_proper[config['columns']['name']] == selected, 'Điểm'] = diem
-        if ma_de != df_proper.loc[df_proper[config['columns']['name']] == selected, 'Mã đề'].iloc[0]:
-            df_proper.loc[df_proper[config['columns']['name']] == selected, 'Mã đề'] = ma_de
-        
-        # Cập nhật df chính
-        df = df_proper
+        # Ghi nhận dòng đã thay đổi để chỉ ghi lại các ô này
+        _writeback.mark_dirty(row_pos, ['Điểm', 'Mã đề'])
         
         save_excel()
         
         # Lưu index của học sinh hiện tại
-        current_index = tree.index(selected_item[0])
+        current_index = student_view.index_of_position(row_pos)
         
-        search_student()
+        search_student(keep_offset=True)
         
-        # Cập nhật thống kê
-        update_stats()
-        update_score_extremes()
+        # Thống kê tự vẽ lại theo thông báo thay đổi dữ liệu
         update_undo_redo_buttons()  # Cập nhật trạng thái undo/redo
         
         # Hiển thị toast thành công
@@ -1716,12 +1610,8 @@ def calculate_score_direct(event=None):
         entry_direct_score.delete(0, tk.END)
         
         # Tự động chọn học sinh tiếp theo
-        children = tree.get_children()
-        if children and current_index + 1 < len(children):
-            next_item = children[current_index + 1]
-            tree.selection_set(next_item)
-            tree.focus(next_item)
-            tree.see(next_item)
+        if current_index is not None and current_index + 1 < len(student_view.rows):
+            student_view.select_index(current_index + 1)
             # Focus vào ô nhập điểm trực tiếp để tiếp tục nhập
             entry_direct_score.focus_set()
     except ValueError:
@@ -1880,6 +1770,10 @@ def customize_excel_reading():
     ttk.Checkbutton(merged_frame, text="Kết hợp với sub-header", 
                    variable=combine_var).pack(anchor="w", pady=5)
     
+    cache_merged_var = tk.BooleanVar(value=merged_config.get('cache_merged_info', True))
+    ttk.Checkbutton(merged_frame, text="Ghi nhớ vùng merged cells của từng file (file lớn mở lại nhanh hơn)", 
+                   variable=cache_merged_var).pack(anchor="w", pady=5)
+    
     # Info label
     info_label = ttk.Label(merged_frame, 
                           text="ℹ️ Xử lý merged cells giúp nhận diện header phức tạp\n"
@@ -1908,6 +1802,14 @@ def customize_excel_reading():
     cache_spin = ttk.Spinbox(cache_frame, from_=1, to=10, textvariable=cache_max_var, width=10)
     cache_spin.pack(side="left", padx=5)
     
+    # Giới hạn bộ nhớ cho cache DataFrame
+    cache_mem_frame = ttk.Frame(perf_frame)
+    cache_mem_frame.pack(fill="x", pady=5)
+    ttk.Label(cache_mem_frame, text="Bộ nhớ cache tối đa:").pack(side="left", padx=5)
+    cache_mb_var = tk.IntVar(value=perf_config.get('cache_max_mb', 256))
+    ttk.Spinbox(cache_mem_frame, from_=16, to=4096, increment=16, textvariable=cache_mb_var, width=10).pack(side="left", padx=5)
+    ttk.Label(cache_mem_frame, text="MB", foreground="gray").pack(side="left")
+    
     cache_search_var = tk.BooleanVar(value=perf_config.get('cache_search_results', True))
     ttk.Checkbutton(perf_frame, text="Cache kết quả tìm kiếm", 
                    variable=cache_search_var).pack(anchor="w", pady=5)
@@ -1916,13 +1818,57 @@ def customize_excel_reading():
     ttk.Checkbutton(perf_frame, text="Cache thống kê", 
                    variable=cache_stats_var).pack(anchor="w", pady=5)
     
+    # Ngưỡng đọc theo luồng cho file lớn
+    stream_frame = ttk.Frame(perf_frame)
+    stream_frame.pack(fill="x", pady=5)
+    ttk.Label(stream_frame, text="Đọc theo luồng với file từ:").pack(side="left", padx=5)
+    stream_threshold_var = tk.IntVar(value=perf_config.get('streaming_threshold_mb', 2))
+    ttk.Spinbox(stream_frame, from_=0, to=100, textvariable=stream_threshold_var, width=10).pack(side="left", padx=5)
+    ttk.Label(stream_frame, text="MB (0 = tắt)", foreground="gray").pack(side="left")
+    
+    # Đọc XML của sheet trực tiếp thay vì qua openpyxl (file lạ tự quay về openpyxl)
+    fast_reader_var = tk.BooleanVar(value=perf_config.get('fast_reader', True))
+    ttk.Checkbutton(perf_frame, text="Đọc nhanh file .xlsx (không qua openpyxl)", 
+                   variable=fast_reader_var).pack(anchor="w", pady=5)
+    
+    # Cache trên đĩa: mở lại file đã đọc mà không phải phân tích lại
+    disk_cache_var = tk.BooleanVar(value=perf_config.get('disk_cache', True))
+    ttk.Checkbutton(perf_frame, text="Lưu dữ liệu đã đọc vào cache trên đĩa", 
+                   variable=disk_cache_var).pack(anchor="w", pady=5)
+    
+    disk_frame = ttk.Frame(perf_frame)
+    disk_frame.pack(fill="x", pady=5)
+    ttk.Label(disk_frame, text="Dung lượng cache trên đĩa tối đa:").pack(side="left", padx=5)
+    disk_max_var = tk.IntVar(value=perf_config.get('disk_cache_max_mb', 200))
+    ttk.Spinbox(disk_frame, from_=10, to=5000, increment=10, textvariable=disk_max_var, width=10).pack(side="left", padx=5)
+    ttk.Label(disk_frame, text=f"MB (đang dùng {_disk_cache.total_bytes() / 1024 / 1024:.1f} MB)",
+              foreground="gray").pack(side="left")
+    
+    # Số liệu cache DataFrame trong bộ nhớ
+    def format_cache_stats():
+        stats = _df_cache.stats()
+        return (f"Cache bộ nhớ: {stats['entries']} file, {stats['bytes'] / 1024 / 1024:.1f} MB"
+                f" · trúng {stats['hits']}, trượt {stats['misses']}, loại bỏ {stats['evictions']}")
+    
+    cache_stats_label = ttk.Label(perf_frame, text=format_cache_stats(), foreground="gray")
+    cache_stats_label.pack(anchor="w", pady=5)
+    
+    # Số lần vẽ lại panel thống kê đã được gộp bỏ trong phiên làm việc
+    ttk.Label(perf_frame, text=ui_refresh.describe(), foreground="gray").pack(anchor="w", pady=5)
+    
     # Clear cache button
     def clear_all_caches():
-        global _df_cache, _search_cache, _stats_cache
+        global _df_cache, _search_cache, _score_cache
         _df_cache.clear()
         _search_cache.clear()
-        _stats_cache.clear()
+        _score_stats.invalidate()
+        _score_cache.clear()
+        _disk_cache.clear()
+        _merged_cache.clear()
+        if _config_save_job is not None:
+            flush_config()
         ConfigCache.invalidate()
+        cache_stats_label.configure(text=format_cache_stats())
         ToastNotification.show("✅ Đã xóa toàn bộ cache", "success")
     
     ttk.Button(perf_frame, text="🗑️ Xóa cache", command=clear_all_caches).pack(anchor="w", pady=10)
@@ -1958,20 +1904,26 @@ def customize_excel_reading():
             'enabled': merged_enabled_var.get(),
             'forward_fill': forward_fill_var.get(),
             'combine_with_subheader': combine_var.get(),
-            'cache_merged_info': merged_config.get('cache_merged_info', True)
+            'cache_merged_info': cache_merged_var.get()
         }
         
         # Performance
         config['excel_reading']['performance'] = {
             'enable_caching': cache_enabled_var.get(),
             'cache_max_files': cache_max_var.get(),
+            'cache_max_mb': cache_mb_var.get(),
             'cache_search_results': cache_search_var.get(),
-            'cache_stats': cache_stats_var.get()
+            'cache_stats': cache_stats_var.get(),
+            'streaming_threshold_mb': stream_threshold_var.get(),
+            'fast_reader': fast_reader_var.get(),
+            'disk_cache': disk_cache_var.get(),
+            'disk_cache_max_mb': disk_max_var.get()
         }
         
         # Update cache max size
         global _df_cache
-        _df_cache.max_size = cache_max_var.get()
+        _df_cache.resize(max_size=cache_max_var.get(), max_bytes=cache_mb_var.get() * 1024 * 1024)
+        _disk_cache.max_bytes = disk_max_var.get() * 1024 * 1024
         
         save_config()
         excel_window.destroy()
@@ -2017,6 +1969,7 @@ def customize_columns():
         ToastNotification.show("✅ Đã lưu tên cột mới", "success")
         if 'df' in globals() and df is not None and not df.empty:
             search_student()  # Refresh display
+            ui_refresh.mark_dirty('stats', 'extremes')  # Cột điểm có thể đã đổi
 
     ttk.Button(column_window, text="Lưu", command=save_columns).pack(pady=10)
 
@@ -2511,8 +2464,11 @@ def restore_backup():
                 # Đảm bảo kiểu dữ liệu phù hợp
                 df = ensure_proper_dtypes(df)
                 
-                # Khởi tạo lại search index
-                search_index = None
+                # Dữ liệu phục hồi thay thế toàn bộ, lần lưu tiếp theo ghi lại toàn bộ vùng dữ liệu
+                _writeback.mark_all_dirty()
+                
+                # Cập nhật data_model và khởi tạo lại chỉ mục tra cứu dòng
+                set_dataframe(df, reset_history=True)
                 
                 # Cập nhật giao diện
                 refresh_ui()
@@ -2545,6 +2501,9 @@ def restore_backup():
 def auto_backup_on_exit():
     """Tự động sao lưu dữ liệu khi thoát ứng dụng nếu được bật"""
     global df, file_path
+    
+    # Đảm bảo mọi thay đổi đang chờ đã được ghi vào file gốc trước khi sao lưu
+    _write_queue.drain()
 
     # Kiểm tra cài đặt tự động sao lưu
     if df is not None and file_path is not None and config.get('auto_backup', False):
@@ -2648,6 +2607,20 @@ def auto_backup_on_exit():
 
 def on_closing():
     """Xử lý khi đóng ứng dụng"""
+    # Ghi hết các thay đổi đang chờ, không để mất dữ liệu khi thoát
+    _file_loader.cancel()
+    _write_queue.stop()
+    failed = _write_queue.stats()['failed']
+    if failed and not messagebox.askyesno(
+            "Chưa lưu được thay đổi",
+            f"{failed} thay đổi chưa ghi được vào file:\n{_write_queue.stats()['last_error']}\n\n"
+            "Hãy đóng file trong Excel (nếu đang mở) rồi lưu lại.\n"
+            "Vẫn thoát và bỏ các thay đổi này?",
+            icon='warning'):
+        update_save_status()
+        return
+    if _config_save_job is not None:
+        flush_config()
     auto_backup_on_exit()
     root.destroy()
 
@@ -2656,50 +2629,8 @@ def refresh_ui():
     global df, tree, status_label
     
     if df is not None and not df.empty:
-        # Xóa dữ liệu cũ trong treeview
-        for item in tree.get_children():
-            tree.delete(item)
-        
-        # Hiển thị tối đa 100 học sinh đầu tiên để không làm chậm giao diện
-        display_limit = 100 if len(df) > 100 else len(df)
-        
-        # Tìm các cột phù hợp
-        name_col = find_matching_column(df, config['columns']['name'])
-        exam_code_col = find_matching_column(df, config['columns']['exam_code']) or 'Mã đề'
-        score_col = find_matching_column(df, config['columns']['score']) or 'Điểm'
-        
-        # Hàm áp dụng màu theo điểm
-        def apply_color_by_score(item_id, score_value):
-            """Tô màu dòng theo điểm số"""
-            try:
-                if pd.notna(score_value):
-                    score = float(score_value)
-                    if score < 5:
-                        tree.item(item_id, tags=('low_score',))
-                    elif score < 7:
-                        tree.item(item_id, tags=('medium_score',))
-                    else:
-                        tree.item(item_id, tags=('high_score',))
-                else:
-                    tree.item(item_id, tags=('no_score',))
-            except:
-                tree.item(item_id, tags=('no_score',))
-        
-        for i, (_, row) in enumerate(df.head(display_limit).iterrows()):
-            values = [
-                row[name_col] if name_col in row else "",
-                row[exam_code_col] if exam_code_col in row and pd.notna(row[exam_code_col]) else "",
-                row[score_col] if score_col in row and pd.notna(row[score_col]) else ""
-            ]
-            item_id = tree.insert('', 'end', values=values)
-            
-            # Áp dụng màu theo điểm ngay khi hiển thị
-            if score_col in row:
-                apply_color_by_score(item_id, row[score_col])
-            
-        # Hiển thị thông báo nếu chỉ hiển thị một phần
-        if len(df) > display_limit:
-            tree.insert('', 'end', values=(f"--- Hiển thị {display_limit}/{len(df)} học sinh. Nhập từ khóa để tìm kiếm ---", "", ""))
+        # Hiển thị toàn bộ học sinh trên danh sách ảo (chỉ vẽ các dòng nhìn thấy)
+        student_view.set_rows(np.arange(len(df)))
         
         # Cập nhật status label nếu file_path tồn tại
         if 'file_path' in globals() and file_path:
@@ -2708,20 +2639,15 @@ def refresh_ui():
 
             )
             
-        # Cập nhật thống kê
-        update_stats()
-        
-        # Cập nhật điểm cao nhất/thấp nhất
-        update_score_extremes()
+        # Vẽ lại thống kê và điểm cao nhất/thấp nhất (gộp với các yêu cầu khác khi Tk rảnh)
+        ui_refresh.mark_dirty('stats', 'extremes')
         
         # Kiểm tra và xác minh các cột dữ liệu cần thiết
         verify_required_columns(df)
     else:
         # Nếu không có dữ liệu, hiển thị thông báo
         status_label.configure(text="Chưa tải file Excel")
-        for item in tree.get_children():
-            tree.delete(item)
-        tree.insert('', 'end', values=("Không có dữ liệu để hiển thị. Vui lòng tải file Excel.", "", ""))
+        student_view.show_message("Không có dữ liệu để hiển thị. Vui lòng tải file Excel.")
 
 def verify_required_columns(dataframe):
     """Kiểm tra xem dataframe có các cột cần thiết không"""
@@ -2816,13 +2742,14 @@ def ensure_required_columns(df):
     return df_copy
 
 def create_ui():
-    global status_label, entry_student_name, tree
+    global status_label, entry_student_name, tree, student_view
     global entry_correct_count, entry_exam_code
     global entry_max_questions, score_per_q_label
     global score_info_label, entry_direct_score, stats_label
     global highest_score_label, lowest_score_label  # Thêm biến cho điểm cao/thấp
     global progress_bar, progress_label, high_score_count, medium_score_count, low_score_count, no_score_count  # Dashboard widgets
     global undo_button, redo_button  # Undo/Redo buttons
+    global cancel_load_button  # Nút hủy đọc file
     
     # Khởi tạo style
     style = ttk.Style()
@@ -2874,6 +2801,11 @@ def create_ui():
                           font=(config['ui']['font_family'], 12))
     status_label.pack(side='left', padx=15)
     
+    # Nút hủy đọc file, chỉ hiện khi đang đọc file ở luồng nền
+    cancel_load_button = ctk.CTkButton(statusbar, text="Hủy", width=60, height=24,
+                                       fg_color="#4A5568", hover_color="#2D3748",
+                                       command=cancel_file_load)
+    
     version_display = version_utils.get_version_display()
     version_label = ctk.CTkLabel(statusbar, text=f"v{version_display}", 
                             text_color="gray",
@@ -2979,61 +2911,19 @@ def create_ui():
         
         df_col = col_map.get(col)
         if df_col and df_col in df.columns:
-            # Sort dataframe
-            if col == 'score':
-                # Sắp xếp điểm: đưa NaN xuống cuối
-                df_sorted = df.sort_values(
-                    by=df_col, 
-                    ascending=not sort_column['reverse'],
-                    na_position='last'
-                )
-            else:
-                df_sorted = df.sort_values(
-                    by=df_col, 
-                    ascending=not sort_column['reverse']
-                )
-            
-            # Xóa treeview hiện tại
-            for item in tree.get_children():
-                tree.delete(item)
-            
-            # Hiển thị lại với thứ tự mới
-            display_limit = 100 if len(df_sorted) > 100 else len(df_sorted)
-            
-            # Hàm áp dụng màu theo điểm
-            def apply_color(item_id, score_val):
-                try:
-                    if pd.notna(score_val):
-                        score = float(score_val)
-                        if score < 5:
-                            tree.item(item_id, tags=('low_score',))
-                        elif score < 7:
-                            tree.item(item_id, tags=('medium_score',))
-                        else:
-                            tree.item(item_id, tags=('high_score',))
-                    else:
-                        tree.item(item_id, tags=('no_score',))
-                except:
-                    tree.item(item_id, tags=('no_score',))
-            
-            name_col = col_map['name']
-            exam_col = col_map['exam_code']
-            score_col = col_map['score']
-            
-            for _, row in df_sorted.head(display_limit).iterrows():
-                values = [
-                    row[name_col] if name_col in row else "",
-                    row[exam_col] if exam_col in row and pd.notna(row[exam_col]) else "",
-                    f"{row[score_col]:.2f}" if score_col in row and pd.notna(row[score_col]) else "Chưa có điểm"
-                ]
-                item_id = tree.insert('', 'end', values=values)
-                
-                # Áp dụng màu
-                if score_col in row:
-                    apply_color(item_id, row[score_col])
+            # Sắp xếp các dòng đang hiển thị (theo tìm kiếm/bộ lọc) bằng vị trí dòng, không chèn lại item
+            rows = student_view.rows
+            if len(rows) == 0:
+                return
+            keys = sort_key(df[df_col].iloc[rows].reset_index(drop=True), numeric=(col == 'score'))
             
-            if len(df_sorted) > display_limit:
-                tree.insert('', 'end', values=(f"--- Hiển thị {display_limit}/{len(df_sorted)} học sinh ---", "", ""))
+            # Đưa ô trống xuống cuối
+            order = keys.sort_values(
+                ascending=not sort_column['reverse'],
+                na_position='last',
+                kind='stable'
+            ).index.to_numpy()
+            student_view.set_rows(rows[order])
             
             # Cập nhật header với mũi tên sắp xếp
             arrow = " ▼" if sort_column['reverse'] else " ▲"
@@ -3055,9 +2945,14 @@ def create_ui():
     tree.tag_configure('low_score', background='#450a0a', foreground='#f87171', font=(config['ui']['font_family'], 11, 'bold'))
     tree.tag_configure('no_score', background='#1f2937', foreground='#ffffff', font=(config['ui']['font_family'], 11))
     
-    vsb = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+    vsb = ttk.Scrollbar(list_frame, orient="vertical")
     hsb = ttk.Scrollbar(list_frame, orient="horizontal", command=tree.xview)
-    tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+    tree.configure(xscrollcommand=hsb.set)
+    
+    # Danh sách ảo: treeview chỉ giữ số item bằng số dòng nhìn thấy, thanh cuộn dọc điều khiển cửa sổ dòng
+    student_view = VirtualTreeview(tree, vsb, format_student_rows,
+                                   bind_item=search_index.bind_item,
+                                   clear_items=search_index.clear_items)
     
     tree.grid(column=0, row=0, sticky='nsew', padx=2, pady=2)
     vsb.grid(column=1, row=0, sticky='ns', pady=2)
@@ -3332,7 +3227,7 @@ def check_updates_async():
 
 def update_stats():
     """Cập nhật các thống kê cơ bản với progress bar và phân loại chi tiết, sử dụng cache"""
-    global progress_bar, progress_label, high_score_count, medium_score_count, low_score_count, no_score_count, _stats_cache
+    global progress_bar, progress_label, high_score_count, medium_score_count, low_score_count, no_score_count
     
     if df is None or df.empty:
         stats_label.configure(text="Không có dữ liệu")
@@ -3361,9 +3256,9 @@ def update_stats():
         no_score_count.configure(text=" Chưa có điểm: 0 ")
         return
     
-    # Get basic stats from cache
-    cached_stats = _stats_cache.get_stats(df)
-    students_with_scores = cached_stats['scored']
+    # Thống kê được cập nhật theo từng ô thay đổi, chỉ dựng lại khi dữ liệu bị thay toàn bộ
+    stats = current_score_stats(score_column)
+    students_with_scores = stats.scored
     students_no_scores = total_students - students_with_scores
     
     # Tính phần trăm
@@ -3374,15 +3269,7 @@ def update_stats():
     progress_label.configure(text=f"{percentage:.1f}% ({students_with_scores}/{total_students})")
     
     # Phân loại theo điểm
-    df_with_scores = df[df[score_column].notna()].copy()
-    # Chuyển đổi cột điểm sang dạng số, các giá trị không hợp lệ sẽ thành NaN
-    df_with_scores[score_column] = pd.to_numeric(df_with_scores[score_column], errors='coerce')
-    # Loại bỏ các giá trị NaN sau khi chuyển đổi
-    df_with_scores = df_with_scores[df_with_scores[score_column].notna()]
-    
-    high_count = len(df_with_scores[df_with_scores[score_column] >= 7])
-    medium_count = len(df_with_scores[(df_with_scores[score_column] >= 5) & (df_with_scores[score_column] < 7)])
-    low_count = len(df_with_scores[df_with_scores[score_column] < 5])
+    high_count, medium_count, low_count = stats.bands['high'], stats.bands['medium'], stats.bands['low']
     
     # Cập nhật labels
     stats_label.configure(text=f"{students_with_scores}/{total_students} đã có điểm")
@@ -3407,32 +3294,24 @@ def update_score_extremes():
         lowest_score_label.configure(text="📉 Thấp nhất: N/A")
         return
     
-    # Lọc các hàng có điểm không phải NaN
-    df_with_scores = df[df[score_column].notna()].copy()
-    # Chuyển đổi cột điểm sang dạng số
-    df_with_scores[score_column] = pd.to_numeric(df_with_scores[score_column], errors='coerce')
-    # Loại bỏ các giá trị NaN sau khi chuyển đổi
-    df_with_scores = df_with_scores[df_with_scores[score_column].notna()]
+    stats = current_score_stats(score_column)
+    highest, lowest = stats.highest(), stats.lowest()
     
     # Nếu không có ai có điểm
-    if df_with_scores.empty:
+    if highest is None:
         highest_score_label.configure(text="🏆 Cao nhất: N/A")
         lowest_score_label.configure(text="📉 Thấp nhất: N/A")
         return
     
-    # Tìm điểm cao nhất
-    max_score = df_with_scores[score_column].max()
-    max_students = df_with_scores[df_with_scores[score_column] == max_score][name_column].tolist()
-    max_students_text = ", ".join(max_students[:2])
-    if len(max_students) > 2:
-        max_students_text += f" +{len(max_students) - 2}"
+    # Tên 2 học sinh đầu tiên (theo thứ tự trong danh sách) và số học sinh còn lại cùng mức điểm
+    def describe_students(rows):
+        text = ", ".join(str(df[name_column].iat[row]) for row in heapq.nsmallest(2, rows))
+        if len(rows) > 2:
+            text += f" +{len(rows) - 2}"
+        return text
     
-    # Tìm điểm thấp nhất
-    min_score = df_with_scores[score_column].min()
-    min_students = df_with_scores[df_with_scores[score_column] == min_score][name_column].tolist()
-    min_students_text = ", ".join(min_students[:2])
-    if len(min_students) > 2:
-        min_students_text += f" +{len(min_students) - 2}"
+    max_score, max_students_text = highest[0], describe_students(highest[1])
+    min_score, min_students_text = lowest[0], describe_students(lowest[1])
     
     # Cập nhật giao diện
     highest_score_label.configure(text=f"🏆 Cao nhất: {max_score:.2f} ({max_students_text})")
@@ -3679,10 +3558,28 @@ def show_score_distribution():
         ToastNotification.show("ℹ️ Không có cột điểm trong dữ liệu", "info")
         return
     
-    # Lọc chỉ lấy học sinh có điểm
-    scores = df[df['Điểm'].notna()]['Điểm']
+    def summarize_distribution():
+        # Lọc chỉ lấy học sinh có điểm
+        scores = pd.to_numeric(df['Điểm'], errors='coerce').dropna()
+        if len(scores) == 0:
+            return None
+        return {
+            'count': len(scores),
+            'mean': scores.mean(),
+            'median': scores.median(),
+            'max': scores.max(),
+            'min': scores.min(),
+            'passed': int((scores >= 5.0).sum()),
+            'excellent': int((scores >= 8.5).sum()),
+            'good': int(((scores >= 7) & (scores < 8.5)).sum()),
+            'average': int(((scores >= 5) & (scores < 7)).sum()),
+            'weak': int((scores < 5).sum())
+        }
+    
+    # Số liệu biểu đồ chỉ tính lại khi phiên bản dữ liệu thay đổi
+    summary = _score_cache.get('distribution', data_model.version, summarize_distribution)
     
-    if len(scores) == 0:
+    if summary is None:
         ToastNotification.show("ℹ️ Chưa có học sinh nào có điểm", "info")
         return
     
@@ -3701,18 +3598,18 @@ def show_score_distribution():
         # Tạo figure với dark background
         fig = Figure(figsize=(11, 6), dpi=100, facecolor=config['ui']['theme']['background'])
         
-        # Tính toán thống kê
-        mean_score = scores.mean()
-        median_score = scores.median()
-        pass_threshold = 5.0
-        passed = (scores >= pass_threshold).sum()
-        failed = len(scores) - passed
+        # Thống kê
+        total_scored = summary['count']
+        mean_score = summary['mean']
+        median_score = summary['median']
+        passed = summary['passed']
+        failed = total_scored - passed
         
         # Phân loại học lực
-        excellent = (scores >= 8.5).sum()  # Giỏi
-        good = ((scores >= 7) & (scores < 8.5)).sum()  # Khá
-        average = ((scores >= 5) & (scores < 7)).sum()  # TB
-        weak = (scores < 5).sum()  # Yếu
+        excellent = summary['excellent']  # Giỏi
+        good = summary['good']  # Khá
+        average = summary['average']  # TB
+        weak = summary['weak']  # Yếu
         
         # Layout: 1 hàng 3 cột - đơn giản, dễ nhìn
         gs = fig.add_gridspec(1, 3, wspace=0.3)
@@ -3730,7 +3627,7 @@ def show_score_distribution():
         for bar, value in zip(bars, values):
             height = bar.get_height()
             ax1.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{int(value)} HS\n({value/len(scores)*100:.1f}%)',
+                    f'{int(value)} HS\n({value/total_scored*100:.1f}%)',
                     ha='center', va='bottom', color='white', fontsize=11, fontweight='bold')
         
         ax1.set_title('PHÂN LOẠI HỌC LỰC', fontsize=15, fontweight='bold', color='white', pad=15)
@@ -3750,16 +3647,16 @@ def show_score_distribution():
         
         # Tạo bảng thông tin (không dùng emoji để tránh lỗi font)
         stats_data = [
-            ['TỔNG SỐ', f'{len(scores)} HS'],
+            ['TỔNG SỐ', f'{total_scored} HS'],
             ['', ''],
             ['Đạt (≥5)', f'{passed} HS'],
             ['Chưa đạt', f'{failed} HS'],
-            ['Tỷ lệ đạt', f'{passed/len(scores)*100:.1f}%'],
+            ['Tỷ lệ đạt', f'{passed/total_scored*100:.1f}%'],
             ['', ''],
             ['Điểm TB', f'{mean_score:.2f}'],
             ['Trung bình', f'{median_score:.2f}'],
-            ['Cao nhất', f'{scores.max():.2f}'],
-            ['Thấp nhất', f'{scores.min():.2f}'],
+            ['Cao nhất', f'{summary["max"]:.2f}'],
+            ['Thấp nhất', f'{summary["min"]:.2f}'],
         ]
         
         table = ax2.table(cellText=stats_data, cellLoc='left',
@@ -3819,51 +3716,71 @@ def focus_correct_count(event=None):
     entry_correct_count.focus_set()
     entry_correct_count.select_range(0, tk.END)
 
-def detect_merged_cells_structure(file_path, config):
+def detect_merged_cells_structure(sheet, config):
     """
-    Phát hiện cấu trúc merged cells từ Excel file
-    Returns: dict với thông tin về merged cells và multi-level headers
+    Vùng merged cells ở phần header của sheet đã đọc (excel_reader.SheetData)
+    
+    Returns: MergedRanges các vùng bắt đầu trong max_search_rows dòng đầu (dạng khoảng,
+    không tách ra từng ô), None nếu tắt xử lý merged cells hoặc không có vùng nào
     """
     try:
-        if not config.get('excel_reading', {}).get('merged_cell_handling', {}).get('enabled', True):
+        excel_config = config.get('excel_reading', {})
+        if not excel_config.get('merged_cell_handling', {}).get('enabled', True):
             return None
         
-        # Không dùng read_only mode để có thể access merged_cells
-        wb = load_workbook(file_path, data_only=True)
-        ws = wb.active
-        
-        merged_ranges = list(ws.merged_cells.ranges)
-        
-        if not merged_ranges:
-            wb.close()
+        # Vùng merge đã được lấy ra trong cùng lần đọc sheet, không cần mở lại file
+        if not sheet.merged_ranges:
             return None
         
-        # Parse merged cell info
-        merged_info = {}
-        for merged_range in merged_ranges:
-            min_col, min_row, max_col, max_row = merged_range.bounds
-            # Lưu thông tin: cell nào được merge với cells nào
-            for row in range(min_row, max_row + 1):
-                for col in range(min_col, max_col + 1):
-                    merged_info[(row, col)] = {
-                        'parent': (min_row, min_col),
-                        'is_parent': (row == min_row and col == min_col),
-                        'bounds': (min_row, min_col, max_row, max_col)
-                    }
-        
-        wb.close()
-        return merged_info
+        max_rows = excel_config.get('header_detection', {}).get('max_search_rows', 50)
+        return MergedRanges(sheet.merged_ranges).starting_within(max_rows) or None
         
     except Exception as e:
         print(f"Error detecting merged cells: {e}")
         return None
 
 
+def load_merged_ranges(file_path, config, sheet_index=0):
+    """
+    Vùng merged cells ở phần header của sheet, đọc thẳng từ XML (dùng khi đọc theo luồng)
+    
+    Với cache_merged_info, kết quả được lưu theo băm nội dung file nên lần mở sau không phải
+    quét lại XML.
+    
+    Returns: MergedRanges như detect_merged_cells_structure, None nếu tắt xử lý merged cells,
+    phần header không có vùng merge hoặc không đọc được
+    """
+    excel_config = config.get('excel_reading', {})
+    merged_config = excel_config.get('merged_cell_handling', {})
+    if not merged_config.get('enabled', True):
+        return None
+    max_rows = excel_config.get('header_detection', {}).get('max_search_rows', 50)
+    
+    try:
+        key = None
+        if merged_config.get('cache_merged_info', True):
+            key = MergedRangesCache.make_key(file_path, sheet_index, max_rows)
+            cached = _merged_cache.get(key)
+            if cached is not None:
+                return MergedRanges(cached) or None
+        
+        merged = read_merged_ranges(file_path, sheet_index, max_row=max_rows)
+        if key is not None:
+            try:
+                _merged_cache.set(key, merged)
+            except OSError as e:
+                print(f"Không thể ghi cache vùng merge: {e}")
+        return merged or None
+    except Exception as e:
+        print(f"Error reading merged cells: {e}")
+        return None
+
+
 def combine_multi_level_headers(df_headers, merged_info, config):
     """
     Kết hợp multi-level headers thành tên cột đầy đủ
     df_headers: DataFrame chứa các dòng header
-    merged_info: dict thông tin về merged cells
+    merged_info: MergedRanges vùng merge ở phần header (hoặc None)
     """
     try:
         separator = config.get('excel_reading', {}).get('header_detection', {}).get('merge_separator', '_')
@@ -3901,75 +3818,11 @@ def combine_multi_level_headers(df_headers, merged_info, config):
 
 def match_column_pattern(column_name, config):
     """
-    Match column name với patterns trong config
+    Match column name với patterns trong config (matcher biên dịch sẵn, dùng chung với find_matching_column)
     Returns: dict với thông tin về pattern matched hoặc None
     """
     try:
-        patterns_config = config.get('excel_reading', {}).get('column_patterns', {})
-        column_name_lower = str(column_name).lower().strip()
-        
-        # Check student info patterns
-        for field_name, field_config in patterns_config.get('student_info', {}).items():
-            # Try exact patterns first
-            patterns = field_config.get('patterns', [])
-            for pattern in patterns:
-                if pattern.lower() in column_name_lower or column_name_lower in pattern.lower():
-                    return {
-                        'type': 'student_info',
-                        'field': field_name,
-                        'matched_pattern': pattern,
-                        'required': field_config.get('required', False)
-                    }
-            
-            # Try regex
-            regex = field_config.get('regex', '')
-            if regex:
-                try:
-                    if re.match(regex, column_name, re.IGNORECASE):
-                        return {
-                            'type': 'student_info',
-                            'field': field_name,
-                            'matched_pattern': regex,
-                            'required': field_config.get('required', False)
-                        }
-                except:
-                    pass
-        
-        # Check score columns patterns
-        for score_type, score_config in patterns_config.get('score_columns', {}).items():
-            patterns = score_config.get('patterns', [])
-            for pattern in patterns:
-                if pattern.lower() in column_name_lower or column_name_lower in pattern.lower():
-                    return {
-                        'type': 'score',
-                        'score_type': score_type,
-                        'matched_pattern': pattern,
-                        'has_sub_columns': score_config.get('has_sub_columns', False),
-                        'description': score_config.get('description', '')
-                    }
-            
-            # Try regex
-            regex = score_config.get('regex', '')
-            if regex:
-                try:
-                    match = re.match(regex, column_name, re.IGNORECASE)
-                    if match:
-                        result = {
-                            'type': 'score',
-                            'score_type': score_type,
-                            'matched_pattern': regex,
-                            'has_sub_columns': score_config.get('has_sub_columns', False),
-                            'description': score_config.get('description', '')
-                        }
-                        # Extract sub-column number if exists
-                        if match.groups():
-                            result['sub_column'] = match.group(len(match.groups()))
-                        return result
-                except:
-                    pass
-        
-        return None
-        
+        return _column_resolver.matcher(config).match(column_name)
     except Exception as e:
         print(f"Error matching column pattern: {e}")
         return None
@@ -3977,42 +3830,11 @@ def match_column_pattern(column_name, config):
 
 def score_header_row(row_data, config):
     """
-    Tính điểm cho một dòng dựa trên số lượng cột khớp với patterns
+    Tính điểm cho một dòng dựa trên các từ khóa/pattern cột xuất hiện trong dòng
     Returns: float score (cao hơn = nhiều khả năng là header)
     """
     try:
-        score = 0
-        patterns_config = config.get('excel_reading', {}).get('column_patterns', {})
-        
-        # Keywords để tìm trong header row
-        student_keywords = ['họ và tên', 'tên học sinh', 'tên', 'họ tên', 'học sinh', 
-                           'mã số', 'mssv', 'mã định danh', 'stt', 'số tt']
-        score_keywords = ['điểm', 'đđgtx', 'đđggk', 'đđgck', 'đtb', 'score', 'tx', 'gk', 'ck']
-        other_keywords = ['ngày sinh', 'giới tính', 'phái', 'lớp', 'khối']
-        
-        row_str = ' '.join([str(val).lower() for val in row_data if pd.notna(val)])
-        
-        # Điểm cho student info keywords
-        for keyword in student_keywords:
-            if keyword in row_str:
-                score += 3
-        
-        # Điểm cho score keywords
-        for keyword in score_keywords:
-            if keyword in row_str:
-                score += 2
-        
-        # Điểm cho other keywords
-        for keyword in other_keywords:
-            if keyword in row_str:
-                score += 1
-        
-        # Bonus nếu có nhiều cột không trống
-        non_empty_cols = sum(1 for val in row_data if pd.notna(val) and str(val).strip())
-        score += non_empty_cols * 0.5
-        
-        return score
-        
+        return _column_resolver.matcher(config).score_row(row_data)
     except Exception as e:
         print(f"Error scoring header row: {e}")
         return 0
@@ -4036,150 +3858,182 @@ def find_header_row(headers_df, config=None):
             
             return header_row
         
-        # New scoring-based logic
-        max_score = 0
-        best_header_row = 0
-        min_columns_match = config.get('excel_reading', {}).get('header_detection', {}).get('min_columns_match', 3)
-        
-        for i in range(len(headers_df)):
-            row_data = headers_df.iloc[i]
-            score = score_header_row(row_data, config)
-            
-            if score > max_score:
-                max_score = score
-                best_header_row = i
-        
-        # Validate: dòng tiếp theo phải có data hợp lệ
-        validate = config.get('excel_reading', {}).get('header_detection', {}).get('validate_data_rows', True)
-        if validate and best_header_row < len(headers_df) - 1:
-            next_row = headers_df.iloc[best_header_row + 1]
-            # Check xem dòng tiếp theo có phải là data không
-            non_empty = sum(1 for val in next_row if pd.notna(val) and str(val).strip())
-            if non_empty < 2:  # Quá ít data, có thể không phải header đúng
-                # Try next row
-                if best_header_row + 1 < len(headers_df):
-                    best_header_row += 1
-        
-        return best_header_row
+        return detect_header(headers_df, config)['header_row']
         
     except Exception as e:
         print(f"Error finding header row: {e}")
         return 0
 
 
-def read_excel_file(file_path):
-    """Đọc file Excel theo cách thông thường với caching và merged cells support"""
-    global _df_cache
-    status_label.configure(text=f"Đang đọc file Excel...")
-    root.update()
+def detect_header(headers_df, config, merged_ranges=None):
+    """
+    Dò dòng header, số dòng header (header nhiều cấp) và độ tin cậy trên các dòng đầu sheet
     
-    try:
-        # Check cache trước
-        config = load_config()
-        enable_caching = config.get('excel_reading', {}).get('performance', {}).get('enable_caching', True)
-        
-        if enable_caching:
-            cached_df = _df_cache.get(file_path)
-            if cached_df is not None:
-                status_label.configure(text=f"Đã load file từ cache")
-                return cached_df
-        
-        # Đọc header với max_search_rows từ config
-        max_rows = config.get('excel_reading', {}).get('header_detection', {}).get('max_search_rows', 50)
-        
-        # Detect merged cells structure nếu enabled
-        merged_info = None
-        if config.get('excel_reading', {}).get('merged_cell_handling', {}).get('enabled', True):
-            merged_info = detect_merged_cells_structure(file_path, config)
-        
-        # Thử đọc với engine openpyxl trước
-        headers_df = pd.read_excel(file_path, nrows=max_rows, engine='openpyxl')
-        
-        # Tìm hàng chứa header thực sự với scoring
-        header_row = find_header_row(headers_df, config)
-        
-        # Check nếu có multi-level headers
-        multi_level = config.get('excel_reading', {}).get('header_detection', {}).get('multi_level_support', True)
-        if multi_level and merged_info and header_row < len(headers_df) - 1:
-            # Đọc thêm vài dòng sau header row để check multi-level
-            header_rows_to_read = min(3, len(headers_df) - header_row)
-            if header_rows_to_read > 1:
-                # Đọc với header là list các rows
-                df_result = pd.read_excel(file_path, header=list(range(header_row, header_row + header_rows_to_read)), engine='openpyxl')
-                # Combine multi-level headers
-                if isinstance(df_result.columns, pd.MultiIndex):
-                    # Flatten MultiIndex columns
-                    separator = config.get('excel_reading', {}).get('header_detection', {}).get('merge_separator', '_')
-                    df_result.columns = [separator.join(str(i) for i in col if str(i) != 'nan').strip(separator) 
-                                        for col in df_result.columns.values]
-            else:
-                # Đọc bình thường
-                df_result = pd.read_excel(file_path, header=header_row, engine='openpyxl')
-        else:
-            # Đọc lại với header đúng
-            df_result = pd.read_excel(file_path, header=header_row, engine='openpyxl')
-        
-        # Xử lý trường hợp DataFrame rỗng
-        if df_result.empty:
-            status_label.configure(text="File Excel không có dữ liệu")
-            return pd.DataFrame()
-        
-        # Đảm bảo các cột cần thiết tồn tại
-        df_result = ensure_required_columns(df_result)
-        
-        # Đảm bảo kiểu dữ liệu phù hợp
-        df_result = ensure_proper_dtypes(df_result)
-        
-        # Cache result
-        if enable_caching:
-            _df_cache.set(file_path, df_result)
-        
-        status_label.configure(text=f"Đã đọc xong file Excel")
-        return df_result
-        
-    except ImportError:
-        # Nếu không có openpyxl, thử dùng engine mặc định
-        print("Không tìm thấy openpyxl, sử dụng engine mặc định...")
-        config = load_config()
-        max_rows = config.get('excel_reading', {}).get('header_detection', {}).get('max_search_rows', 50)
-        headers_df = pd.read_excel(file_path, nrows=max_rows)
-        
-        # Tìm hàng chứa header thực sự
-        header_row = find_header_row(headers_df, config)
-        
-        # Đọc lại với header đúng
-        df_result = pd.read_excel(file_path, header=header_row)
-        
-        # Xử lý trường hợp DataFrame rỗng
-        if df_result.empty:
-            status_label.configure(text="File Excel không có dữ liệu")
-            return pd.DataFrame()
-        
-        # Đảm bảo các cột cần thiết tồn tại
-        df_result = ensure_required_columns(df_result)
+    Cả vùng dò được chấm điểm một lần bằng ma trận ô không trống và ma trận từ khóa
+    (ColumnMatcher.detect_header, dùng chung pattern với match_column_pattern).
+    
+    Args:
+        headers_df (DataFrame): Các dòng đầu sheet, không header (ô trống là NaN)
+        config (dict): Cấu hình (excel_reading.header_detection)
+        merged_ranges: Vùng merged cells ở phần header, None nếu không có (số dòng header khi
+            đó chỉ dựa vào nội dung)
         
-        # Đảm bảo kiểu dữ liệu phù hợp
-        df_result = ensure_proper_dtypes(df_result)
+    Returns:
+        dict: header_row (0-based), header_depth, confidence (0-1), scores
+    """
+    header_config = config.get('excel_reading', {}).get('header_detection', {})
+    return _column_resolver.matcher(config).detect_header(
+        headers_df.to_numpy(dtype=object),
+        min_columns_match=header_config.get('min_columns_match', 3),
+        validate=header_config.get('validate_data_rows', True),
+        multi_level=header_config.get('multi_level_support', True),
+        merged_ranges=merged_ranges)
+
+
+def read_excel_cached(file_path, config, progress=None):
+    """
+    Đọc file Excel, dùng lại kết quả trong cache trên đĩa nếu nội dung file và cấu hình đọc không đổi
+    
+    Chạy ở luồng nền như parse_excel_file.
+    """
+    if not config.get('excel_reading', {}).get('performance', {}).get('disk_cache', True):
+        return parse_excel_file(file_path, config, progress)
+    
+    key = DiskFrameCache.make_key(file_path, config)
+    cached_df = _disk_cache.get(key)
+    if cached_df is not None:
+        return cached_df
+    
+    df_result = parse_excel_file(file_path, config, progress)
+    if not df_result.empty:
+        try:
+            _disk_cache.set(key, df_result)
+        except Exception as e:
+            print(f"Không thể ghi cache trên đĩa: {str(e)}")
+    return df_result
+
+def parse_excel_file(file_path, config, progress=None):
+    """
+    Đọc và chuẩn hóa dữ liệu từ file Excel với merged cells support (hoặc file CSV, Parquet)
+    
+    Không dùng giao diện nên chạy được ở luồng nền (xem load_excel_in_background).
+    
+    Args:
+        file_path (str): Đường dẫn file Excel, .csv hoặc .parquet
+        config (dict): Cấu hình (bản sao, không bị sửa trong lúc đọc)
+        progress: Hàm progress(rows_read, total_rows); có thể ném LoadCancelled để dừng
         
-        status_label.configure(text=f"Đã đọc xong file Excel")
-        return df_result
+    Returns:
+        pd.DataFrame: Dữ liệu đã chuẩn hóa, DataFrame rỗng nếu file không có dữ liệu
+    """
+    # File lớn: đọc theo luồng từng khối dòng để giới hạn bộ nhớ
+    perf_config = config.get('excel_reading', {}).get('performance', {})
+    threshold_mb = perf_config.get('streaming_threshold_mb', 2)
+    source_format = file_format(file_path)
+    if source_format == 'csv':
+        df_result = load_csv(file_path, config)
+    elif source_format == 'parquet':
+        df_result = read_parquet(file_path)
+    elif threshold_mb and os.path.getsize(file_path) >= threshold_mb * 1024 * 1024:
+        df_result = load_excel_lazily(file_path, config=config, progress=progress)
+    else:
+        # Đọc sheet một lần duy nhất: giá trị các dòng và vùng merged cells
+        df_result = sheet_to_frame(
+            read_sheet(file_path, progress=progress, fast=perf_config.get('fast_reader', True)), config)
+    
+    # Xử lý trường hợp DataFrame rỗng
+    if df_result.empty:
+        return pd.DataFrame()
+    
+    # Đảm bảo các cột cần thiết tồn tại
+    df_result = ensure_required_columns(df_result)
+    
+    # Đảm bảo kiểu dữ liệu phù hợp
+    return ensure_proper_dtypes(df_result)
+    
+    
+def sheet_to_frame(sheet, config, sheet_index=0):
+    """
+    Dò header trên dữ liệu thô của một sheet và dựng DataFrame
+    
+    Args:
+        sheet (SheetData): Dữ liệu đọc bằng read_sheet
+        config (dict): Cấu hình (bản sao)
+        sheet_index (int): Vị trí sheet trong workbook (để ghi từng ô về đúng sheet)
         
-    except Exception as e:
-        status_label.configure(text=f"Lỗi: {str(e)}")
-        messagebox.showerror("Lỗi", f"Không thể đọc file Excel: {str(e)}")
-        traceback.print_exc()
-        return pd.DataFrame()  # Trả về DataFrame rỗng khi có lỗi 
+    Returns:
+        pd.DataFrame: Dữ liệu với attrs[SOURCE_LAYOUT_KEY], rỗng nếu sheet không có dữ liệu
+    """
+    header_config = config.get('excel_reading', {}).get('header_detection', {})
     
+    # Mẫu các dòng đầu để dò header với max_search_rows từ config
+    max_rows = header_config.get('max_search_rows', 50)
+    headers_df = sheet.header_sample(max_rows)
     
-def auto_update_stats():
-    """Tự động cập nhật thống kê theo chu kỳ"""
-    # Cập nhật thống kê
-    if df is not None and not df.empty:
-        update_stats()
-        update_score_extremes()
+    # Detect merged cells structure nếu enabled
+    merged_info = detect_merged_cells_structure(sheet, config)
+    
+    # Dòng header (0-based), số dòng header nhiều cấp và độ tin cậy, chấm điểm cả vùng một lần
+    detection = detect_header(headers_df, config, merged_info)
+    header_row = detection['header_row']
+    header_depth = detection['header_depth']
+    if detection['confidence'] < 1:
+        print(f"Dòng header {header_row + 1} được chọn với độ tin cậy {detection['confidence']:.0%}")
     
-    # Thiết lập lịch cập nhật tiếp theo (5 giây)
-    root.after(5000, auto_update_stats)
+    # Dựng DataFrame từ các dòng đã đọc
+    separator = header_config.get('merge_separator', '_')
+    df_result = sheet.to_frame(header_row, header_depth, separator)
+    
+    if not df_result.empty:
+        # Lưu vị trí dữ liệu trong sheet gốc để save_excel chỉ vá các ô thay đổi
+        df_result.attrs[SOURCE_LAYOUT_KEY] = make_source_layout(
+            header_row, header_depth, len(df_result.columns), sheet_index=sheet_index)
+    return df_result
+
+def parse_workbooks(sources, config, progress=None):
+    """
+    Đọc nhiều sheet/nhiều file (song song bằng nhiều tiến trình) và ghép thành một bảng
+    
+    Args:
+        sources: Danh sách (file_path, sheet_index, sheet_name)
+        config (dict): Cấu hình (bản sao)
+        progress: Hàm progress(sheets_done, total_sheets); có thể ném LoadCancelled để dừng
+        
+    Returns:
+        pd.DataFrame: Bảng ghép đã chuẩn hóa, mỗi dòng gắn lớp/tệp nguồn
+    """
+    fast = config.get('excel_reading', {}).get('performance', {}).get('fast_reader', True)
+    sheets = read_sheets([(path, index) for path, index, _ in sources], progress=progress, fast=fast)
+    parts = []
+    for (path, index, name), sheet in zip(sources, sheets):
+        frame = sheet_to_frame(sheet, config, sheet_index=index)
+        if not frame.empty:
+            parts.append((path, name, ensure_required_columns(frame)))
+    
+    df_result = combine_parts(parts)
+    if df_result.empty:
+        return pd.DataFrame()
+    return ensure_proper_dtypes(df_result)
+
+def is_combined_data(data):
+    """True nếu dữ liệu được ghép từ nhiều sheet/file"""
+    return data is not None and SOURCE_PARTS_KEY in data.attrs
+
+def current_score_stats(score_column):
+    """Thống kê của cột điểm hiện tại, dựng lại (vector) nếu dữ liệu bị thay hoặc đổi cột điểm"""
+    if _score_stats.stale or _score_stats.column != score_column or _score_stats.total != len(df):
+        _score_stats.rebuild(df[score_column], column=score_column)
+    return _score_stats
+
+def on_data_changed(model, cells):
+    """Cập nhật thống kê điểm theo các ô vừa đổi (thay cho việc tính lại định kỳ 5 giây)"""
+    if cells is None:
+        _score_stats.invalidate()
+    else:
+        for row, column, old, new in cells:
+            if column == _score_stats.column:
+                _score_stats.update(row, old, new)
+    ui_refresh.mark_dirty('stats', 'extremes')
 
 def choose_update_channel():
     """
@@ -4253,8 +4107,10 @@ root.after(5000, check_updates_async)
 # Hiện thông báo khi đã sẵn sàng
 status_label.configure(text="✅ Ứng dụng đã sẵn sàng! Đang kiểm tra cập nhật...")
 
-# Bắt đầu cập nhật thống kê tự động
-root.after(1000, auto_update_stats)
+# Thống kê điểm được cập nhật theo thông báo thay đổi dữ liệu, vẽ lại khi Tk rảnh
+ui_refresh.register('stats', update_stats)
+ui_refresh.register('extremes', update_score_extremes)
+data_model.add_listener(on_data_changed)
 
 # Chạy ứng dụng
 root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,69 @@
+"""
+Module gộp các lần làm mới giao diện
+
+Thay vì mỗi thao tác tự gọi lại các hàm vẽ (thống kê, điểm cao/thấp nhất...), thao tác chỉ
+đánh dấu panel cần vẽ lại bằng mark_dirty. Một callback duy nhất chạy khi Tk rảnh
+(root.after_idle) vẽ lại mỗi panel bị đánh dấu đúng một lần, dù panel đó được đánh dấu
+bao nhiêu lần trước đó. Số lần yêu cầu và số lần vẽ thực tế được đếm để biết đã bỏ được
+bao nhiêu lần tính lại thừa trong phiên làm việc.
+"""
+
+import traceback
+from collections import Counter
+
+
+class RefreshScheduler:
+    """
+    Bộ lập lịch làm mới các panel giao diện
+
+    Args:
+        schedule_idle: Hàm schedule_idle(callback), thường là root.after_idle
+    """
+
+    def __init__(self, schedule_idle):
+        self.schedule_idle = schedule_idle
+        self._panels = {}       # tên panel → hàm vẽ lại, theo thứ tự đăng ký
+        self._dirty = set()
+        self._scheduled = False
+        self.requests = Counter()  # số lần mỗi panel được đánh dấu
+        self.repaints = Counter()  # số lần mỗi panel thực sự được vẽ lại
+
+    def register(self, name, callback):
+        """Đăng ký panel và hàm vẽ lại của nó"""
+        self._panels[name] = callback
+
+    def mark_dirty(self, *names):
+        """Đánh dấu các panel cần vẽ lại ở lần Tk rảnh tiếp theo"""
+        for name in names:
+            self.requests[name] += 1
+            self._dirty.add(name)
+        if not self._scheduled:
+            self._scheduled = True
+            self.schedule_idle(self.flush)
+
+    def flush(self):
+        """Vẽ lại mỗi panel bị đánh dấu một lần (panel đánh dấu trong lúc vẽ chờ lần sau)"""
+        self._scheduled = False
+        dirty, self._dirty = self._dirty, set()
+        for name, callback in self._panels.items():
+            if name not in dirty:
+                continue
+            self.repaints[name] += 1
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+    @property
+    def eliminated(self):
+        """Số lần vẽ lại thừa đã được gộp bỏ"""
+        return sum(self.requests.values()) - sum(self.repaints.values())
+
+    def summary(self):
+        """Tóm tắt theo từng panel: (số yêu cầu, số lần vẽ)"""
+        return {name: (self.requests[name], self.repaints[name]) for name in self._panels}
+
+    def describe(self):
+        """Một dòng mô tả số liệu để hiển thị trong phần cài đặt hiệu năng"""
+        return (f"Làm mới giao diện: {sum(self.requests.values())} yêu cầu, "
+                f"{sum(self.repaints.values())} lần vẽ · bỏ được {self.eliminated} lần tính lại thừa")
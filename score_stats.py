@@ -0,0 +1,162 @@
+"""
+Module thống kê điểm cập nhật tăng dần
+
+Thống kê (số học sinh có điểm, số lượng theo mức Giỏi/Khá/Yếu, tổng và tổng bình phương để
+tính trung bình/độ lệch chuẩn, điểm cao/thấp nhất cùng các dòng đạt điểm đó) được dựng một
+lần bằng thao tác vector khi tải dữ liệu, sau đó mỗi lần sửa một ô điểm chỉ cập nhật O(log n)
+thay vì quét lại cả cột.
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+HIGH_SCORE = 7   # Giỏi: điểm >= 7
+PASS_SCORE = 5   # Khá: 5 <= điểm < 7, Yếu: điểm < 5
+
+
+def to_score(value):
+    """Đổi giá trị ô sang điểm (float), None nếu chưa có điểm hoặc không phải số"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(score) else score
+
+
+def score_band(score):
+    """Mức điểm: 'high' (>= 7), 'medium' (5-7) hoặc 'low' (< 5)"""
+    if score >= HIGH_SCORE:
+        return 'high'
+    if score >= PASS_SCORE:
+        return 'medium'
+    return 'low'
+
+
+class ScoreStats:
+    """
+    Thống kê của một cột điểm, cập nhật theo từng ô thay đổi
+
+    - rebuild(scores): dựng lại từ cả cột (khi tải file, thêm/xóa dòng)
+    - update(row, old, new): một ô điểm đổi giá trị
+    - stale: True khi cần dựng lại trước khi đọc (dữ liệu bị thay toàn bộ)
+    """
+
+    def __init__(self):
+        self.column = None
+        self.stale = True
+        self._reset(0)
+
+    def _reset(self, total):
+        self.total = total
+        self.scored = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.bands = {'high': 0, 'medium': 0, 'low': 0}
+        self._rows_by_score = {}  # điểm → tập vị trí dòng có điểm đó
+        self._min_heap = []       # các mức điểm (xóa lười: bỏ qua mức không còn trong _rows_by_score)
+        self._max_heap = []       # các mức điểm đổi dấu
+
+    def invalidate(self):
+        """Đánh dấu cần dựng lại (dữ liệu bị thay toàn bộ hoặc không rõ ô nào đổi)"""
+        self.stale = True
+
+    def rebuild(self, scores, column=None):
+        """
+        Dựng thống kê từ cả cột điểm bằng thao tác vector
+
+        Args:
+            scores: Cột điểm (Series/mảng, giá trị không phải số coi như chưa có điểm)
+            column: Tên cột điểm đang theo dõi
+        """
+        values = pd.to_numeric(pd.Series(scores), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        self._reset(len(values))
+        self.column = column
+        self.stale = False
+
+        rows = np.flatnonzero(~np.isnan(values))
+        scored = values[rows]
+        self.scored = len(scored)
+        self.sum = float(scored.sum())
+        self.sum_sq = float(np.square(scored).sum())
+        self.bands['high'] = int((scored >= HIGH_SCORE).sum())
+        self.bands['low'] = int((scored < PASS_SCORE).sum())
+        self.bands['medium'] = self.scored - self.bands['high'] - self.bands['low']
+
+        # Nhóm vị trí dòng theo mức điểm: sắp xếp một lần rồi cắt theo ranh giới các mức
+        order = np.argsort(scored, kind='stable')
+        levels, starts = np.unique(scored[order], return_index=True)
+        groups = np.split(rows[order], starts[1:]) if len(levels) else []
+        self._rows_by_score = {float(level): set(group.tolist()) for level, group in zip(levels, groups)}
+        self._min_heap = [float(level) for level in levels]  # đã sắp xếp tăng dần nên là heap hợp lệ
+        self._max_heap = [-level for level in reversed(self._min_heap)]
+
+    def _add(self, row, score):
+        self.scored += 1
+        self.sum += score
+        self.sum_sq += score * score
+        self.bands[score_band(score)] += 1
+        rows = self._rows_by_score.get(score)
+        if rows is None:
+            self._rows_by_score[score] = {row}
+            heapq.heappush(self._min_heap, score)
+            heapq.heappush(self._max_heap, -score)
+        else:
+            rows.add(row)
+
+    def _remove(self, row, score):
+        rows = self._rows_by_score.get(score)
+        if rows is None or row not in rows:
+            return
+        rows.discard(row)
+        if not rows:
+            del self._rows_by_score[score]
+        self.scored -= 1
+        self.sum -= score
+        self.sum_sq -= score * score
+        self.bands[score_band(score)] -= 1
+
+    def update(self, row, old, new):
+        """Ghi nhận ô điểm ở dòng row đổi từ old sang new (O(log n))"""
+        old, new = to_score(old), to_score(new)
+        if old == new:
+            return
+        if old is not None:
+            self._remove(row, old)
+        if new is not None:
+            self._add(row, new)
+        # Thu gọn heap khi có quá nhiều mức đã bị xóa lười
+        if len(self._min_heap) > 2 * len(self._rows_by_score) + 32:
+            self._min_heap = sorted(self._rows_by_score)
+            self._max_heap = [-level for level in reversed(self._min_heap)]
+
+    def _top(self, heap, sign):
+        while heap and sign * heap[0] not in self._rows_by_score:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        score = sign * heap[0]
+        return score, self._rows_by_score[score]
+
+    def highest(self):
+        """(điểm cao nhất, tập vị trí dòng), None nếu chưa ai có điểm"""
+        return self._top(self._max_heap, -1)
+
+    def lowest(self):
+        """(điểm thấp nhất, tập vị trí dòng), None nếu chưa ai có điểm"""
+        return self._top(self._min_heap, 1)
+
+    @property
+    def mean(self):
+        return self.sum / self.scored if self.scored else 0.0
+
+    @property
+    def std(self):
+        """Độ lệch chuẩn (tổng thể) tính từ tổng và tổng bình phương"""
+        if not self.scored:
+            return 0.0
+        return math.sqrt(max(self.sum_sq / self.scored - self.mean ** 2, 0.0))
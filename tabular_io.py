@@ -0,0 +1,309 @@
+"""
+Module đọc/ghi bảng điểm dạng CSV và Parquet bên cạnh Excel
+
+File CSV xuất từ các phần mềm quản lý điểm có thể dùng UTF-8 (có hoặc không có BOM) hoặc
+Windows-1258, phân cách bằng ',' hoặc ';' và dấu thập phân ',' theo kiểu Việt Nam. CsvSource
+dò bảng mã, dấu phân cách và dấu thập phân từ phần đầu file, cung cấp header_sample() như
+SheetStream để dò dòng header giống file Excel, rồi đọc phần dữ liệu bằng pd.read_csv.
+Các lựa chọn đã dò được lưu trong DataFrame.attrs để write_table ghi lại file đúng định
+dạng gốc (cùng bảng mã, dấu phân cách) khi lưu.
+
+Parquet cần pyarrow hoặc fastparquet; thiếu cả hai thì chỉ việc đọc/ghi Parquet báo lỗi.
+"""
+
+import codecs
+import csv
+import os
+import re
+import unicodedata
+from itertools import chain, islice
+
+import pandas as pd
+from pandas.errors import ParserError
+
+from excel_reader import SheetData
+
+try:
+    import pyarrow  # noqa: F401  (engine mặc định của pd.read_parquet)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    try:
+        import fastparquet  # noqa: F401
+        PARQUET_AVAILABLE = True
+    except ImportError:
+        PARQUET_AVAILABLE = False
+
+# Key trong DataFrame.attrs chứa định dạng file nguồn và các lựa chọn đọc CSV
+FORMAT_KEY = 'source_format'
+
+CSV_EXTENSIONS = ('.csv',)
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+WINDOWS_1258 = 'cp1258'
+# Số byte đầu file dùng để dò bảng mã và dấu phân cách
+SAMPLE_BYTES = 64 * 1024
+SNIFF_LINES = 50
+DELIMITERS = ',;\t|'
+
+_COMMA_DECIMAL = re.compile(r'^-?\d+,\d+$')
+_DOT_DECIMAL = re.compile(r'^-?\d+\.\d+$')
+
+# Dấu thanh tiếng Việt dạng ký tự kết hợp (huyền, sắc, ngã, hỏi, nặng), đều có trong Windows-1258
+_TONE_MARKS = '\u0300\u0301\u0303\u0309\u0323'
+
+
+def _split_tone(char):
+    """
+    Dạng Windows-1258 của một ký tự không có sẵn trong bảng mã, '?' nếu không ghi được
+
+    Windows-1258 chỉ có các nguyên âm có mũ/móc dựng sẵn, dấu thanh được ghi bằng ký tự kết hợp
+    (VD: 'ạ' = 'a' + U+0323), giống cách Excel lưu CSV tiếng Việt.
+    """
+    decomposed = unicodedata.normalize('NFD', char)
+    base = unicodedata.normalize('NFC', ''.join(c for c in decomposed if c not in _TONE_MARKS))
+    text = base + ''.join(c for c in decomposed if c in _TONE_MARKS)
+    try:
+        text.encode(WINDOWS_1258)
+    except UnicodeEncodeError:
+        return '?'
+    return text
+
+
+def _windows_1258_fallback(error):
+    """Bộ xử lý lỗi codec: thay ký tự không có trong Windows-1258 bằng _split_tone"""
+    return ''.join(_split_tone(char) for char in error.object[error.start:error.end]), error.end
+
+
+codecs.register_error('windows_1258_fallback', _windows_1258_fallback)
+
+
+def _tone_table():
+    """Các chữ tiếng Việt có dấu thanh không có sẵn trong Windows-1258 và dạng tách dấu của chúng"""
+    table = {}
+    for code in chain(range(0xC0, 0x1B1), range(0x1EA0, 0x1EFA)):
+        char = chr(code)
+        try:
+            char.encode(WINDOWS_1258)
+        except UnicodeEncodeError:
+            text = _split_tone(char)
+            if text != '?':
+                table[char] = text
+    return table
+
+
+_SPLIT_TONES = _tone_table()
+_TONED_CHAR = re.compile('[%s]' % ''.join(_SPLIT_TONES))
+
+
+def file_format(file_path):
+    """Định dạng file theo phần mở rộng: 'csv', 'parquet' hoặc 'excel'"""
+    ext = os.path.splitext(str(file_path))[1].lower()
+    if ext in CSV_EXTENSIONS:
+        return 'csv'
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    return 'excel'
+
+
+def sniff_encoding(sample):
+    """
+    Dò bảng mã của file CSV từ các byte đầu file
+
+    Args:
+        sample (bytes): Phần đầu file
+
+    Returns:
+        str: 'utf-8-sig' / 'utf-16' nếu có BOM, 'utf-8' nếu giải mã được, ngược lại 'cp1258'
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Mẫu có thể bị cắt giữa một ký tự nhiều byte ở cuối
+        if not (e.reason == 'unexpected end of data' and e.start >= len(sample) - 3):
+            return WINDOWS_1258
+    return 'utf-8'
+
+
+def sniff_delimiter(lines):
+    """Dấu phân cách của CSV (',', ';', tab hoặc '|'), mặc định ','"""
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return ','
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # Sniffer không quyết được (VD: có dòng tiêu đề không có dấu phân cách): lấy ký tự xuất hiện nhiều nhất
+        counts = {delimiter: sum(line.count(delimiter) for line in lines) for delimiter in DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ','
+
+
+def sniff_decimal(rows, delimiter):
+    """Dấu thập phân ',' khi các ô số trong mẫu viết kiểu '8,5' (chỉ khi dấu phân cách không phải ',')"""
+    if delimiter == ',':
+        return '.'
+    values = [value.strip() for row in rows for value in row]
+    if any(_COMMA_DECIMAL.match(value) for value in values) and not any(_DOT_DECIMAL.match(value) for value in values):
+        return ','
+    return '.'
+
+
+class CsvSource:
+    """
+    File CSV đọc theo cùng cách với SheetStream: dò header trên các dòng đầu rồi đọc dữ liệu
+
+    Args:
+        file_path (str): Đường dẫn file .csv
+
+    Attributes:
+        encoding (str): Bảng mã đã dò
+        delimiter (str): Dấu phân cách đã dò
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            sample = f.read(SAMPLE_BYTES)
+        self.encoding = sniff_encoding(sample)
+        text = sample.decode(self.encoding, errors='replace')
+        self.delimiter = sniff_delimiter(text.splitlines()[:SNIFF_LINES])
+        self._head = []
+
+    def _open(self):
+        return open(self.file_path, 'r', encoding=self.encoding, errors='replace', newline='')
+
+    def head(self, count):
+        """count dòng đầu của file dạng danh sách ô (ô trống là '')"""
+        if len(self._head) < count:
+            with self._open() as f:
+                self._head = [self._clean(row) for row in islice(csv.reader(f, delimiter=self.delimiter), count)]
+        return self._head[:count]
+
+    @staticmethod
+    def _clean(row):
+        """Chuẩn hóa Unicode (NFC) và bỏ các ô trống ở cuối dòng như excel_reader"""
+        row = [unicodedata.normalize('NFC', value.strip()) for value in row]
+        while row and row[-1] == '':
+            row.pop()
+        return row
+
+    def header_sample(self, max_rows):
+        """DataFrame không header gồm max_rows dòng đầu (ô trống là NaN) để dò dòng header"""
+        return SheetData([list(row) for row in self.head(max_rows)], []).header_sample(max_rows)
+
+    def read_frame(self, header_row=0, header_depth=1, separator='_', numeric=None):
+        """
+        Đọc dữ liệu bên dưới header thành DataFrame
+
+        Mọi ô được đọc dạng chữ để ghi lại file không làm đổi dữ liệu (VD: mã định danh "012345"
+        giữ số 0 ở đầu); chỉ các cột được numeric chọn (cột điểm) được chuyển sang số.
+
+        Args:
+            header_row (int): Dòng header đầu tiên (0-based theo file)
+            header_depth (int): Số dòng header
+            separator (str): Ký tự nối tên cột nhiều cấp
+            numeric (callable): Hàm numeric(tên cột) -> bool chọn các cột cần chuyển sang số
+
+        Returns:
+            pd.DataFrame: Dữ liệu, attrs[FORMAT_KEY] chứa các lựa chọn để ghi lại file
+        """
+        head = self.head(header_row + header_depth + SNIFF_LINES)
+        header_rows = head[header_row:header_row + header_depth]
+        if not header_rows:
+            return pd.DataFrame()
+        data_start = header_row + len(header_rows)
+        decimal = sniff_decimal(head[data_start:], self.delimiter)
+
+        try:
+            frame = pd.read_csv(self.file_path, sep=self.delimiter, encoding=self.encoding,
+                                encoding_errors='replace', header=None, index_col=False,
+                                names=_column_names(header_rows, max(len(row) for row in head), separator),
+                                skiprows=data_start, dtype=str, keep_default_na=False, na_values=[''],
+                                skipinitialspace=True)
+            for col in frame.columns:
+                frame[col] = frame[col].str.strip().str.normalize('NFC')
+        except ParserError:
+            # Có dòng dữ liệu rộng hơn header: đọc cả file để đặt tên cột thừa như pandas (Unnamed: i)
+            frame = self._read_all(header_rows, data_start, separator)
+
+        if numeric is not None:
+            for col in frame.columns:
+                if numeric(col):
+                    frame[col] = _to_number(frame[col], decimal)
+        frame.attrs[FORMAT_KEY] = {'format': 'csv', 'encoding': self.encoding,
+                                   'delimiter': self.delimiter, 'decimal': decimal}
+        return frame
+
+    def _read_all(self, header_rows, data_start, separator):
+        with self._open() as f:
+            rows = [self._clean(row) for row in csv.reader(f, delimiter=self.delimiter)]
+        # pandas lấy độ rộng lớn nhất của mọi dòng, kể cả các dòng phía trên header
+        width = max(len(row) for row in rows)
+        data = [[value or None for value in row] + [None] * (width - len(row)) for row in rows[data_start:] if row]
+        return pd.DataFrame(data, columns=_column_names(header_rows, width, separator), dtype=str)
+
+
+def _column_names(header_rows, width, separator):
+    """Tên cột giống file Excel (Unnamed: i, cột trùng tên, header nhiều cấp)"""
+    padded = [row + [''] * (width - len(row)) for row in header_rows]
+    return SheetData(padded, []).to_frame(0, len(header_rows), separator).columns.tolist()
+
+
+def _to_number(column, decimal):
+    """Chuyển cột chữ sang số; giữ nguyên nếu có ô không phải số (VD: 'Vắng') để không mất dữ liệu khi ghi lại"""
+    text = column.str.replace(',', '.', regex=False) if decimal == ',' else column
+    values = pd.to_numeric(text, errors='coerce')
+    return values if values.notna().sum() == column.notna().sum() else column
+
+
+def _require_parquet():
+    if not PARQUET_AVAILABLE:
+        raise ImportError("Đọc/ghi file Parquet cần cài pyarrow hoặc fastparquet (pip install pyarrow)")
+
+
+def read_parquet(file_path):
+    """Đọc file Parquet thành DataFrame với index 0..n-1"""
+    _require_parquet()
+    frame = pd.read_parquet(file_path)
+    if not isinstance(frame.index, pd.RangeIndex):
+        # Index có tên (VD: file ghi từ pandas với index) được giữ lại thành cột
+        frame = frame.reset_index(drop=all(name is None for name in frame.index.names))
+    frame.attrs = {FORMAT_KEY: {'format': 'parquet'}}
+    return frame
+
+
+def write_table(frame, file_path):
+    """
+    Ghi DataFrame ra file theo định dạng của phần mở rộng (.csv, .parquet, còn lại là Excel)
+
+    File CSV được ghi với bảng mã, dấu phân cách và dấu thập phân của file nguồn nếu frame được
+    đọc từ CSV (attrs[FORMAT_KEY]); mặc định UTF-8 có BOM để Excel mở đúng tiếng Việt.
+    """
+    fmt = file_format(file_path)
+    options = frame.attrs.get(FORMAT_KEY) or {}
+    if options.get('format') != fmt:
+        options = {}
+
+    if fmt == 'csv':
+        encoding = options.get('encoding', 'utf-8-sig')
+        csv_options = {'index': False, 'sep': options.get('delimiter', ','), 'decimal': options.get('decimal', '.')}
+        if encoding == WINDOWS_1258:
+            # Tách dấu thanh bằng một lần re.sub trên cả file, nhanh hơn nhiều so với để codec
+            # gọi bộ xử lý lỗi cho từng chữ có dấu
+            text = _TONED_CHAR.sub(lambda match: _SPLIT_TONES[match.group()], frame.to_csv(**csv_options))
+            with open(file_path, 'wb') as f:
+                f.write(text.encode(WINDOWS_1258, 'windows_1258_fallback'))
+        else:
+            frame.to_csv(file_path, encoding=encoding, **csv_options)
+    elif fmt == 'parquet':
+        _require_parquet()
+        # attrs (layout của sheet nguồn...) không có nghĩa với file Parquet mới
+        plain = frame.copy(deep=False)
+        plain.attrs = {}
+        plain.to_parquet(file_path, index=False)
+    else:
+        frame.to_excel(file_path, index=False)
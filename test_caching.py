@@ -2,6 +2,7 @@
 
 import pytest
 import pandas as pd
+import numpy as np
 import os
 import sys
 import json
@@ -15,7 +16,7 @@ class TestConfigCache:
     
     def test_config_cache_loads_correctly(self, tmp_path):
         """Test that ConfigCache loads config file"""
-        from import_score import ConfigCache
+        from caching import ConfigCache
         
         # Create test config
         config_data = {"test": "value"}
@@ -30,7 +31,7 @@ class TestConfigCache:
     
     def test_config_cache_returns_same_instance(self, tmp_path):
         """Test that ConfigCache returns cached instance on second call"""
-        from import_score import ConfigCache
+        from caching import ConfigCache
         
         config_data = {"test": "value"}
         config_file = tmp_path / "test_config.json"
@@ -46,18 +47,58 @@ class TestConfigCache:
     
     def test_config_cache_invalidation(self):
         """Test that cache can be invalidated"""
-        from import_score import ConfigCache
+        from caching import ConfigCache
         
         ConfigCache.invalidate()
         assert ConfigCache._cache is None
 
+    def test_config_cache_reloads_on_mtime_change(self, tmp_path):
+        """Test that an external edit to the file is picked up"""
+        from caching import ConfigCache
+
+        config_file = tmp_path / "test_config.json"
+        config_file.write_text(json.dumps({"test": "old"}), encoding='utf-8')
+        ConfigCache.invalidate()
+        assert ConfigCache.get_config(str(config_file))['test'] == 'old'
+
+        config_file.write_text(json.dumps({"test": "new"}), encoding='utf-8')
+        os.utime(config_file, (os.path.getmtime(config_file) + 10,) * 2)
+        assert ConfigCache.get_config(str(config_file))['test'] == 'new'
+
+    def test_write_config_is_atomic_and_updates_cache(self, tmp_path):
+        """Test that writing replaces the file, leaves no temp files and keeps the cached instance"""
+        from caching import ConfigCache
+
+        config_file = tmp_path / "app_config.json"
+        config_file.write_text('{"test": "old"}', encoding='utf-8')
+        config_data = {"test": "Tên Học Sinh"}
+
+        ConfigCache.write_config(str(config_file), config_data)
+
+        assert json.loads(config_file.read_text(encoding='utf-8')) == config_data
+        assert os.listdir(tmp_path) == ["app_config.json"]
+        assert ConfigCache.get_config(str(config_file)) is config_data
+
+    def test_put_keeps_unsaved_config_in_memory(self, tmp_path):
+        """Test that pending changes are visible before the debounced write"""
+        from caching import ConfigCache
+
+        config_file = tmp_path / "app_config.json"
+        config_file.write_text('{"test": "value"}', encoding='utf-8')
+        config = ConfigCache.get_config(str(config_file))
+        edited = dict(config, test="edited")
+
+        ConfigCache.put(edited)
+        assert ConfigCache.get_config(str(config_file)) is edited
+        ConfigCache.invalidate()
+
 
 class TestDataFrameCache:
     """Test DataFrameCache functionality"""
     
     def test_dataframe_cache_stores_and_retrieves(self, tmp_path, sample_student_data):
         """Test storing and retrieving DataFrame from cache"""
-        from import_score import DataFrameCache
+        from caching import DataFrameCache
         
         cache = DataFrameCache(max_size=2)
         file_path = tmp_path / "test.xlsx"
@@ -74,7 +115,7 @@ class TestDataFrameCache:
     
     def test_dataframe_cache_max_size(self, tmp_path, sample_student_data):
         """Test that cache respects max_size"""
-        from import_score import DataFrameCache
+        from caching import DataFrameCache
         
         cache = DataFrameCache(max_size=2)
         
@@ -91,7 +132,7 @@ class TestDataFrameCache:
     
     def test_dataframe_cache_clear(self, tmp_path, sample_student_data):
         """Test cache clearing"""
-        from import_score import DataFrameCache
+        from caching import DataFrameCache
         
         cache = DataFrameCache()
         file_path = tmp_path / "test.xlsx"
@@ -102,6 +143,164 @@ class TestDataFrameCache:
         
         cached_df = cache.get(str(file_path))
         assert cached_df is None
+    
+    def test_dataframe_cache_invalidate(self, tmp_path, sample_student_data):
+        """Test that invalidating one file drops only that file's entries"""
+        from caching import DataFrameCache
+        
+        cache = DataFrameCache()
+        paths = [str(tmp_path / "lop.xlsx"), str(tmp_path / "lop.xlsx_2.xlsx")]
+        for path in paths:
+            sample_student_data.to_excel(path, index=False)
+            cache.set(path, sample_student_data)
+        
+        cache.invalidate(paths[0])
+        assert cache.get(paths[0]) is None
+        assert cache.get(paths[1]) is not None
+        assert cache.stats()['bytes'] == int(sample_student_data.memory_usage(deep=True).sum())
+
+
+    def test_dataframe_cache_byte_budget(self, tmp_path, sample_student_data):
+        """Test that entries are evicted by memory usage, not only by count"""
+        from caching import DataFrameCache
+        
+        size = int(sample_student_data.memory_usage(deep=True).sum())
+        cache = DataFrameCache(max_size=10, max_bytes=size * 2)
+        paths = []
+        for i in range(3):
+            file_path = tmp_path / f"test_{i}.xlsx"
+            file_path.write_bytes(b'')
+            paths.append(str(file_path))
+            cache.set(paths[-1], sample_student_data)
+        
+        assert cache.get(paths[0]) is None
+        assert cache.get(paths[2]) is not None
+        assert cache.stats() == {'entries': 2, 'bytes': size * 2, 'max_bytes': size * 2,
+                                 'hits': 1, 'misses': 1, 'evictions': 1}
+        
+        cache.resize(max_bytes=size)
+        assert cache.stats()['entries'] == 1
+    
+    def test_dataframe_cache_reads_without_copying(self, tmp_path, sample_student_data):
+        """Test that cache hits share memory under Copy-on-Write but edits do not leak back"""
+        from caching import DataFrameCache, copy_on_write_enabled
+        
+        if not copy_on_write_enabled():
+            pytest.skip("Copy-on-Write is not enabled in this pandas")
+        
+        cache = DataFrameCache()
+        file_path = tmp_path / "test.xlsx"
+        file_path.write_bytes(b'')
+        cache.set(str(file_path), sample_student_data)
+        
+        first = cache.get(str(file_path))
+        assert np.shares_memory(first['ĐĐGgk'].to_numpy(), sample_student_data['ĐĐGgk'].to_numpy())
+        
+        first.iloc[0, first.columns.get_loc('ĐĐGgk')] = 0.0
+        assert cache.get(str(file_path))['ĐĐGgk'].iloc[0] == 8.5
+
+
+class TestDiskFrameCache:
+    """Test DiskFrameCache functionality"""
+    
+    @pytest.fixture
+    def excel_config(self):
+        return {
+            'columns': {'name': 'Tên Học Sinh', 'exam_code': 'Mã đề', 'score': 'Điểm'},
+            'excel_reading': {'header_detection': {'max_search_rows': 50}, 'performance': {}}
+        }
+    
+    def test_roundtrip_keeps_dtypes_and_attrs(self, tmp_path, sample_student_data):
+        """Test that a stored frame survives a new cache instance (app restart)"""
+        from caching import DiskFrameCache
+        
+        df = sample_student_data.copy()
+        df['Điểm'] = pd.Series([8.5, None, 7.0, None, 9.25])
+        df.attrs['source_layout'] = {'header_last_row': np.int64(1), 'data_start_row': 2}
+        DiskFrameCache(str(tmp_path)).set('abc', df)
+        
+        restored = DiskFrameCache(str(tmp_path)).get('abc')
+        pd.testing.assert_frame_equal(restored, df)
+        assert restored.attrs['source_layout'] == {'header_last_row': 1, 'data_start_row': 2}
+    
+    def test_key_follows_content_and_config(self, tmp_path, sample_excel_file_normal, excel_config):
+        """Test that the key ignores the path but changes with content and reading settings"""
+        from caching import DiskFrameCache
+        import copy
+        import shutil
+        
+        key = DiskFrameCache.make_key(sample_excel_file_normal, excel_config)
+        moved = str(tmp_path / "moved.xlsx")
+        shutil.copy(sample_excel_file_normal, moved)
+        assert DiskFrameCache.make_key(moved, excel_config) == key
+        
+        changed = copy.deepcopy(excel_config)
+        changed['excel_reading']['header_detection']['max_search_rows'] = 10
+        assert DiskFrameCache.make_key(moved, changed) != key
+        
+        with open(moved, 'ab') as f:
+            f.write(b'x')
+        assert DiskFrameCache.make_key(moved, excel_config) != key
+    
+    def test_evicts_least_recently_used_over_budget(self, tmp_path, sample_student_data):
+        """Test that the oldest unused entries are removed once the size budget is exceeded"""
+        from caching import DiskFrameCache
+        
+        cache = DiskFrameCache(str(tmp_path))
+        cache.set('a', sample_student_data)
+        cache.max_bytes = cache.total_bytes() * 2
+        cache.set('b', sample_student_data)
+        cache.get('a')
+        cache.set('c', sample_student_data)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert len(os.listdir(tmp_path)) == 3  # 2 mục + index.json
+    
+    def test_corrupt_entry_is_dropped(self, tmp_path, sample_student_data):
+        """Test that an unreadable entry is treated as a miss and removed"""
+        from caching import DiskFrameCache
+        
+        cache = DiskFrameCache(str(tmp_path))
+        cache.set('a', sample_student_data)
+        for name in os.listdir(tmp_path):
+            if name != DiskFrameCache.INDEX_FILE:
+                (tmp_path / name).write_bytes(b'hong')
+        
+        assert cache.get('a') is None
+        assert os.listdir(tmp_path) == [DiskFrameCache.INDEX_FILE]
+
+
+class TestMergedRangesCache:
+    """Test MergedRangesCache functionality"""
+    
+    def test_roundtrip_by_file_content(self, tmp_path, sample_excel_file_normal):
+        """Test that ranges survive a new cache instance and follow the file content"""
+        from caching import MergedRangesCache
+        
+        key = MergedRangesCache.make_key(sample_excel_file_normal, 0, 50)
+        MergedRangesCache(str(tmp_path)).set(key, [(1, 1, 1, 5)])
+        assert MergedRangesCache(str(tmp_path)).get(key) == [(1, 1, 1, 5)]
+        
+        with open(sample_excel_file_normal, 'ab') as f:
+            f.write(b'x')
+        assert MergedRangesCache.make_key(sample_excel_file_normal, 0, 50) != key
+    
+    def test_keeps_most_recent_entries(self, tmp_path):
+        """Test that the oldest entries are dropped over max_entries"""
+        from caching import MergedRangesCache
+        
+        cache = MergedRangesCache(str(tmp_path), max_entries=2)
+        cache.set('a', [])
+        cache.set('b', [(1, 1, 2, 1)])
+        cache.get('a')
+        cache.set('c', [])
+        
+        assert cache.get('b') is None
+        assert cache.get('a') == []
+        cache.clear()
+        assert cache.get('c') is None
 
 
 class TestSearchCache:
@@ -109,14 +308,14 @@ class TestSearchCache:
     
     def test_search_cache_stores_results(self, sample_student_data):
         """Test storing search results"""
-        from import_score import SearchCache
+        from caching import SearchCache
         
         cache = SearchCache()
-        cache.clear_if_data_changed(sample_student_data)
+        cache.clear_if_data_changed(1)
         
         # Store search result
         query = "nguyễn"
-        result = sample_student_data[sample_student_data['Họ và tên'].str.contains('Nguyễn', case=False, na=False)]
+        result = sample_student_data.index[sample_student_data['Họ và tên'].str.contains('Nguyễn', case=False, na=False)]
         cache.set(query, result)
         
         # Retrieve
@@ -126,20 +325,20 @@ class TestSearchCache:
     
     def test_search_cache_clears_on_data_change(self, sample_student_data):
         """Test that cache clears when data changes"""
-        from import_score import SearchCache
+        from caching import SearchCache
         
         cache = SearchCache()
-        cache.clear_if_data_changed(sample_student_data)
+        cache.clear_if_data_changed(1)
         
         # Store result
-        cache.set("test", sample_student_data.head(2))
+        cache.set("test", [0, 1])
         
-        # Change data
-        new_df = sample_student_data.copy()
-        new_df.loc[0, 'Họ và tên'] = 'Changed'
+        # Same version keeps the result
+        cache.clear_if_data_changed(1)
+        assert cache.get("test") == [0, 1]
         
-        # Cache should clear
-        cache.clear_if_data_changed(new_df)
+        # Cache should clear when the data version changes
+        cache.clear_if_data_changed(2)
         result = cache.get("test")
         assert result is None
 
@@ -149,10 +348,10 @@ class TestStatsCache:
     
     def test_stats_cache_calculates_correctly(self, sample_student_data):
         """Test that stats are calculated correctly"""
-        from import_score import StatsCache
+        from caching import StatsCache
         
         cache = StatsCache()
-        stats = cache.get_stats(sample_student_data)
+        stats = cache.get_stats(sample_student_data, 1)
         
         assert stats['total'] == len(sample_student_data)
         assert 'scored' in stats
@@ -162,30 +361,109 @@ class TestStatsCache:
     
     def test_stats_cache_returns_cached_result(self, sample_student_data):
         """Test that stats are cached"""
-        from import_score import StatsCache
+        from caching import StatsCache
         
         cache = StatsCache()
-        stats1 = cache.get_stats(sample_student_data)
-        stats2 = cache.get_stats(sample_student_data)
+        stats1 = cache.get_stats(sample_student_data, 1)
+        stats2 = cache.get_stats(sample_student_data, 1)
         
         # Should return same cached result
         assert stats1 == stats2
     
     def test_stats_cache_recalculates_on_change(self, sample_student_data):
         """Test that stats recalculate when data changes"""
-        from import_score import StatsCache
+        from caching import StatsCache
         
         cache = StatsCache()
-        stats1 = cache.get_stats(sample_student_data)
+        stats1 = cache.get_stats(sample_student_data, 1)
         
         # Change data
         new_df = sample_student_data.copy()
         new_df = new_df.head(3)  # Reduce rows
         
-        stats2 = cache.get_stats(new_df)
+        stats2 = cache.get_stats(new_df, 2)
         
         assert stats1['total'] != stats2['total']
 
 
+class TestCacheVersioning:
+    """Test that caches keyed on DataModel.version never serve stale results"""
+    
+    @pytest.fixture
+    def model(self):
+        from data_model import DataModel
+        
+        model = DataModel()
+        model.replace(pd.DataFrame({
+            'Họ và tên': ['Nguyễn Văn A', 'Trần Thị B', 'Lê Văn C'],
+            'Điểm': [8.0, 6.0, None]
+        }))
+        return model
+    
+    def edit_score(self, model, position, value):
+        """Edit a score the way the app does: new frame, then notify the model"""
+        new_df = model.df.copy()
+        new_df.iloc[position, new_df.columns.get_loc('Điểm')] = value
+        model.update(new_df)
+    
+    def test_version_increases_on_every_mutation(self, model):
+        """Test that score entry, add, undo and restore all bump the version"""
+        versions = [model.version]
+        self.edit_score(model, 2, 9.0)
+        versions.append(model.version)
+        model.replace(pd.concat([model.df, pd.DataFrame({'Họ và tên': ['Phạm Thị D']})], ignore_index=True))
+        versions.append(model.version)
+        model.replace(model.df.head(3).copy())
+        versions.append(model.version)
+        
+        assert versions == sorted(set(versions))
+    
+    def test_stats_see_edit_outside_first_row(self, model):
+        """Test the case the old len/iloc[0] hash missed: editing a later row"""
+        from caching import StatsCache
+        
+        cache = StatsCache()
+        before = cache.get_stats(model.df, model.version)
+        self.edit_score(model, 2, 10.0)
+        after = cache.get_stats(model.df, model.version)
+        
+        assert before['scored'] == 2
+        assert after['scored'] == 3
+        assert after['max'] == 10.0
+    
+    def test_versioned_cache_recomputes_after_edit(self, model):
+        """Test that extremes/chart data are recomputed once per version"""
+        from caching import VersionedCache
+        
+        cache = VersionedCache()
+        calls = []
+        
+        def lowest():
+            calls.append(model.version)
+            return model.df['Điểm'].min()
+        
+        assert cache.get('min', model.version, lowest) == 6.0
+        assert cache.get('min', model.version, lowest) == 6.0
+        self.edit_score(model, 1, 2.5)
+        assert cache.get('min', model.version, lowest) == 2.5
+        assert len(calls) == 2
+    
+    def test_search_cache_follows_structure_version(self, model):
+        """Test that name search results survive score edits but not added rows"""
+        from caching import SearchCache
+        
+        cache = SearchCache()
+        cache.clear_if_data_changed(model.structure_version)
+        cache.set('van', [0, 2])
+        
+        self.edit_score(model, 0, 5.0)
+        cache.clear_if_data_changed(model.structure_version)
+        assert cache.get('van') == [0, 2]
+        
+        model.replace(pd.concat([model.df, pd.DataFrame({'Họ và tên': ['Đỗ Văn E']})], ignore_index=True))
+        cache.clear_if_data_changed(model.structure_version)
+        assert cache.get('van') is None
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,194 @@
+# Tests for cached column resolution
+
+import pytest
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import unicodedata
+
+from column_resolver import ColumnMatcher, ColumnResolver
+
+
+@pytest.fixture
+def app_config():
+    """Configuration shipped with the application"""
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_config.json')
+    with open(config_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class TestColumnResolver:
+    """Test ColumnResolver functionality"""
+
+    def test_direct_and_pattern_matches(self, sample_config):
+        """Test case-insensitive direct match, config patterns and the variation fallback"""
+        resolver = ColumnResolver()
+        columns = ['STT', 'Họ và tên', 'ĐĐGtx 1', 'Mã đề', 'Điểm số']
+
+        assert resolver.resolve(columns, 'mã ĐỀ', sample_config) == 'Mã đề'
+        assert resolver.resolve(columns, 'Tên học sinh', sample_config) == 'Họ và tên'
+        assert resolver.resolve(columns, 'ĐĐGtx', sample_config) == 'ĐĐGtx 1'
+        assert resolver.resolve(columns, 'Điểm', sample_config) == 'Điểm số'
+        assert resolver.resolve(['STT', 'Ghi chú'], 'Điểm', sample_config) is None
+
+    def test_mapping_uses_configured_names(self, sample_config):
+        """Test the logical → physical mapping for config['columns']"""
+        resolver = ColumnResolver()
+        columns = ['Họ và tên', 'Mã đề', 'Điểm']
+
+        assert resolver.mapping(columns, sample_config) == {
+            'name': 'Họ và tên', 'exam_code': 'Mã đề', 'score': 'Điểm'}
+        assert resolver.mapping(['Họ và tên'], sample_config) == {'name': 'Họ và tên'}
+
+    def test_results_are_cached_per_schema(self, sample_config):
+        """Test that a schema is resolved once and re-resolved after invalidate()"""
+        resolver = ColumnResolver()
+        columns = ['Họ và tên', 'Điểm']
+        resolver.resolve(columns, 'Tên học sinh', sample_config)
+
+        sample_config['excel_reading']['column_patterns']['student_info']['name']['patterns'] = ['Học sinh']
+        assert resolver.resolve(columns, 'Tên học sinh', sample_config) == 'Họ và tên'
+
+        resolver.invalidate()
+        assert resolver.resolve(['Học sinh lớp 10', 'Điểm'], 'Học sinh', sample_config) == 'Học sinh lớp 10'
+
+    def test_invalid_regex_is_ignored(self, sample_config):
+        """Test that a broken regex in the config does not stop pattern matching"""
+        sample_config['excel_reading']['column_patterns']['student_info']['name']['regex'] = '(['
+        resolver = ColumnResolver()
+
+        assert resolver.resolve(['Họ và tên HS'], 'Họ và tên', sample_config) == 'Họ và tên HS'
+
+    def test_app_config_patterns(self, app_config):
+        """Test resolution with the patterns shipped in app_config.json"""
+        resolver = ColumnResolver()
+        columns = ['STT', 'Mã định danh', 'Họ tên', 'Ngày sinh', 'ĐĐGtx1', 'ĐĐGck', 'Điểm']
+
+        assert resolver.resolve(columns, 'Họ và tên', app_config) == 'Họ tên'
+        assert resolver.resolve(columns, 'Mã HS', app_config) == 'Mã định danh'
+        assert resolver.resolve(columns, 'Điểm', app_config) == 'Điểm'
+
+
+
+class TestColumnMatcher:
+    """Test the compiled matcher shared by column lookup and header detection"""
+
+    def test_match_reports_field_and_sub_column(self, app_config):
+        """Test field order, score metadata and the sub-column number from the regex"""
+        matcher = ColumnMatcher(app_config)
+
+        assert matcher.match('Họ tên')['field'] == 'name'
+        assert matcher.match('Mã HS')['field'] == 'student_id'
+        tx = matcher.match('TX 2')
+        assert tx['score_type'] == 'ddgtx' and tx['matched_pattern'] == 'TX'
+        assert matcher.match('ĐĐGtx_3')['has_sub_columns'] is True
+        assert matcher.match('Ghi chú') is None
+        assert matcher.match('') is None
+
+    def test_input_is_normalised_to_nfc(self, app_config):
+        """Test that decomposed (NFD) headers from some exporters still match"""
+        matcher = ColumnMatcher(app_config)
+        decomposed = unicodedata.normalize('NFD', 'HỌ VÀ TÊN')
+
+        assert matcher.match(decomposed)['field'] == 'name'
+        assert ColumnResolver().resolve([decomposed, 'Điểm'], 'Họ và tên', app_config) == decomposed
+
+    def test_header_row_scores_highest(self, app_config):
+        """Test that a whole sniff window is scored in one call and the header row wins"""
+        matcher = ColumnMatcher(app_config)
+        window = np.array([
+            ['TRƯỜNG THPT KHƯƠNG ĐÌNH', np.nan, np.nan, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, np.nan, np.nan],
+            ['STT', 'Họ và tên', 'Giới tính', 'ĐĐGtx1', 'ĐĐGck'],
+            [1, 'Nguyễn Văn A', 'Nam', 8.5, 7],
+        ], dtype=object)
+
+        scores = matcher.score_rows(window)
+        assert scores[1] == 0
+        assert max(range(len(scores)), key=scores.__getitem__) == 2
+        assert matcher.score_row(['STT', None, 'Họ và tên']) > matcher.score_row([1, None, 'Nguyễn Văn A'])
+        assert matcher.classify_row(window[2]) == ['stt', 'name', 'gender', 'ddgtx', 'ddgck']
+
+    def test_nested_keywords_score_like_previous_scorer(self):
+        """Test parity with the per-keyword scorer: nested and overlapping keywords each count"""
+        from column_resolver import HEADER_KEYWORDS
+
+        def previous_score(row):
+            row_str = ' '.join(str(val).lower() for val in row if val is not None)
+            score = sum(weight for keyword, weight in HEADER_KEYWORDS.items() if keyword in row_str)
+            return score + sum(1 for val in row if val is not None and str(val).strip()) * 0.5
+
+        matcher = ColumnMatcher({})
+        rows = [
+            ['STT', 'Họ và tên', 'Mã số tt', 'ĐĐGtx 1', 'ĐĐGgk', 'ĐĐGck', 'ĐTB'],
+            ['Tên học sinh', 'Lớp', 'Khối', 'Score'],
+            ['DANH SÁCH HỌC SINH', None, None],
+            [1, 'Nguyễn Văn A', 8.5, None],
+        ]
+        for row in rows:
+            assert matcher.score_row(row) == previous_score(row)
+        assert matcher.score_row(['ĐĐGtx']) == 2 * 2 + 0.5  # 'đđgtx' and 'tx'
+
+    def test_resolver_recompiles_after_invalidate(self, sample_config):
+        """Test that the shared matcher follows configuration changes"""
+        resolver = ColumnResolver()
+
+
+
+
+@pytest.fixture
+def two_level_window():
+    """Title banner, a two-row header (ĐĐGtx split into TX 1-3), then students"""
+    nan = np.nan
+    return np.array([
+        ['BẢNG ĐIỂM LỚP 10A1', nan, nan, nan, nan, nan, nan],
+        [nan, nan, nan, nan, nan, nan, nan],
+        ['STT', 'Họ và tên', 'Giới tính', 'ĐĐGtx', nan, nan, 'ĐĐGck'],
+        [nan, nan, nan, 1, 2, 3, nan],
+        [1, 'Nguyễn Văn A', 'Nam', 8, 7, 9, 8.5],
+        [2, 'Trần Thị B', 'Nữ', 6, 7.5, 8, 7],
+    ], dtype=object)
+
+
+class TestHeaderDetection:
+    """Test header row, depth and confidence detection over the sniff window"""
+
+    MERGES = [(1, 1, 1, 7), (3, 1, 4, 1), (3, 2, 4, 2), (3, 3, 4, 3), (3, 4, 3, 6), (3, 7, 4, 7)]
+
+    def test_two_level_header_from_merges(self, app_config, two_level_window):
+        """Test that vertical/horizontal header merges give the header depth"""
+        detection = ColumnMatcher(app_config).detect_header(two_level_window, merged_ranges=self.MERGES)
+
+        assert detection['header_row'] == 2
+        assert detection['header_depth'] == 2
+        assert detection['confidence'] == 1.0
+        assert len(detection['scores']) == len(two_level_window)
+
+    def test_two_level_header_without_merge_info(self, app_config, two_level_window):
+        """Test the content-only rule used when streaming (merges not known yet)"""
+        detection = ColumnMatcher(app_config).detect_header(two_level_window)
+        assert (detection['header_row'], detection['header_depth']) == (2, 2)
+
+    def test_title_banner_does_not_deepen_single_header(self, app_config, two_level_window):
+        """Test that a merged title banner no longer turns data rows into header rows"""
+        single = np.delete(two_level_window, 3, axis=0)
+        detection = ColumnMatcher(app_config).detect_header(single, merged_ranges=[(1, 1, 1, 7)])
+
+        assert (detection['header_row'], detection['header_depth']) == (2, 1)
+        assert ColumnMatcher(app_config).detect_header(single, multi_level=False)['header_depth'] == 1
+
+    def test_confidence_reflects_recognised_columns(self, app_config):
+        """Test that a header with few recognised columns gets a low confidence"""
+        window = np.array([['Họ và tên', 'Ghi chú'], ['Nguyễn Văn A', 'x']], dtype=object)
+        detection = ColumnMatcher(app_config).detect_header(window, min_columns_match=4)
+
+        assert detection['header_row'] == 0
+        assert 0 < detection['confidence'] < 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,237 @@
+# Tests for student row lookup and name search indexes
+
+import pytest
+import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_model import DataModel, RowIndex, NameSearchIndex, UndoManager, fold_text
+
+
+@pytest.fixture
+def duplicate_names_df():
+    """DataFrame with two students sharing the same name"""
+    return pd.DataFrame({
+        'Mã định danh': ['HS01', 'HS02', 'HS03'],
+        'Họ và tên': ['Nguyễn Văn An', 'Trần Thị Bình', 'Nguyễn Văn An'],
+        'Điểm': [8.0, None, 6.5]
+    })
+
+
+class TestRowIndex:
+    """Test RowIndex functionality"""
+
+    def test_name_lookup_returns_all_positions(self, duplicate_names_df):
+        """Test that duplicate names map to every matching row"""
+        index = RowIndex()
+        index.rebuild(duplicate_names_df, 'Họ và tên', 'Mã định danh')
+
+        assert index.positions_for_name('Nguyễn Văn An') == [0, 2]
+        assert index.positions_for_name(' Trần Thị Bình ') == [1]
+        assert index.positions_for_name('Lê Văn C') == []
+        assert index.position_for_id('HS03') == 2
+
+    def test_tree_item_resolves_to_selected_duplicate(self, duplicate_names_df):
+        """Test that the selected treeview item wins over the first name match"""
+        index = RowIndex()
+        index.rebuild(duplicate_names_df, 'Họ và tên')
+        index.bind_item('I003', 2)
+
+        assert index.position_for_item('I003', fallback_name='Nguyễn Văn An') == 2
+        assert index.position_for_item('I999', fallback_name='Nguyễn Văn An') == 0
+        assert index.position_for_item('I999') is None
+
+    def test_append_row_keeps_index_in_sync(self, duplicate_names_df):
+        """Test that adding a student updates the index without a rebuild"""
+        index = RowIndex()
+        index.rebuild(duplicate_names_df, 'Họ và tên')
+
+        assert not index.contains_name('Phạm Thị D')
+        assert index.append_row('Phạm Thị D') == 3
+        assert index.contains_name('Phạm Thị D')
+        assert index.row_count == 4
+
+    def test_rebuild_clears_stale_items(self, duplicate_names_df):
+        """Test that rebuilding drops item mappings from the previous data"""
+        index = RowIndex()
+        index.rebuild(duplicate_names_df, 'Họ và tên')
+        index.bind_item('I001', 2)
+
+        index.rebuild(duplicate_names_df.head(1), 'Họ và tên')
+        assert index.position_for_item('I001') is None
+
+        index.rebuild(None, None)
+        assert index.row_count == 0
+
+
+class TestNameSearchIndex:
+    """Test NameSearchIndex functionality"""
+
+    def test_fold_text_strips_vietnamese_diacritics(self):
+        """Test accent folding including đ"""
+        assert fold_text('Nguyễn  Văn Đức') == 'nguyen van duc'
+        assert fold_text(None) == ''
+
+    def test_find_is_diacritic_insensitive(self, sample_student_data):
+        """Test that unaccented queries match accented names"""
+        index = NameSearchIndex()
+        index.rebuild(sample_student_data['Họ và tên'])
+
+        expected = [i for i, name in enumerate(sample_student_data['Họ và tên'])
+                    if 'nguyễn' in name.lower()]
+        assert expected
+        assert index.find('nguyen') == expected
+        assert index.find('NGUYỄN') == expected
+        assert index.find('') == list(range(len(sample_student_data)))
+        assert index.find('zzzz') == []
+
+    def test_find_matches_substring_search(self, sample_student_data):
+        """Test that results agree with a plain substring scan for short and long queries"""
+        names = sample_student_data['Họ và tên'].tolist()
+        index = NameSearchIndex()
+        index.rebuild(names)
+
+        for query in ['v', 'an', 'văn', 'thị b', 'nguyen van']:
+            expected = [i for i, name in enumerate(names) if fold_text(query) in fold_text(name)]
+            assert index.find(query) == expected
+
+    def test_incremental_updates(self):
+        """Test appending and renaming rows without a rebuild"""
+        index = NameSearchIndex()
+        index.rebuild(['Trần Thị Bình', 'Lê Văn Cường'])
+
+        index.append('Nguyễn Văn An')
+        assert index.find('nguyen') == [2]
+
+        index.update(0, 'Phạm Thị Dung')
+        assert index.find('binh') == []
+        assert index.find('dung') == [0]
+
+    def test_row_index_find_after_append(self, duplicate_names_df):
+        """Test that RowIndex keeps its name search in sync with added rows"""
+        index = RowIndex()
+        index.rebuild(duplicate_names_df, 'Họ và tên')
+        index.append_row('Đỗ Thị Ánh')
+
+        assert index.find('nguyen van an') == [0, 2]
+        assert index.find('do thi anh') == [3]
+
+        index.update_name(3, 'Nguyễn Văn An')
+        assert index.positions_for_name('Nguyễn Văn An') == [0, 2, 3]
+        assert index.find('anh') == []
+
+
+class TestDataModel:
+    """Test DataModel functionality"""
+
+    def test_replace_bumps_both_versions(self, duplicate_names_df):
+        """Test that replacing the frame is a structural change"""
+        model = DataModel()
+        model.replace(duplicate_names_df)
+
+        assert model.df is duplicate_names_df
+        assert (model.version, model.structure_version) == (1, 1)
+
+    def test_update_keeps_structure_version(self, duplicate_names_df):
+        """Test that cell edits bump only the data version"""
+        model = DataModel()
+        model.replace(duplicate_names_df)
+        edited = duplicate_names_df.copy()
+        edited.loc[2, 'Điểm'] = 9.0
+
+        assert model.update(edited) == 2
+        assert model.df is edited
+        assert model.structure_version == 1
+
+    def test_listeners_receive_changed_cells(self, duplicate_names_df):
+        """Test change notifications: cell lists for edits, None for replacements"""
+        model = DataModel()
+        received = []
+        model.add_listener(lambda source, cells: received.append((source, cells)))
+
+        model.replace(duplicate_names_df)
+        model.update(duplicate_names_df, cells=[(1, 'Điểm', None, 7.5)])
+        model.update(duplicate_names_df)
+
+        assert received == [(model, None), (model, [(1, 'Điểm', None, 7.5)]), (model, None)]
+
+    def test_undo_changes_run_backwards(self):
+        """Test that undoing reports old and new swapped, in reverse order"""
+        manager = UndoManager()
+        entry = manager.record("Nhập điểm", cells=[(0, 'Điểm', None, 8.0), (0, 'Mã đề', '701', '702')])
+
+        assert entry.changes(redo=True) == [(0, 'Điểm', None, 8.0), (0, 'Mã đề', '701', '702')]
+        assert entry.changes() == [(0, 'Mã đề', '702', '701'), (0, 'Điểm', 8.0, None)]
+
+
+class TestUndoManager:
+    """Test delta-based UndoManager functionality"""
+
+    def test_undo_redo_cell_edit_in_place(self, duplicate_names_df):
+        """Test that undo/redo patch the same frame instead of copying it"""
+        manager = UndoManager()
+        df = duplicate_names_df
+        df.loc[1, 'Điểm'] = 7.5
+        manager.record("Nhập điểm cho 'Trần Thị Bình'", cells=[(1, 'Điểm', None, 7.5)])
+
+        entry, action = manager.undo()
+        assert action == "Nhập điểm cho 'Trần Thị Bình'"
+        assert entry.revert(df) is df
+        assert pd.isna(df.loc[1, 'Điểm'])
+        assert entry.rows == [1] and entry.columns == ['Điểm']
+
+        entry, _ = manager.redo()
+        entry.reapply(df)
+        assert df.loc[1, 'Điểm'] == 7.5
+        assert manager.get_undo_info() == "Nhập điểm cho 'Trần Thị Bình'"
+        assert manager.get_redo_info() is None
+
+    def test_undo_added_row(self, duplicate_names_df):
+        """Test undoing and redoing an appended student"""
+        manager = UndoManager()
+        new_row = pd.DataFrame({'Họ và tên': ['Phạm Thị D'], 'Điểm': [None]})
+        df = pd.concat([duplicate_names_df, new_row], ignore_index=True)
+        manager.record("Thêm học sinh 'Phạm Thị D'", added_rows=new_row)
+
+        entry, _ = manager.undo()
+        assert entry.structural
+        df = entry.revert(df)
+        assert len(df) == 3
+
+        entry, _ = manager.redo()
+        df = entry.reapply(df)
+        assert df['Họ và tên'].tolist()[-1] == 'Phạm Thị D'
+
+    def test_new_record_clears_redo(self):
+        """Test that a new edit discards the redo stack"""
+        manager = UndoManager()
+        manager.record('A', cells=[(0, 'Điểm', 1.0, 2.0)])
+        manager.undo()
+        assert manager.can_redo()
+        manager.record('B', cells=[(0, 'Điểm', 1.0, 3.0)])
+        assert not manager.can_redo()
+        assert manager.record('Không đổi gì') is None
+
+    def test_history_respects_memory_budget(self):
+        """Test that the oldest steps are dropped once the byte budget is exceeded"""
+        manager = UndoManager(max_history=1000, max_bytes=2000)
+        for i in range(100):
+            manager.record(f'Bước {i}', cells=[(i, 'Điểm', None, float(i))])
+
+        assert manager.memory_usage <= 2000
+        assert 0 < len(manager.undo_stack) < 100
+        assert manager.get_undo_info() == 'Bước 99'
+
+    def test_history_respects_max_steps(self):
+        """Test the step limit"""
+        manager = UndoManager(max_history=3)
+        for i in range(5):
+            manager.record(f'Bước {i}', cells=[(0, 'Điểm', None, float(i))])
+
+        assert [entry.action for entry in manager.undo_stack] == ['Bước 2', 'Bước 3', 'Bước 4']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
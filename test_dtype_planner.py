@@ -0,0 +1,178 @@
+# Tests for the compact dtype planner
+
+import pytest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dtype_planner import (plan_dtypes, apply_dtypes, set_value, memory_bytes, arrow_string_dtype,
+                           set_score, set_exam_code, sort_key)
+
+
+@pytest.fixture
+def grade_book():
+    """Normalised grade book: string exam codes, numeric scores"""
+    rows = 200
+    return pd.DataFrame({
+        'Họ và tên': [f'Học sinh {i}' for i in range(rows)],
+        'Giới tính': ['Nam' if i % 2 else 'Nữ' for i in range(rows)],
+        'Mã đề': [str(701 + i % 4) if i % 10 else '' for i in range(rows)],
+        'ĐĐGtx_1': [5 + i % 6 for i in range(rows)],
+        'Điểm': [np.nan if i % 7 == 0 else (i % 41) / 4 for i in range(rows)],
+    })
+
+
+def compact(df):
+    plan = plan_dtypes(df, score_columns=['ĐĐGtx_1', 'Điểm'], category_columns=['Mã đề', 'Giới tính'],
+                       text_columns=['Họ và tên'])
+    return apply_dtypes(df, plan)
+
+
+class TestPlanDtypes:
+    """Test plan_dtypes/apply_dtypes functionality"""
+
+    def test_compacts_by_role_without_changing_values(self, grade_book):
+        """Test that codes become categories, scores float32, and values are unchanged"""
+        result = compact(grade_book)
+
+        assert isinstance(result['Mã đề'].dtype, pd.CategoricalDtype)
+        assert isinstance(result['Giới tính'].dtype, pd.CategoricalDtype)
+        assert result['Điểm'].dtype == np.float32
+        assert result['ĐĐGtx_1'].dtype == np.float32
+        assert memory_bytes(result) < memory_bytes(grade_book) / 2
+        for col in grade_book.columns:
+            pd.testing.assert_series_equal(result[col].astype(grade_book[col].dtype), grade_book[col])
+
+    def test_lossy_scores_and_unique_codes_are_kept(self, grade_book):
+        """Test that 7.3 stays float64 and a column without repeats stays as is"""
+        grade_book.loc[3, 'Điểm'] = 7.3
+        grade_book['Mã đề'] = [str(i) for i in range(len(grade_book))]
+
+        plan = plan_dtypes(grade_book, score_columns=['Điểm'], category_columns=['Mã đề'])
+
+        assert plan == {}
+
+    def test_text_columns_use_arrow_strings_when_available(self, grade_book):
+        """Test that names are only converted when pyarrow is installed"""
+        plan = plan_dtypes(grade_book, text_columns=['Họ và tên'])
+
+        if arrow_string_dtype() is None:
+            assert plan == {}
+        else:
+            assert plan == {'Họ và tên': arrow_string_dtype()}
+
+
+class TestSetValue:
+    """Test type-safe cell assignment on compact columns"""
+
+    def test_new_exam_code_is_added_as_category(self, grade_book):
+        """Test assigning an unseen code, given as int the way score entry passes it"""
+        df = compact(grade_book)
+
+        set_value(df, 1, 'Mã đề', 705)
+        set_value(df, 2, 'Mã đề', None)
+
+        assert df['Mã đề'].iat[1] == '705'
+        assert pd.isna(df['Mã đề'].iat[2])
+        assert isinstance(df['Mã đề'].dtype, pd.CategoricalDtype)
+
+    def test_sorting_after_new_code_follows_values(self, grade_book):
+        """Test that a code added later sorts by value, not after the existing categories"""
+        df = compact(grade_book.iloc[1:5].reset_index(drop=True))
+        assert df['Mã đề'].tolist() == ['702', '703', '704', '701']
+
+        set_value(df, 2, 'Mã đề', 700)
+        assert df['Mã đề'].iloc[sort_key(df['Mã đề']).sort_values(kind='stable').index].tolist() == [
+            '700', '701', '702', '703']
+        assert df['Mã đề'].sort_values().tolist() == ['700', '701', '702', '703']
+
+    def test_sort_key_ignores_category_order(self):
+        """Test sort keys of a categorical whose categories are not in value order"""
+        codes = pd.Series(['702', '703', '703', '701', None],
+                          dtype=pd.CategoricalDtype(['702', '703', '701']))
+        order = sort_key(codes).sort_values(na_position='last', kind='stable').index
+        assert codes.iloc[order].tolist()[:4] == ['701', '702', '703', '703']
+
+    def test_scores_upcast_only_when_needed(self, grade_book):
+        """Test that exact values keep float32 and 7.3 is stored without rounding error"""
+        df = compact(grade_book)
+
+        set_value(df, 0, 'Điểm', 8.25)
+        assert df['Điểm'].dtype == np.float32
+
+        set_value(df, 1, 'Điểm', 7.3)
+        assert df['Điểm'].dtype == np.float64
+        assert df['Điểm'].iat[1] == 7.3
+
+    def test_integer_column_accepts_fraction_and_missing(self, grade_book):
+        """Test that an int64 score column is widened instead of raising"""
+        set_value(grade_book, 0, 'ĐĐGtx_1', 8.5)
+        set_value(grade_book, 1, 'ĐĐGtx_1', None)
+
+        assert grade_book['ĐĐGtx_1'].iat[0] == 8.5
+        assert pd.isna(grade_book['ĐĐGtx_1'].iat[1])
+
+    def test_undo_restores_compact_columns(self, grade_book):
+        """Test that undo/redo patches go through the same setter"""
+        from data_model import UndoEntry
+
+        df = compact(grade_book)
+        patch = UndoEntry("Nhập điểm", cells=[(1, 'Mã đề', df['Mã đề'].iat[1], 706),
+                                              (1, 'Điểm', df['Điểm'].iat[1], 9.1)])
+        patch.reapply(df)
+        assert (df['Mã đề'].iat[1], df['Điểm'].iat[1]) == ('706', 9.1)
+
+        patch.revert(df)
+        assert (df['Mã đề'].iat[1], df['Điểm'].iat[1]) == (grade_book['Mã đề'].iat[1], grade_book['Điểm'].iat[1])
+
+
+
+class TestScoreAndExamCodeSetters:
+    """Test the validating setters used by score entry"""
+
+    def test_exam_code_is_normalised(self, grade_book):
+        """Test that codes typed as int/float/padded text all store the same string"""
+        df = compact(grade_book)
+
+        assert set_exam_code(df, 0, 'Mã đề', 702) == '702'
+        assert set_exam_code(df, 1, 'Mã đề', 702.0) == '702'
+        assert set_exam_code(df, 2, 'Mã đề', ' 703 ') == '703'
+        assert set_exam_code(df, 3, 'Mã đề', None) == ''
+        assert list(df['Mã đề'].iloc[:4]) == ['702', '702', '703', '']
+
+    def test_invalid_score_is_rejected_before_writing(self, grade_book):
+        """Test that a bad value raises and leaves the cell untouched"""
+        df = compact(grade_book)
+        before = df['Điểm'].iat[1]
+
+        with pytest.raises(ValueError):
+            set_score(df, 1, 'Điểm', 'abc')
+        with pytest.raises(ValueError):
+            set_score(df, 1, 'Điểm', float('inf'))
+
+        assert df['Điểm'].iat[1] == before
+        assert np.isnan(set_score(df, 1, 'Điểm', ''))
+
+    def test_setter_does_not_rebuild_other_columns(self, grade_book):
+        """Test that writing one cell leaves the other columns' buffers in place"""
+        df = compact(grade_book)
+        # Lần ghi đầu có thể chép cột đang dùng chung với bản gốc (Copy-on-Write)
+        set_score(df, 4, 'Điểm', 9.0)
+        set_exam_code(df, 4, 'Mã đề', 702)
+        scores_before = df['ĐĐGtx_1'].to_numpy()
+        written_before = df['Điểm'].to_numpy()
+        codes_before = df['Mã đề'].array.codes
+
+        set_score(df, 5, 'Điểm', 9.5)
+        set_exam_code(df, 5, 'Mã đề', 701)
+
+        assert np.shares_memory(df['ĐĐGtx_1'].to_numpy(), scores_before)
+        assert np.shares_memory(df['Mã đề'].array.codes, codes_before)
+        assert np.shares_memory(df['Điểm'].to_numpy(), written_before)
+        assert df['Điểm'].iat[5] == 9.5
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,225 @@
+# Tests for single-pass Excel sheet reading
+
+import pytest
+import pandas as pd
+import os
+import re
+import sys
+import zipfile
+from datetime import datetime, time, timedelta
+from openpyxl import Workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from excel_reader import read_sheet, read_merged_ranges, MergedRanges, SheetStream
+
+
+@pytest.fixture
+def merged_header_file(tmp_path):
+    """Workbook with a merged title, a two-level header and gaps in the data"""
+    file_path = tmp_path / "merged_header.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = 'BẢNG ĐIỂM HỌC KỲ I'
+    ws.merge_cells('A1:E1')
+    ws.append([])
+    ws.append(['STT', 'Họ và tên', 'ĐĐGtx', None, 'ĐĐGck'])
+    ws.append([None, None, 1, 2, None])
+    ws.merge_cells('C3:D3')
+    for i in range(6):
+        ws.append([i + 1, f'Học sinh {i}', 7 + i % 3, None if i % 2 else 8.5, datetime(2024, 1, i + 1)])
+    ws['G12'] = 'ghi chú'
+    wb.save(file_path)
+    return str(file_path)
+
+
+class TestReadSheet:
+    """Test read_sheet functionality"""
+
+    @pytest.mark.parametrize('header_row', [0, 2, 5])
+    def test_frame_matches_pandas_read_excel(self, sample_excel_file_header_row_5, header_row):
+        """Test that the DataFrame equals pd.read_excel with the same header row"""
+        sheet = read_sheet(sample_excel_file_header_row_5)
+
+        expected = pd.read_excel(sample_excel_file_header_row_5, header=header_row)
+        pd.testing.assert_frame_equal(sheet.to_frame(header_row), expected)
+
+    def test_multi_level_header_matches_pandas(self, merged_header_file):
+        """Test multi-level headers flattened with the separator"""
+        sheet = read_sheet(merged_header_file)
+
+        expected = pd.read_excel(merged_header_file, header=[2, 3])
+        expected.columns = ['_'.join(str(i) for i in col if str(i) != 'nan').strip('_')
+                            for col in expected.columns.values]
+        frame = sheet.to_frame(2, 2)
+
+        pd.testing.assert_frame_equal(frame, expected)
+        assert list(frame.columns[:4]) == ['STT_Unnamed: 0_level_1', 'Họ và tên_Unnamed: 1_level_1',
+                                           'ĐĐGtx_1', 'ĐĐGtx_2']
+
+    def test_merged_ranges_from_same_pass(self, merged_header_file, sample_excel_file_normal):
+        """Test that merged ranges are collected while streaming the rows"""
+        assert sorted(read_sheet(merged_header_file).merged_ranges) == [(1, 1, 1, 5), (3, 3, 3, 4)]
+        assert read_sheet(sample_excel_file_normal).merged_ranges == []
+
+    def test_header_sample_uses_sheet_row_numbers(self, sample_excel_file_header_row_5, sample_student_data):
+        """Test that the header sample keeps every sheet row, so its index is the header row"""
+        sheet = read_sheet(sample_excel_file_header_row_5)
+        sample = sheet.header_sample(50)
+
+        assert list(sample.iloc[5].dropna()) == list(sample_student_data.columns)
+        assert len(sample) == 6 + len(sample_student_data)
+        assert sheet.to_frame(len(sheet.rows)).empty
+
+
+def comparable(rows):
+    """Rows with NaN made equal to itself and value types kept"""
+    return [[('nan' if value != value else (type(value).__name__, value)) for value in row] for row in rows]
+
+
+@pytest.fixture
+def mixed_types_file(tmp_path):
+    """Workbook exercising every cell type the readers must convert alike"""
+    file_path = tmp_path / "mixed_types.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['  giữ khoảng trắng', True, False, 7, 7.0, 2.5, 1e20, '=1+1'])
+    ws.append([datetime(2024, 1, 2, 3, 4, 5), time(10, 30), timedelta(hours=30), None, '', 'x'])
+    ws['A5'] = CellRichText(['Điểm ', TextBlock(InlineFont(b=True), 'tổng kết')])
+    ws['C5'] = '#N/A'
+    ws['C5'].data_type = 'e'
+    ws['D5'] = 0.15
+    ws['D5'].number_format = '0%'
+    ws.merge_cells('A7:B7')
+    wb.create_sheet('Lớp 2')['C3'] = 'ở sheet 2'
+    wb.save(file_path)
+    return str(file_path)
+
+
+class TestFastReader:
+    """Test the direct XML reader against the openpyxl cell parser"""
+
+    @pytest.mark.parametrize('sheet_index', [0, 1])
+    def test_same_values_as_openpyxl(self, mixed_types_file, sheet_index):
+        fast = read_sheet(mixed_types_file, sheet_index)
+        slow = read_sheet(mixed_types_file, sheet_index, fast=False)
+
+        assert comparable(fast.rows) == comparable(slow.rows)
+        assert fast.merged_ranges == slow.merged_ranges
+        assert fast.sheet_name == slow.sheet_name
+
+    def test_stream_matches_openpyxl(self, sample_excel_file_large):
+        with SheetStream(sample_excel_file_large, block_size=300) as stream:
+            fast = stream.read_frame(0)
+            assert stream.total_rows == 1001
+        with SheetStream(sample_excel_file_large, block_size=300, fast=False) as stream:
+            slow = stream.read_frame(0)
+
+        pd.testing.assert_frame_equal(fast, slow)
+
+    def test_prefixed_namespace_falls_back_to_openpyxl(self, merged_header_file, tmp_path):
+        """Test that an unusual package layout is still read (through openpyxl)"""
+        prefixed = tmp_path / "prefixed.xlsx"
+        with zipfile.ZipFile(merged_header_file) as source, zipfile.ZipFile(prefixed, 'w') as target:
+            for item in source.infolist():
+                data = source.read(item)
+                if item.filename == 'xl/worksheets/sheet1.xml':
+                    data = re.sub(rb'<(/?)(?![?!])([A-Za-z]+)', rb'<\1x:\2', data)
+                    data = data.replace(b'xmlns="', b'xmlns:x="', 1)
+                target.writestr(item, data)
+
+        assert comparable(read_sheet(str(prefixed)).rows) == comparable(read_sheet(merged_header_file).rows)
+
+
+class TestMergedRanges:
+    """Test merged-range discovery straight from the sheet XML"""
+
+    def test_matches_ranges_from_full_read(self, merged_header_file, sample_excel_file_normal):
+        """Test that scanning <mergeCells> finds the same ranges as reading the sheet"""
+        assert list(read_merged_ranges(merged_header_file)) == sorted(read_sheet(merged_header_file).merged_ranges)
+        assert len(read_merged_ranges(sample_excel_file_normal)) == 0
+
+    def test_limited_to_header_region(self, merged_header_file):
+        """Test that ranges starting below max_row are dropped"""
+        assert list(read_merged_ranges(merged_header_file, max_row=2)) == [(1, 1, 1, 5)]
+
+    def test_sheet_index_follows_worksheet_order(self, tmp_path):
+        """Test that the right sheet XML is scanned for later sheets"""
+        file_path = tmp_path / "two_sheets.xlsx"
+        wb = Workbook()
+        wb.active.merge_cells('A1:C1')
+        wb.create_sheet('Lớp 2').merge_cells('B2:B4')
+        wb.save(file_path)
+
+        assert list(read_merged_ranges(str(file_path), 1)) == [(2, 2, 4, 2)]
+
+    def test_find_uses_intervals(self):
+        """Test cell lookup without expanding ranges into cells"""
+        merged = MergedRanges([(3, 3, 3, 4), (1, 1, 1, 500)])
+
+        assert merged.find(1, 250) == (1, 1, 1, 500)
+        assert merged.find(3, 4) == (3, 3, 3, 4)
+        assert merged.find(2, 3) is None
+        assert merged.starting_within(2) == MergedRanges([(1, 1, 1, 500)])
+
+
+class TestSheetStream:
+    """Test block-wise streaming reads"""
+
+    @pytest.mark.parametrize('block_size', [2, 5000])
+    def test_blocks_match_single_pass_read(self, sample_excel_file_large, block_size):
+        """Test that concatenated blocks equal the full read"""
+        expected = read_sheet(sample_excel_file_large).to_frame(0)
+
+        with SheetStream(sample_excel_file_large, block_size=block_size) as stream:
+            frame = stream.read_frame(0)
+
+        pd.testing.assert_frame_equal(frame, expected)
+
+    def test_header_sample_rows_are_reused(self, sample_excel_file_header_row_5):
+        """Test that rows read for header detection are not lost from the data"""
+        expected = read_sheet(sample_excel_file_header_row_5).to_frame(5)
+        progress = []
+
+        with SheetStream(sample_excel_file_header_row_5, block_size=2) as stream:
+            sample = stream.header_sample(50)
+            frame = stream.read_frame(5, progress=lambda read, total: progress.append(read))
+
+        assert len(sample) == 11
+        pd.testing.assert_frame_equal(frame, expected)
+        assert progress == [2, 4, 5]
+
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_text_codes_keep_leading_zeros_across_blocks(self, tmp_path, fast):
+        """Test that a column that is text in one block and numeric-looking in another reads like the full read"""
+        file_path = str(tmp_path / "codes.xlsx")
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['DANH SÁCH LỚP 10A1'])
+        ws.append(['STT', 'Họ và tên', 'Mã đề', 'Điểm'])
+        for i, code in enumerate(['001', '002', '003', None, 'A1', '004'], 1):
+            ws.append([i, f'Học sinh {i}', code, i + 0.5])
+        ws.append([])
+        ws.append([7, 'Học sinh 7', '005', 8])
+        wb.save(file_path)
+        expected = read_sheet(file_path, fast=fast).to_frame(1)
+
+        with SheetStream(file_path, block_size=2, fast=fast) as stream:
+            frame = stream.read_frame(1)
+
+        pd.testing.assert_frame_equal(frame, expected)
+        assert frame['Mã đề'].tolist()[:3] == ['001', '002', '003']
+        assert pd.read_excel(file_path, header=1)['Mã đề'].tolist()[:3] == ['001', '002', '003']
+
+    def test_blocks_are_bounded(self, sample_excel_file_large):
+        """Test that no block holds more than block_size rows"""
+        with SheetStream(sample_excel_file_large, block_size=300) as stream:
+            sizes = [len(block) for block in stream.blocks(0)]
+
+        assert sizes == [300, 300, 300, 100]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,220 @@
+# Tests for incremental Excel writeback
+
+import pytest
+import pandas as pd
+import os
+import sys
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from excel_writer import (ExcelWriteback, WriteBehindQueue, SOURCE_LAYOUT_KEY,
+                          make_source_layout, to_cell_value)
+
+
+@pytest.fixture
+def formatted_workbook(tmp_path):
+    """Workbook with title rows, a merged banner and a bold header row"""
+    file_path = tmp_path / "grade_book.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws['A1'] = 'TRƯỜNG THCS KHƯƠNG ĐÌNH'
+    ws.merge_cells('A1:D1')
+    ws.append([])
+    ws.append(['STT', 'Họ và tên', 'Mã đề', 'Điểm'])
+    for cell in ws[3]:
+        cell.font = Font(bold=True)
+    ws.append([1, 'Nguyễn Văn A', 701, 8.5])
+    ws.append([2, 'Trần Thị B', 702, None])
+    ws.append([3, 'Lê Văn C', None, 6])
+    wb.save(file_path)
+    return str(file_path)
+
+
+def load_with_layout(file_path, header_row=2):
+    df = pd.read_excel(file_path, header=header_row)
+    df.attrs[SOURCE_LAYOUT_KEY] = make_source_layout(header_row, 1, len(df.columns))
+    return df
+
+
+class TestExcelWriteback:
+    """Test ExcelWriteback functionality"""
+
+    def test_patches_only_dirty_cells(self, formatted_workbook):
+        """Test that a score edit only touches the edited cell and keeps formatting"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+
+        df.loc[1, 'Điểm'] = 9.25
+        writer.mark_dirty(1, ['Điểm'])
+        assert writer.pending_count == 1
+        assert writer.flush(df) is True
+        assert not writer.has_pending()
+
+        ws = load_workbook(formatted_workbook).active
+        assert ws['D5'].value == 9.25
+        assert ws['D4'].value == 8.5
+        assert ws['A1'].value == 'TRƯỜNG THCS KHƯƠNG ĐÌNH'
+        assert 'A1:D1' in [str(r) for r in ws.merged_cells.ranges]
+        assert ws['B3'].font.bold
+
+    def test_exam_code_written_as_text(self, formatted_workbook):
+        """Test that exam codes normalised to text are written back unchanged, like df.to_excel"""
+        df = load_with_layout(formatted_workbook)
+        df['Mã đề'] = df['Mã đề'].astype(str)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+
+        df.loc[2, 'Mã đề'] = '703'
+        writer.mark_dirty([2], ['Mã đề'])
+        writer.flush(df)
+
+        ws = load_workbook(formatted_workbook).active
+        assert ws['C6'].value == '703'
+
+    def test_added_rows_trigger_full_data_rewrite(self, formatted_workbook):
+        """Test that appending a student rewrites the data area below the header"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+
+        new_row = pd.DataFrame({'Họ và tên': ['Phạm Thị D'], 'Điểm': [None]})
+        df = pd.concat([df, new_row], ignore_index=True)
+        assert writer.flush(df) is True
+
+        ws = load_workbook(formatted_workbook).active
+        assert ws['B7'].value == 'Phạm Thị D'
+        assert ws['B3'].font.bold
+
+    def test_new_column_gets_its_own_excel_column(self, formatted_workbook):
+        """Test that columns missing from the source file are appended after the data"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+
+        df['Ghi chú'] = None
+        df.loc[0, 'Ghi chú'] = 'Vắng'
+        writer.mark_dirty(0, ['Ghi chú'])
+        writer.flush(df)
+
+        ws = load_workbook(formatted_workbook).active
+        assert ws['E3'].value == 'Ghi chú'
+        assert ws['E4'].value == 'Vắng'
+
+    def test_without_layout_caller_must_rewrite(self, tmp_path, sample_student_data):
+        """Test that frames without a recorded layout fall back to a full write"""
+        file_path = tmp_path / "plain.xlsx"
+        sample_student_data.to_excel(file_path, index=False)
+
+        writer = ExcelWriteback()
+        writer.attach(str(file_path), sample_student_data)
+        assert not writer.can_patch
+        assert writer.flush(sample_student_data) is False
+
+    def test_to_cell_value_conversions(self):
+        """Test conversion of pandas values to openpyxl values"""
+        assert to_cell_value(float('nan')) is None
+        assert to_cell_value('') is None
+        assert to_cell_value('701.0') == '701.0'
+        assert to_cell_value('0123') == '0123'
+        assert to_cell_value(pd.NA) is None
+
+    def test_data_rewrite_keeps_numeric_text_as_text(self, formatted_workbook):
+        """Test that a text column rewritten with the data area is not turned into numbers"""
+        df = load_with_layout(formatted_workbook)
+        df['Mã đề'] = ['12345', '7.0', '']
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+
+        writer.mark_all_dirty()
+        assert writer.flush(df)
+
+        ws = load_workbook(formatted_workbook).active
+        assert [ws['C4'].value, ws['C5'].value, ws['C6'].value] == ['12345', '7.0', None]
+        assert ws['D4'].value == 8.5
+
+
+class TestWriteBehindQueue:
+    """Test WriteBehindQueue functionality"""
+
+    def test_burst_of_edits_coalesces_into_one_flush(self, formatted_workbook):
+        """Test that a burst of score entries is written in a single flush"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+        write_queue = WriteBehindQueue(writer, coalesce_delay=5.0)
+
+        for i in range(20):
+            df.loc[i % 3, 'Điểm'] = i / 2
+            writer.mark_dirty(i % 3, ['Điểm'])
+            assert write_queue.submit(df) is True
+
+        assert write_queue.stats()['pending'] == 20
+        write_queue.drain()
+        stats = write_queue.stats()
+        write_queue.stop()
+
+        assert stats['pending'] == 0
+        assert stats['flushes'] == 1
+        assert stats['last_edits'] == 20
+        assert stats['last_error'] is None
+        ws = load_workbook(formatted_workbook).active
+        assert [ws['D4'].value, ws['D5'].value, ws['D6'].value] == [9.0, 9.5, 8.5]
+
+    def test_failed_write_is_kept_and_retried(self, formatted_workbook, monkeypatch):
+        """Test that an edit is not lost when the file is locked during a flush"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+        write_queue = WriteBehindQueue(writer, coalesce_delay=0.01)
+        apply = writer.patcher.apply
+
+        def locked(batch):
+            raise PermissionError('locked by Excel')
+
+        monkeypatch.setattr(writer.patcher, 'apply', locked)
+        df.loc[0, 'Điểm'] = 9.0
+        writer.mark_dirty(0, ['Điểm'])
+        write_queue.submit(df)
+        write_queue.stop()
+        stats = write_queue.stats()
+        assert (stats['pending'], stats['failed']) == (0, 1)
+        assert 'locked by Excel' in stats['last_error']
+
+        monkeypatch.setattr(writer.patcher, 'apply', apply)
+        write_queue.stop()
+        stats = write_queue.stats()
+        assert (stats['failed'], stats['last_error']) == (0, None)
+        assert load_workbook(formatted_workbook).active['D4'].value == 9.0
+
+    def test_atomic_write_leaves_no_temp_file(self, formatted_workbook):
+        """Test that the writer renames its temp file over the target"""
+        df = load_with_layout(formatted_workbook)
+        writer = ExcelWriteback()
+        writer.attach(formatted_workbook, df)
+        write_queue = WriteBehindQueue(writer, coalesce_delay=0.01)
+
+        df.loc[0, 'Điểm'] = 10
+        writer.mark_dirty(0, ['Điểm'])
+        write_queue.submit(df)
+        write_queue.stop()
+
+        assert os.listdir(os.path.dirname(formatted_workbook)) == ['grade_book.xlsx']
+        assert load_workbook(formatted_workbook).active['D4'].value == 10
+
+    def test_submit_frame_rewrites_whole_file(self, tmp_path, sample_student_data):
+        """Test the full-file fallback used for files without a recorded layout"""
+        file_path = str(tmp_path / "plain.xlsx")
+        write_queue = WriteBehindQueue(ExcelWriteback(), coalesce_delay=0.01)
+
+        assert write_queue.submit(sample_student_data) is False
+        write_queue.submit_frame(file_path, sample_student_data)
+        write_queue.stop()
+
+        assert len(pd.read_excel(file_path)) == len(sample_student_data)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,140 @@
+# Tests for background, cancellable file loading
+
+import pytest
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from file_loader import BackgroundLoader, LoadCancelled
+
+
+class ManualScheduler:
+    """Stands in for root.after: callbacks run only when the test pumps them"""
+
+    def __init__(self):
+        self.pending = []
+
+    def __call__(self, ms, callback):
+        self.pending.append(callback)
+
+    def pump(self, until, timeout=5):
+        """Run scheduled polls until the condition holds (like the Tk event loop)"""
+        for _ in range(int(timeout / 0.01)):
+            if until():
+                return
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            threading.Event().wait(0.01)
+        assert until()
+
+
+@pytest.fixture
+def scheduler():
+    return ManualScheduler()
+
+
+@pytest.fixture
+def loader(scheduler):
+    return BackgroundLoader(scheduler)
+
+
+class TestBackgroundLoader:
+    """Test BackgroundLoader functionality"""
+
+    def test_result_delivered_on_poll(self, loader, scheduler):
+        """Test that the result reaches on_done only through poll, on the calling thread"""
+        results = []
+        loader.start(lambda report: threading.current_thread().name,
+                     lambda result: results.append((result, threading.current_thread().name)))
+
+        scheduler.pump(lambda: results)
+
+        assert results[0][0].startswith('file-loader-')
+        assert results[0][1] == threading.current_thread().name
+        assert not loader.busy
+
+    def test_error_delivered(self, loader, scheduler):
+        """Test that exceptions from the task go to on_error"""
+        errors = []
+
+        def task(report):
+            raise ValueError("hỏng file")
+
+        loader.start(task, lambda result: pytest.fail("on_done called"), on_error=errors.append)
+        scheduler.pump(lambda: errors)
+
+        assert str(errors[0]) == "hỏng file"
+
+    def test_cancel_stops_task_at_next_report(self, loader, scheduler):
+        """Test that cancelling calls on_cancel at once and the worker stops at report()"""
+        started, stopped = threading.Event(), threading.Event()
+        cancelled = []
+
+        def task(report):
+            started.set()
+            try:
+                while True:
+                    report(1, 10)
+                    threading.Event().wait(0.005)
+            except LoadCancelled:
+                stopped.set()
+                raise
+
+        loader.start(task, lambda result: pytest.fail("on_done called"),
+                     on_cancel=lambda: cancelled.append(True))
+        assert started.wait(5)
+        assert loader.cancel()
+
+        assert cancelled == [True]
+        assert stopped.wait(5)
+        scheduler.pump(lambda: not scheduler.pending)
+        assert cancelled == [True]
+        assert not loader.busy
+
+    def test_second_start_cancels_first(self, loader, scheduler):
+        """Test that opening another file cancels the first and ignores its late result"""
+        release = threading.Event()
+        first_done, second_done, cancelled = [], [], []
+
+        def slow_task(report):
+            release.wait(5)
+            return 'first'
+
+        loader.start(slow_task, first_done.append, on_cancel=lambda: cancelled.append('first'))
+        loader.start(lambda report: 'second', second_done.append)
+        release.set()
+
+        scheduler.pump(lambda: second_done)
+        threading.Event().wait(0.05)
+        scheduler.pump(lambda: not loader.busy)
+
+        assert second_done == ['second']
+        assert first_done == []
+        assert cancelled == ['first']
+
+    def test_progress_forwarded_while_running(self, loader, scheduler):
+        """Test that the latest progress is passed to on_progress"""
+        reported, release = threading.Event(), threading.Event()
+        progress, results = [], []
+
+        def task(report):
+            report(500, 1000)
+            reported.set()
+            release.wait(5)
+            return 'xong'
+
+        loader.start(task, results.append, on_progress=lambda done, total: progress.append((done, total)))
+        assert reported.wait(5)
+        scheduler.pump(lambda: progress)
+        release.set()
+        scheduler.pump(lambda: results)
+
+        assert progress == [(500, 1000)]
+        assert results == ['xong']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
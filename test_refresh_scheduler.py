@@ -0,0 +1,100 @@
+# Tests for the coalescing UI refresh scheduler
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from refresh_scheduler import RefreshScheduler
+
+
+class IdleQueue:
+    """Stands in for root.after_idle"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def __call__(self, callback):
+        self.callbacks.append(callback)
+
+    def run(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+@pytest.fixture
+def idle():
+    return IdleQueue()
+
+
+class TestRefreshScheduler:
+    """Test RefreshScheduler functionality"""
+
+    def test_repeated_marks_repaint_once(self, idle):
+        """Test that one edit marking the same panels several times paints each once"""
+        painted = []
+        scheduler = RefreshScheduler(idle)
+        scheduler.register('stats', lambda: painted.append('stats'))
+        scheduler.register('extremes', lambda: painted.append('extremes'))
+
+        scheduler.mark_dirty('extremes')
+        scheduler.mark_dirty('stats', 'extremes')
+        scheduler.mark_dirty('stats')
+
+        assert painted == [] and len(idle.callbacks) == 1
+        idle.run()
+        assert painted == ['stats', 'extremes']
+        assert scheduler.eliminated == 2
+        assert scheduler.summary() == {'stats': (2, 1), 'extremes': (2, 1)}
+
+    def test_marks_during_flush_wait_for_next_idle(self, idle):
+        """Test that a panel marked while painting is repainted on the next idle callback"""
+        painted = []
+        scheduler = RefreshScheduler(idle)
+        scheduler.register('stats', lambda: (painted.append('stats'), scheduler.mark_dirty('extremes')))
+        scheduler.register('extremes', lambda: painted.append('extremes'))
+
+        scheduler.mark_dirty('stats')
+        idle.run()
+        assert painted == ['stats']
+        idle.run()
+        assert painted == ['stats', 'extremes']
+
+    def test_counters_accumulate_across_flushes(self, idle):
+        """Test that counters add up over several idle callbacks and only merged marks count as eliminated"""
+        scheduler = RefreshScheduler(idle)
+        scheduler.register('stats', lambda: None)
+        scheduler.register('extremes', lambda: None)
+
+        scheduler.mark_dirty('stats', 'extremes')
+        idle.run()
+        assert scheduler.eliminated == 0
+
+        for _ in range(3):
+            scheduler.mark_dirty('stats')
+        idle.run()
+        scheduler.mark_dirty('extremes')
+        idle.run()
+
+        assert scheduler.summary() == {'stats': (4, 2), 'extremes': (2, 2)}
+        assert scheduler.eliminated == 2
+        assert scheduler.describe() == ("Làm mới giao diện: 6 yêu cầu, 4 lần vẽ"
+                                        " · bỏ được 2 lần tính lại thừa")
+
+    def test_failing_panel_does_not_block_others(self, idle):
+        """Test that an exception in one panel still lets the others repaint"""
+        painted = []
+        scheduler = RefreshScheduler(idle)
+        scheduler.register('stats', lambda: 1 / 0)
+        scheduler.register('extremes', lambda: painted.append('extremes'))
+
+        scheduler.mark_dirty('stats', 'extremes')
+        idle.run()
+
+        assert painted == ['extremes']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,90 @@
+# Tests for the incremental score statistics engine
+
+import pytest
+import pandas as pd
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from score_stats import ScoreStats
+
+
+def expected_stats(scores):
+    """Statistics computed from scratch the way update_stats used to"""
+    values = pd.to_numeric(pd.Series(scores), errors='coerce')
+    scored = values.dropna()
+    return {
+        'scored': len(scored),
+        'bands': {'high': int((scored >= 7).sum()),
+                  'medium': int(((scored >= 5) & (scored < 7)).sum()),
+                  'low': int((scored < 5).sum())},
+        'highest': (scored.max(), set(np.flatnonzero(values == scored.max()))) if len(scored) else None,
+        'lowest': (scored.min(), set(np.flatnonzero(values == scored.min()))) if len(scored) else None,
+        'mean': scored.mean() if len(scored) else 0.0,
+        'std': scored.std(ddof=0) if len(scored) else 0.0,
+    }
+
+
+def assert_matches(stats, scores):
+    expected = expected_stats(scores)
+    assert stats.scored == expected['scored']
+    assert stats.bands == expected['bands']
+    assert stats.highest() == expected['highest']
+    assert stats.lowest() == expected['lowest']
+    assert stats.mean == pytest.approx(expected['mean'])
+    assert stats.std == pytest.approx(expected['std'], abs=1e-9)
+
+
+class TestScoreStats:
+    """Test ScoreStats functionality"""
+
+    def test_rebuild_matches_pandas(self):
+        """Test the vectorised build, ignoring blanks and non-numeric cells"""
+        scores = [8.0, None, 6.5, 'vắng', 4.25, 8.0, 5.0, 7.0]
+        stats = ScoreStats()
+        stats.rebuild(pd.Series(scores, dtype=object), column='Điểm')
+
+        assert_matches(stats, scores)
+        assert stats.highest() == (8.0, {0, 5})
+        assert not stats.stale and stats.column == 'Điểm'
+
+    def test_updates_match_full_recalculation(self):
+        """Test a long random sequence of single-cell edits against recomputing from scratch"""
+        rng = np.random.default_rng(1)
+        scores = [None] * 200
+        stats = ScoreStats()
+        stats.rebuild(scores)
+
+        for _ in range(2000):
+            row = int(rng.integers(200))
+            new = None if rng.random() < 0.1 else float(rng.integers(0, 41)) / 4
+            stats.update(row, scores[row], new)
+            scores[row] = new
+
+        assert_matches(stats, scores)
+        assert len(stats._min_heap) <= 2 * 41 + 32
+
+    def test_extremes_follow_removed_levels(self):
+        """Test that lowering the only top score exposes the next level"""
+        stats = ScoreStats()
+        stats.rebuild([9.5, 7.0, 7.0, None])
+
+        stats.update(0, 9.5, 3.0)
+
+        assert stats.highest() == (7.0, {1, 2})
+        assert stats.lowest() == (3.0, {0})
+        assert stats.bands == {'high': 2, 'medium': 0, 'low': 1}
+
+    def test_empty_column(self):
+        """Test that a column without scores reports no extremes"""
+        stats = ScoreStats()
+        stats.rebuild(pd.Series([None, None], dtype=object))
+
+        assert stats.highest() is None and stats.lowest() is None
+        assert (stats.scored, stats.mean, stats.std) == (0, 0.0, 0.0)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
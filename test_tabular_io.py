@@ -0,0 +1,140 @@
+# Tests for CSV / Parquet reading and writing alongside Excel
+
+import pytest
+import pandas as pd
+import os
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from excel_writer import ExcelWriteback, WriteBehindQueue
+from tabular_io import (FORMAT_KEY, CsvSource, file_format, read_parquet, sniff_encoding,
+                        write_table)
+
+NAMES = ['Nguyễn Văn Ạn', 'Trần Thị Bích', 'Lê Hoàng Việt']
+
+
+def write_bytes(path, text, encoding, errors='strict'):
+    with open(path, 'wb') as f:
+        f.write(text.encode(encoding, errors))
+    return str(path)
+
+
+def is_score(column):
+    return column == 'Điểm'
+
+
+def read_csv_source(path, header_row=0):
+    source = CsvSource(path)
+    return source, source.read_frame(header_row, numeric=is_score)
+
+
+class TestCsvSniffing:
+    """Test encoding / delimiter / decimal detection"""
+
+    def test_utf8_file(self, tmp_path):
+        text = 'STT,Họ và tên,Điểm\n' + ''.join(f'{i},{name},{i + 6.5}\n' for i, name in enumerate(NAMES))
+        source, frame = read_csv_source(write_bytes(tmp_path / 'lop.csv', text, 'utf-8'))
+        assert source.encoding == 'utf-8'
+        assert frame['Họ và tên'].tolist() == NAMES
+        assert frame['Điểm'].tolist() == [6.5, 7.5, 8.5]
+
+    def test_windows_1258_with_semicolon_and_decimal_comma(self, tmp_path):
+        # Vietnamese Excel saves CSV as Windows-1258 with tone marks as combining characters
+        text = 'STT;Họ và tên;Điểm\n' + ''.join(f'{i};{name};{i + 6},5\n' for i, name in enumerate(NAMES))
+        path = write_bytes(tmp_path / 'lop.csv', text, 'cp1258', 'windows_1258_fallback')
+        with open(path, 'rb') as f:
+            assert b'A\xf2n' in f.read()  # 'Ạ' has no code point, written as 'A' + combining dot below
+        source, frame = read_csv_source(path)
+        assert (source.encoding, source.delimiter) == ('cp1258', ';')
+        assert frame['Họ và tên'].tolist() == NAMES
+        assert frame['Điểm'].tolist() == [6.5, 7.5, 8.5]
+        assert frame.attrs[FORMAT_KEY] == {'format': 'csv', 'encoding': 'cp1258',
+                                           'delimiter': ';', 'decimal': ','}
+
+    def test_truncated_multibyte_sample_is_still_utf8(self):
+        assert sniff_encoding('Điểm'.encode('utf-8')[:-1]) == 'utf-8'
+        assert sniff_encoding('Điểm'.encode('utf-8-sig')) == 'utf-8-sig'
+
+    def test_title_rows_above_header(self, tmp_path):
+        text = ('DANH SÁCH LỚP 10A1\n\nSTT,Họ và tên,Mã đề,Điểm\n'
+                '1,Nguyễn Văn A,701,8\n2,Trần Thị B,702,\n')
+        source = CsvSource(write_bytes(tmp_path / 'lop.csv', text, 'utf-8'))
+        sample = source.header_sample(10)
+        assert sample.iloc[2].tolist() == ['STT', 'Họ và tên', 'Mã đề', 'Điểm']
+        frame = source.read_frame(2, numeric=is_score)
+        assert list(frame.columns) == ['STT', 'Họ và tên', 'Mã đề', 'Điểm']
+        assert frame['Mã đề'].tolist() == ['701', '702']
+        assert frame['Điểm'].tolist()[0] == 8 and pd.isna(frame['Điểm'].iloc[1])
+
+    def test_rows_wider_than_header(self, tmp_path):
+        text = 'STT,Họ và tên\n1,Nguyễn Văn A\n2,Trần Thị B,ghi chú\n'
+        _, frame = read_csv_source(write_bytes(tmp_path / 'lop.csv', text, 'utf-8'))
+        assert list(frame.columns) == ['STT', 'Họ và tên', 'Unnamed: 2']
+        assert frame['Unnamed: 2'].tolist()[1] == 'ghi chú'
+
+
+class TestWriteTable:
+    """Test that saves keep the source format"""
+
+    def test_csv_is_written_back_with_source_options(self, tmp_path):
+        text = 'STT;Họ và tên;Điểm\n' + ''.join(f'{i};{name};{i + 6},5\n' for i, name in enumerate(NAMES))
+        path = write_bytes(tmp_path / 'lop.csv', text, 'cp1258', 'windows_1258_fallback')
+        _, frame = read_csv_source(path)
+        frame.loc[0, 'Điểm'] = 9.25
+
+        write_table(frame, path)
+        with open(path, 'rb') as f:
+            written = unicodedata.normalize('NFC', f.read().decode('cp1258'))
+        assert written.splitlines()[1] == '0;Nguyễn Văn Ạn;9,25'
+        _, reread = read_csv_source(path)
+        pd.testing.assert_frame_equal(reread, frame)
+
+    def test_leading_zero_ids_survive_a_save(self, tmp_path):
+        text = 'Mã định danh;Họ và tên;Điểm\n012345;Nguyễn Văn A;7,5\n000789;Trần Thị B;8\n'
+        path = write_bytes(tmp_path / 'lop.csv', text, 'utf-8')
+        _, frame = read_csv_source(path)
+        assert frame['Mã định danh'].tolist() == ['012345', '000789']
+
+        frame.loc[0, 'Điểm'] = 9.25
+        write_table(frame, path)
+        with open(path, encoding='utf-8') as f:
+            assert f.read().splitlines()[1:] == ['012345;Nguyễn Văn A;9,25', '000789;Trần Thị B;8,0']
+        assert read_csv_source(path)[1]['Mã định danh'].tolist() == ['012345', '000789']
+
+    def test_score_column_with_text_is_kept_as_text(self, tmp_path):
+        text = 'STT,Điểm\n1,7.5\n2,Vắng\n'
+        _, frame = read_csv_source(write_bytes(tmp_path / 'lop.csv', text, 'utf-8'))
+        assert frame['Điểm'].tolist() == ['7.5', 'Vắng']
+
+    def test_new_csv_defaults_to_utf8_with_bom(self, tmp_path):
+        path = str(tmp_path / 'xuat.csv')
+        write_table(pd.DataFrame({'Họ và tên': NAMES}), path)
+        with open(path, 'rb') as f:
+            assert f.read().startswith('﻿Họ và tên'.encode('utf-8'))
+
+    def test_write_queue_saves_csv_in_place(self, tmp_path):
+        path = write_bytes(tmp_path / 'lop.csv', 'STT,Điểm\n1,5\n', 'utf-8')
+        _, frame = read_csv_source(path)
+        frame.loc[0, 'Điểm'] = 7
+        write_queue = WriteBehindQueue(ExcelWriteback(), coalesce_delay=0.01)
+        write_queue.submit_frame(path, frame)
+        write_queue.stop()
+
+        assert write_queue.stats()['last_error'] is None
+        assert os.listdir(tmp_path) == ['lop.csv']
+        assert read_csv_source(path)[1]['Điểm'].tolist() == [7]
+
+    def test_file_format(self):
+        assert [file_format(p) for p in ('a.CSV', 'b.parquet', 'c.xlsx', 'd.xls')] == [
+            'csv', 'parquet', 'excel', 'excel']
+
+    def test_parquet_round_trip(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        path = str(tmp_path / 'lop.parquet')
+        frame = pd.DataFrame({'Họ và tên': NAMES, 'Điểm': [6.5, None, 9]})
+        write_table(frame, path)
+        reread = read_parquet(path)
+        pd.testing.assert_frame_equal(reread, frame, check_dtype=False)
+        assert reread.attrs[FORMAT_KEY] == {'format': 'parquet'}
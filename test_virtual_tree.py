@@ -0,0 +1,116 @@
+# Tests for the virtual student list
+
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from virtual_tree import VirtualTreeview, format_display_rows
+
+
+@pytest.fixture
+def view():
+    """VirtualTreeview over 2,000 rows in a hidden Tk root (skipped without a display)"""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("Tk display not available")
+    root.withdraw()
+    tree = ttk.Treeview(root, columns=('name', 'exam_code', 'score'), show='headings', height=10)
+    scrollbar = ttk.Scrollbar(root, orient='vertical')
+    bound = {}
+
+    def provider(positions):
+        return [((f"HS {pos}", '', f"{pos % 10:.2f}"), 'low_score' if pos % 10 < 5 else 'high_score')
+                for pos in positions]
+
+    virtual = VirtualTreeview(tree, scrollbar, provider,
+                              bind_item=bound.__setitem__, clear_items=bound.clear)
+    virtual.set_rows(np.arange(2000))
+    virtual.bound = bound
+    yield virtual
+    root.destroy()
+
+
+class TestVirtualTreeview:
+    """Test VirtualTreeview functionality"""
+
+    def test_only_visible_rows_are_items(self, view):
+        """Test that the tree holds one item per visible row, not one per student"""
+        assert len(view.tree.get_children()) == view.page_size == 10
+        assert sorted(view.bound.values()) == list(range(10))
+
+    def test_scroll_reuses_items(self, view):
+        """Test that scrolling re-labels the same items"""
+        items = view.tree.get_children()
+        view.scroll(1500)
+
+        assert view.tree.get_children() == items
+        assert view.tree.item(items[0])['values'][0] == 'HS 1500'
+        assert view.tree.item(items[0])['tags'] == ['low_score']
+        view.scroll(10000)
+        assert view.offset == 1990
+
+    def test_select_index_scrolls_into_view(self, view):
+        """Test selecting a row outside the window"""
+        view.select_index(1234)
+
+        assert view.selected_position() == 1234
+        assert view.offset <= 1234 < view.offset + view.page_size
+        assert view.bound[view.tree.selection()[0]] == 1234
+
+    def test_set_rows_with_sorted_positions(self, view):
+        """Test that sorting/filtering only swaps the row-position array"""
+        view.set_rows(np.arange(2000)[::-1])
+        assert view.tree.item(view.tree.get_children()[0])['values'][0] == 'HS 1999'
+        assert view.index_of_position(0) == 1999
+
+        view.set_rows([3, 7])
+        assert len(view.tree.get_children()) == 2
+
+    def test_show_message(self, view):
+        """Test the single message row shown when nothing matches"""
+        view.show_message('Không tìm thấy kết quả phù hợp')
+
+        assert len(view.tree.get_children()) == 1
+        assert view.selected_position() is None
+        assert view.bound == {}
+
+
+class TestFormatDisplayRows:
+    """Test vectorised display formatting"""
+
+    def test_values_and_score_tags(self):
+        """Test formatting and colour buckets, including blank and invalid scores"""
+        df = pd.DataFrame({
+            'Họ và tên': ['Nguyễn Văn A', None, 'Lê Văn C', 'Phạm Thị D', 'Hoàng Văn E'],
+            'Mã đề': ['701', '', np.nan, 702, '703'],
+            'Điểm': [4.5, 'x', None, 7, 5]
+        })
+
+        rows = format_display_rows(df, [0, 1, 2, 3, 4], 'Họ và tên', 'Mã đề', 'Điểm')
+
+        assert rows == [
+            (('Nguyễn Văn A', '701', '4.50'), 'low_score'),
+            (('', '', 'Chưa có điểm'), 'no_score'),
+            (('Lê Văn C', '', 'Chưa có điểm'), 'no_score'),
+            (('Phạm Thị D', '702', '7.00'), 'high_score'),
+            (('Hoàng Văn E', '703', '5.00'), 'medium_score'),
+        ]
+
+    def test_positions_order_and_missing_columns(self, sample_student_data):
+        """Test that rows follow the given positions and missing columns show blanks"""
+        rows = format_display_rows(sample_student_data, [4, 0], 'Họ và tên')
+
+        assert [values[0] for values, _ in rows] == ['Hoàng Văn E', 'Nguyễn Văn A']
+        assert all(tag == 'no_score' for _, tag in rows)
+        assert format_display_rows(sample_student_data, []) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
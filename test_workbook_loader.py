@@ -0,0 +1,160 @@
+# Tests for multi-sheet / multi-file loading and writeback to the source sheets
+
+import pytest
+import pandas as pd
+import os
+import sys
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from excel_reader import read_sheet
+from excel_writer import (ExcelWriteback, SOURCE_LAYOUT_KEY, SOURCE_PARTS_KEY, make_source_layout,
+                          unwritable_parts)
+from workbook_loader import (CLASS_COLUMN, FILE_COLUMN, combine_parts, list_sources,
+                             read_sheets)
+
+
+def write_class_book(file_path, classes):
+    """One sheet per class: a title row, the header row, then the students"""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for class_name, students in classes.items():
+        ws = wb.create_sheet(class_name)
+        ws['A1'] = f'DANH SÁCH LỚP {class_name}'
+        ws.append(['STT', 'Họ và tên', 'Mã đề', 'Điểm'])
+        for i, (name, score) in enumerate(students, 1):
+            ws.append([i, name, 701, score])
+    wb.save(file_path)
+    return str(file_path)
+
+
+@pytest.fixture
+def grade_books(tmp_path):
+    first = write_class_book(tmp_path / "khoi10.xlsx", {
+        '10A1': [('Nguyễn Văn A', 8.5), ('Trần Thị B', None)],
+        '10A2': [('Lê Văn C', 6), ('Phạm Thị D', 9), ('Hoàng Văn E', 4.5)],
+    })
+    second = write_class_book(tmp_path / "khoi11.xlsx", {
+        '11A1': [('Đỗ Văn G', 7)],
+    })
+    return first, second
+
+
+def frame_for(path, index):
+    """Parse a sheet the way the app does for these simple books (header on row 2)"""
+    frame = read_sheet(path, index).to_frame(1, 1, '_')
+    frame.attrs[SOURCE_LAYOUT_KEY] = make_source_layout(1, 1, len(frame.columns), sheet_index=index)
+    return frame
+
+
+def load_combined(sources):
+    return combine_parts([(path, name, frame_for(path, index)) for path, index, name in sources])
+
+
+class TestReadSheets:
+    """Test reading many sheets at once"""
+
+    def test_list_sources_covers_every_sheet_in_order(self, grade_books):
+        first, second = grade_books
+        sources = list_sources([first, second])
+        assert [(os.path.basename(path), index, name) for path, index, name in sources] == [
+            ('khoi10.xlsx', 0, '10A1'), ('khoi10.xlsx', 1, '10A2'), ('khoi11.xlsx', 0, '11A1')]
+
+    def test_process_pool_keeps_source_order(self, grade_books):
+        sources = [(path, index) for path, index, _ in list_sources(grade_books)]
+        progress = []
+        sheets = read_sheets(sources, progress=lambda done, total: progress.append((done, total)),
+                             max_workers=2, min_parallel_bytes=0)
+        assert [sheet.sheet_name for sheet in sheets] == ['10A1', '10A2', '11A1']
+        assert progress[-1] == (3, 3)
+        assert sheets[1].rows[2][1] == 'Lê Văn C'
+
+    def test_small_files_are_read_in_process(self, grade_books):
+        sources = [(path, index) for path, index, _ in list_sources(grade_books)]
+        sheets = read_sheets(sources)
+        assert [len(sheet.rows) for sheet in sheets] == [4, 5, 3]
+
+
+class TestCombineParts:
+    """Test merging per-sheet frames into one dataset"""
+
+    def test_rows_are_tagged_with_class_and_file(self, grade_books):
+        combined = load_combined(list_sources(grade_books))
+        assert len(combined) == 6
+        assert combined[CLASS_COLUMN].tolist() == ['10A1', '10A1', '10A2', '10A2', '10A2', '11A1']
+        assert combined[FILE_COLUMN].tolist()[-1] == 'khoi11.xlsx'
+        parts = combined.attrs[SOURCE_PARTS_KEY]
+        assert [(part['start'], part['stop']) for part in parts] == [(0, 2), (2, 5), (5, 6)]
+        assert CLASS_COLUMN not in parts[0]['columns']
+
+    def test_single_file_has_no_file_column(self, grade_books):
+        combined = load_combined(list_sources(grade_books[:1]))
+        assert FILE_COLUMN not in combined.columns
+
+
+    def test_part_without_layout_is_recorded(self, grade_books):
+        """Test that a sheet without a known layout is kept in the parts and blocks writeback"""
+        sources = list_sources(grade_books)
+        parts = [(path, name, frame_for(path, index)) for path, index, name in sources]
+        parts[1][2].attrs = {}
+        combined = combine_parts(parts)
+
+        recorded = combined.attrs[SOURCE_PARTS_KEY]
+        assert [part['sheet_name'] for part in recorded] == ['10A1', '10A2', '11A1']
+        assert [part['sheet_name'] for part in unwritable_parts(recorded)] == ['10A2']
+        writeback = ExcelWriteback()
+        writeback.attach(grade_books[0], combined)
+        assert not writeback.can_patch
+        writeback.mark_dirty(3, ['Điểm'])
+        assert writeback.flush(combined) is False
+
+
+class TestCombinedWriteback:
+    """Test that edits on the combined dataset land in the right source sheet"""
+
+    def test_cells_are_written_to_their_own_sheet(self, grade_books):
+        first, second = grade_books
+        combined = load_combined(list_sources(grade_books))
+        writeback = ExcelWriteback()
+        writeback.attach(first, combined)
+
+        combined.iat[3, combined.columns.get_loc('Điểm')] = 10   # Phạm Thị D, 10A2
+        combined.iat[5, combined.columns.get_loc('Điểm')] = 3    # Đỗ Văn G, khoi11
+        writeback.mark_dirty([3, 5], ['Điểm', CLASS_COLUMN])
+        assert writeback.flush(combined)
+
+        book = load_workbook(first)
+        assert book['10A2']['D4'].value == 10
+        assert book['10A1']['D4'].value is None
+        assert book['10A2'].max_column == 4  # tag columns never reach the source sheets
+        assert load_workbook(second)['11A1']['D3'].value == 3
+
+    def test_added_rows_are_not_written(self, grade_books):
+        first, _ = grade_books
+        combined = load_combined(list_sources(grade_books))
+        writeback = ExcelWriteback()
+        writeback.attach(first, combined)
+        before = os.path.getmtime(first)
+
+        longer = pd.concat([combined, combined.iloc[:1]], ignore_index=True)
+        writeback.mark_dirty(len(longer) - 1, ['Điểm'])
+        assert writeback.snapshot(longer) is None
+        assert os.path.getmtime(first) == before
+
+    def test_edits_are_kept_while_row_count_differs(self, grade_books):
+        """Test that a refused save keeps edits pending instead of dropping them"""
+        first, _ = grade_books
+        combined = load_combined(list_sources(grade_books))
+        writeback = ExcelWriteback()
+        writeback.attach(first, combined)
+
+        combined.iat[3, combined.columns.get_loc('Điểm')] = 10
+        writeback.mark_dirty(3, ['Điểm'])
+        longer = pd.concat([combined, combined.iloc[:1]], ignore_index=True)
+        assert writeback.flush(longer) is False
+        assert writeback.has_pending()
+
+        # Undoing the added row lets the next save write the kept edit
+        assert writeback.flush(combined) is True
+        assert load_workbook(first)['10A2']['D4'].value == 10
@@ -0,0 +1,253 @@
+"""
+Module hiển thị danh sách học sinh dạng ảo (virtual list) trên ttk.Treeview
+
+Treeview chỉ giữ một nhóm item cố định bằng số dòng nhìn thấy được. Khi cuộn,
+các item này được gán lại giá trị của cửa sổ dòng tương ứng, nên có thể duyệt
+toàn bộ danh sách mà không phải chèn hàng nghìn item.
+"""
+
+import numpy as np
+import pandas as pd
+from tkinter import ttk
+
+
+def format_display_rows(df, positions, name_col=None, exam_col=None, score_col=None):
+    """
+    Định dạng các dòng hiển thị (tên, mã đề, điểm) và tag màu theo điểm bằng thao tác vector
+
+    Args:
+        df (DataFrame): Dữ liệu học sinh
+        positions: Vị trí các dòng cần hiển thị
+        name_col, exam_col, score_col: Tên cột tương ứng (None nếu không có)
+
+    Returns:
+        list: Danh sách (values, tag) theo thứ tự positions
+    """
+    positions = np.asarray(positions, dtype=np.intp)
+    count = len(positions)
+
+    def text_column(col):
+        if not col:
+            return np.full(count, '', dtype=object)
+        values = df[col].iloc[positions]
+        return values.astype(str).where(values.notna(), '').to_numpy(dtype=object)
+
+    names = text_column(name_col)
+    exam_codes = text_column(exam_col)
+
+    if score_col:
+        scores = pd.to_numeric(df[score_col].iloc[positions], errors='coerce').to_numpy(dtype=float)
+    else:
+        scores = np.full(count, np.nan)
+    missing = np.isnan(scores)
+
+    # Phân loại màu: chưa có điểm / < 5 / 5-7 / ≥ 7
+    tags = np.select([missing, scores < 5, scores < 7],
+                     ['no_score', 'low_score', 'medium_score'], default='high_score')
+    score_text = np.where(missing, 'Chưa có điểm', np.char.mod('%.2f', np.where(missing, 0.0, scores)))
+
+    return list(zip(zip(names, exam_codes, score_text.tolist()), tags.tolist()))
+
+
+class VirtualTreeview:
+    """
+    Danh sách ảo dựa trên mảng vị trí dòng trong DataFrame
+
+    Args:
+        tree (ttk.Treeview): Treeview dùng để hiển thị
+        scrollbar (ttk.Scrollbar): Thanh cuộn dọc
+        row_provider: Hàm nhận danh sách vị trí dòng, trả về danh sách (values, tag)
+        bind_item: Hàm (item_id, vị trí dòng) được gọi mỗi khi item hiển thị dòng mới
+        clear_items: Hàm được gọi trước khi gán lại toàn bộ item
+    """
+
+    def __init__(self, tree, scrollbar, row_provider, bind_item=None, clear_items=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_provider = row_provider
+        self.bind_item = bind_item
+        self.clear_items = clear_items
+        self.rows = np.empty(0, dtype=np.intp)
+        self.offset = 0
+        self.pool = []
+        self._reused = 0
+        self.selected_index = None
+        self.message = None
+
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.configure(yscrollcommand=lambda first, last: None)
+        self.tree.bind('<Configure>', self._on_resize, add='+')
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        for key, handler in (('<Up>', lambda e: self.move_selection(-1)),
+                             ('<Down>', lambda e: self.move_selection(1)),
+                             ('<Prior>', lambda e: self.move_selection(-self.page_size)),
+                             ('<Next>', lambda e: self.move_selection(self.page_size)),
+                             ('<Home>', lambda e: self.select_index(0)),
+                             ('<End>', lambda e: self.select_index(len(self.rows) - 1))):
+            self.tree.bind(key, lambda e, h=handler: (h(e), 'break')[1])
+
+    # ----- Kích thước cửa sổ -----
+
+    @property
+    def page_size(self):
+        """Số dòng nhìn thấy được trong treeview"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return max(int(self.tree.cget('height') or 10), 1)
+        style = ttk.Style(self.tree)
+        row_height = int(style.lookup(self.tree.cget('style') or 'Treeview', 'rowheight') or 20)
+        heading_height = row_height if 'headings' in str(self.tree.cget('show')) else 0
+        return max((height - heading_height) // row_height, 1)
+
+    def _max_offset(self):
+        return max(len(self.rows) - self.page_size, 0)
+
+    # ----- Dữ liệu -----
+
+    def set_rows(self, positions, keep_offset=False):
+        """
+        Thay danh sách dòng hiển thị
+
+        Args:
+            positions: Vị trí dòng trong DataFrame theo thứ tự hiển thị
+            keep_offset: Giữ nguyên vị trí cuộn hiện tại
+        """
+        selected_position = self.selected_position()
+        self.rows = np.asarray(positions, dtype=np.intp)
+        self.message = None
+        self.selected_index = None
+        if selected_position is not None and keep_offset:
+            matches = np.flatnonzero(self.rows == selected_position)
+            if len(matches):
+                self.selected_index = int(matches[0])
+        self.offset = min(self.offset, self._max_offset()) if keep_offset else 0
+        self.render()
+
+    def show_message(self, text):
+        """Hiển thị một dòng thông báo thay cho danh sách"""
+        self.rows = np.empty(0, dtype=np.intp)
+        self.offset = 0
+        self.selected_index = None
+        self.message = text
+        self.render()
+
+    def refresh(self):
+        """Vẽ lại cửa sổ hiện tại (sau khi giá trị các dòng thay đổi)"""
+        self.render()
+
+    def render(self):
+        """Gán giá trị cửa sổ dòng hiện tại cho các item trong pool"""
+        if self.clear_items:
+            self.clear_items()
+
+        if self.message is not None:
+            self._resize_pool(1)
+            self.tree.item(self.pool[0], values=(self.message, '', ''), tags=())
+            self.tree.selection_set(())
+            self.scrollbar.set(0, 1)
+            return
+
+        window = self.rows[self.offset:self.offset + self.page_size]
+        rows = self.row_provider(window) if len(window) else []
+        self._resize_pool(len(window), rows)
+        for index, (position, (values, tag)) in enumerate(zip(window, rows)):
+            item_id = self.pool[index]
+            if index < self._reused:
+                self.tree.item(item_id, values=values, tags=(tag,) if tag else ())
+            if self.bind_item:
+                self.bind_item(item_id, position)
+
+        # Đồng bộ vùng chọn với dòng đang chọn
+        selected = ()
+        if self.selected_index is not None and self.offset <= self.selected_index < self.offset + len(window):
+            selected = (self.pool[self.selected_index - self.offset],)
+        if tuple(self.tree.selection()) != selected:
+            self.tree.selection_set(selected)
+            if selected:
+                self.tree.focus(selected[0])
+
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, min((self.offset + len(window)) / total, 1.0))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _resize_pool(self, size, rows=None):
+        """
+        Điều chỉnh số item trong pool; item mới được chèn kèm giá trị và tag trong một lần gọi
+
+        Sau khi gọi, self._reused là số item cũ cần gán lại giá trị.
+        """
+        self._reused = min(len(self.pool), size)
+        while len(self.pool) < size:
+            if rows:
+                values, tag = rows[len(self.pool)]
+                self.pool.append(self.tree.insert('', 'end', values=values, tags=(tag,) if tag else ()))
+            else:
+                self.pool.append(self.tree.insert('', 'end', values=('', '', '')))
+        while len(self.pool) > size:
+            self.tree.delete(self.pool.pop())
+
+    # ----- Cuộn -----
+
+    def scroll(self, rows):
+        """Cuộn rows dòng (âm: lên trên)"""
+        new_offset = min(max(self.offset + rows, 0), self._max_offset())
+        if new_offset != self.offset:
+            self.offset = new_offset
+            self.render()
+        return 'break'
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.offset = min(max(int(float(amount) * len(self.rows)), 0), self._max_offset())
+            self.render()
+        elif action == 'scroll':
+            step = self.page_size if unit == 'pages' else 1
+            self.scroll(int(amount) * step)
+
+    def _on_resize(self, event=None):
+        self.offset = min(self.offset, self._max_offset())
+        self.render()
+
+    # ----- Chọn dòng -----
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.pool and self.message is None:
+            self.selected_index = self.offset + self.pool.index(selection[0])
+
+    def selected_position(self):
+        """Vị trí dòng trong DataFrame của dòng đang chọn, hoặc None"""
+        if self.selected_index is None or self.selected_index >= len(self.rows):
+            return None
+        return int(self.rows[self.selected_index])
+
+    def index_of_position(self, position):
+        """Thứ tự hiển thị của vị trí dòng, hoặc None nếu không có trong danh sách"""
+        matches = np.flatnonzero(self.rows == position)
+        return int(matches[0]) if len(matches) else None
+
+    def select_index(self, index):
+        """Chọn dòng thứ index trong danh sách và cuộn tới dòng đó"""
+        if not len(self.rows):
+            return False
+        index = min(max(index, 0), len(self.rows) - 1)
+        self.selected_index = index
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.page_size:
+            self.offset = min(index - self.page_size + 1, self._max_offset())
+        self.render()
+        return True
+
+    def move_selection(self, step):
+        """Di chuyển vùng chọn step dòng"""
+        start = self.offset if self.selected_index is None else self.selected_index
+        return self.select_index(start + step)
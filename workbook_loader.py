@@ -0,0 +1,144 @@
+"""
+Module đọc nhiều sheet / nhiều file cùng lúc và ghép thành một bảng điểm
+
+Mỗi sheet (thường là một lớp) được đọc bằng read_sheet ở một tiến trình riêng
+(ProcessPoolExecutor) nên thời gian đọc cả khối giảm theo số lõi CPU. Tiến trình con chỉ
+trả về dữ liệu thô (SheetData); dò header và dựng DataFrame do tiến trình chính làm theo cấu
+hình hiện tại. Các bảng được ghép lại, mỗi dòng được gắn tên lớp (tên sheet) và tên file để
+tìm kiếm, thống kê, báo cáo chạy trên toàn bộ dữ liệu; vị trí của từng phần trong file gốc
+được lưu ở attrs[SOURCE_PARTS_KEY] để điểm được ghi trở lại đúng sheet.
+
+Tiến trình con luôn được tạo kiểu spawn (fork từ một luồng nền của ứng dụng Tk không an
+toàn). Tiến trình spawn nạp lại script chính, trong khi import_score dựng giao diện ngay khi
+được nạp, nên đường dẫn script chính được ẩn trong lúc tạo tiến trình con (xem
+_main_script_hidden). Bản đóng gói PyInstaller cần multiprocessing.freeze_support() ở đầu
+import_score.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import pandas as pd
+
+from excel_reader import list_sheets, read_sheet
+from excel_writer import SOURCE_LAYOUT_KEY, SOURCE_PARTS_KEY, make_source_part
+
+CLASS_COLUMN = 'Lớp'   # Cột gắn tên sheet cho sheet chưa có cột lớp
+FILE_COLUMN = 'Tệp'    # Cột gắn tên file khi ghép nhiều file
+
+# Dưới ngưỡng này (tổng dung lượng các file) đọc tuần tự nhanh hơn chi phí tạo tiến trình
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+
+def list_sources(file_paths):
+    """
+    Liệt kê mọi sheet của các file
+
+    Returns:
+        list: Các bộ (file_path, sheet_index, sheet_name) theo thứ tự file rồi thứ tự sheet
+    """
+    return [(path, index, name)
+            for path in file_paths
+            for index, name in enumerate(list_sheets(path))]
+
+
+@contextmanager
+def _main_script_hidden():
+    """Tạm ẩn __main__.__file__ để tiến trình spawn không chạy lại script giao diện"""
+    main = sys.modules.get('__main__')
+    main_file = getattr(main, '__file__', None)
+    if main_file is None or getattr(sys, 'frozen', False):
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = main_file
+
+
+def _total_bytes(sources):
+    return sum(os.path.getsize(path) for path in {path for path, _ in sources})
+
+
+def read_sheets(sources, progress=None, max_workers=None, min_parallel_bytes=PARALLEL_MIN_BYTES, fast=True):
+    """
+    Đọc dữ liệu thô của nhiều sheet, song song khi đủ lớn
+
+    Args:
+        sources: Danh sách (file_path, sheet_index)
+        progress: Hàm progress(sheets_done, total_sheets); có thể ném LoadCancelled để dừng
+        max_workers (int): Số tiến trình tối đa (mặc định: số lõi CPU)
+        min_parallel_bytes (int): Tổng dung lượng file tối thiểu để dùng nhiều tiến trình
+        fast (bool): Đọc XML trực tiếp (xem read_sheet)
+
+    Returns:
+        list: SheetData theo đúng thứ tự của sources
+    """
+    sources = list(sources)
+    workers = min(len(sources), max_workers or os.cpu_count() or 1)
+    if workers <= 1 or _total_bytes(sources) < min_parallel_bytes:
+        sheets = []
+        for path, index in sources:
+            sheets.append(read_sheet(path, index, fast=fast))
+            if progress:
+                progress(len(sheets), len(sources))
+        return sheets
+
+    results = [None] * len(sources)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        with _main_script_hidden():
+            futures = {pool.submit(read_sheet, path, index, fast=fast): pos
+                       for pos, (path, index) in enumerate(sources)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(done, len(sources))
+    except BaseException:
+        # Bị hủy hoặc lỗi: bỏ các sheet chưa bắt đầu, không chờ các sheet đang đọc
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results
+
+
+def combine_parts(parts):
+    """
+    Ghép bảng của từng sheet thành một bảng
+
+    Args:
+        parts: Danh sách (file_path, sheet_name, frame); frame có attrs[SOURCE_LAYOUT_KEY]
+            nếu ghi được từng ô về sheet gốc
+
+    Returns:
+        DataFrame: Các dòng được gắn cột Lớp (nếu sheet chưa có) và cột Tệp (nếu nhiều file),
+        attrs[SOURCE_PARTS_KEY] chứa vị trí từng phần
+    """
+    multi_file = len({path for path, _, _ in parts}) > 1
+    frames = []
+    source_parts = []
+    start = 0
+    for path, sheet_name, frame in parts:
+        layout = frame.attrs.get(SOURCE_LAYOUT_KEY)
+        columns = list(frame.columns)
+        tagged = frame.copy(deep=False)
+        tagged.attrs = {}
+        if CLASS_COLUMN not in tagged.columns:
+            tagged[CLASS_COLUMN] = sheet_name
+        if multi_file and FILE_COLUMN not in tagged.columns:
+            tagged[FILE_COLUMN] = os.path.basename(path)
+        stop = start + len(tagged)
+        # Phần không có layout vẫn được ghi nhận để không bị bỏ qua khi lưu (xem unwritable_parts)
+        source_parts.append(make_source_part(path, layout, start, stop, columns, sheet_name))
+        frames.append(tagged)
+        start = stop
+
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, ignore_index=True, sort=False)
+    combined.attrs = {SOURCE_PARTS_KEY: source_parts}
+    return combined